@@ -9,12 +9,16 @@ utils.setup_encoding()
 
 from flask import Flask, render_template, jsonify, request, send_file, Response
 from flask_cors import CORS
+import numpy as np
 import pandas as pd
 import json
 from datetime import datetime
 import os
 import config
 from storage import DataStorage
+from cache import EmotionCycleCache
+from breakdown import BreakdownCalculator
+from indicators import IndicatorCalculator
 
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
@@ -33,8 +37,29 @@ class NanToNullEncoder(json.JSONEncoder):
             # 替换NaN为null
             chunk = chunk.replace('NaN', 'null')
             yield chunk
+    
+    def default(self, obj):
+        """Parquet 缓存读回的数组列（如 board_transitions）是 numpy 数组"""
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super().default(obj)
 
 storage = DataStorage()
+cache = EmotionCycleCache(storage)
+
+
+def int_list(value):
+    """数组/矩阵列 -> 嵌套整数列表（Parquet 缓存读回的矩阵是“行数组”组成的 object 数组，需逐行转换）"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [int_list(v) for v in value]
+    return int(value)
+
+
+def mark_stale(df: pd.DataFrame) -> pd.DataFrame:
+    """根据 def_versions 标记每行定义版本过期的指标分组（stale_groups），并去掉 def_versions 列"""
+    versions = df['def_versions'] if 'def_versions' in df.columns else [None] * len(df)
+    df['stale_groups'] = [IndicatorCalculator.stale_groups(v, config.ENABLED_INDICATOR_GROUPS) for v in versions]
+    return df.drop(columns=['def_versions'], errors='ignore')
 
 
 @app.route('/')
@@ -55,8 +80,8 @@ def get_data():
     end_date = request.args.get('end_date')
     
     try:
-        # 读取数据
-        df = storage.load_emotion_indicators(start_date, end_date)
+        # 读取数据（热实例内走缓存）
+        df = cache.load(start_date, end_date)
         
         if df.empty:
             return jsonify({
@@ -69,6 +94,7 @@ def get_data():
 
         # 转换日期格式
         df['trade_date'] = df['trade_date'].dt.strftime('%Y-%m-%d')
+        df = mark_stale(df)
         
         # 转换为字典列表
         data = df.to_dict('records')
@@ -77,7 +103,11 @@ def get_data():
         result = {
             'success': True,
             'data': data,
-            'count': len(data)
+            'count': len(data),
+            # board_transitions 每行各列的含义
+            'transition_outcomes': IndicatorCalculator.TRANSITION_OUTCOMES,
+            # pct_histogram 中间各档的涨跌幅边界（%），首尾两档为跌停、涨停
+            'pct_histogram_edges': IndicatorCalculator.PCT_HIST_EDGES.tolist()
         }
         
         return Response(
@@ -96,21 +126,21 @@ def get_data():
 def get_stats():
     """获取数据统计信息"""
     try:
-        min_date, max_date = storage.get_data_date_range()
+        df = cache.get_all()
         
-        if min_date is None:
+        if df.empty:
             return jsonify({
                 'success': False,
                 'message': '暂无数据'
             })
-        
-        df = storage.load_emotion_indicators()
 
-        last_run = storage.get_last_update_run() or {}
+        last_run = cache.last_update_run() or {}
+        versions = df['def_versions'] if 'def_versions' in df.columns else [None] * len(df)
+        stale_days = sum(1 for v in versions if IndicatorCalculator.stale_groups(v, config.ENABLED_INDICATOR_GROUPS))
         
         # 格式化日期
-        min_date_str = datetime.strptime(min_date, '%Y%m%d').strftime('%Y-%m-%d')
-        max_date_str = datetime.strptime(max_date, '%Y%m%d').strftime('%Y-%m-%d')
+        min_date_str = df['trade_date'].min().strftime('%Y-%m-%d')
+        max_date_str = df['trade_date'].max().strftime('%Y-%m-%d')
         
         return jsonify({
             'success': True,
@@ -122,6 +152,8 @@ def get_stats():
             'last_update_days': last_run.get('days_count'),
             'last_update_status': last_run.get('status'),
             'last_update_message': last_run.get('message'),
+            'definition_versions': IndicatorCalculator.definition_versions(config.ENABLED_INDICATOR_GROUPS),
+            'stale_days': stale_days,
         })
         
     except Exception as e:
@@ -131,6 +163,95 @@ def get_stats():
         })
 
 
+@app.route('/api/breakdown')
+def get_breakdown():
+    """
+    获取分行业/分板块指标API
+    参数：
+        dimension: industry（默认）或 segment
+        start_date: 开始日期（可选），格式：YYYY-MM-DD
+        end_date: 结束日期（可选），格式：YYYY-MM-DD
+        key: 只返回某个行业/板块（可选）
+    """
+    dimension = request.args.get('dimension', 'industry')
+    if dimension not in BreakdownCalculator.DIMENSIONS:
+        return jsonify({
+            'success': False,
+            'message': f'未知的维度: {dimension}'
+        })
+
+    try:
+        df = storage.load_emotion_breakdown(
+            dimension,
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            request.args.get('key'),
+        )
+
+        if df.empty:
+            return jsonify({
+                'success': False,
+                'message': '无数据'
+            })
+
+        # 最新日期在前，同一日按涨停数从多到少
+        df = df.sort_values(['trade_date', 'limit_up_count'], ascending=[False, False])
+        df['trade_date'] = df['trade_date'].dt.strftime('%Y-%m-%d')
+        df = df.drop(columns=['created_at'], errors='ignore')
+        data = df.to_dict('records')
+
+        return Response(
+            json.dumps({'success': True, 'dimension': dimension, 'data': data, 'count': len(data)},
+                       cls=NanToNullEncoder, ensure_ascii=False),
+            mimetype='application/json'
+        )
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取分维度数据失败: {str(e)}'
+        })
+
+
+@app.route('/api/ladder')
+def get_ladder():
+    """
+    获取连板梯队API
+    参数：
+        date: 交易日（可选），格式：YYYY-MM-DD；与 ts_code 都不传时返回最新一日
+        ts_code: 只返回某只股票的连板历史（可选）
+    """
+    try:
+        df = storage.load_board_ladder(request.args.get('date'), request.args.get('ts_code'))
+
+        if df.empty:
+            return jsonify({
+                'success': False,
+                'message': '无数据'
+            })
+
+        df['trade_date'] = df['trade_date'].dt.strftime('%Y-%m-%d')
+        # 首次封板时间（当日秒数）-> HH:MM:SS
+        seconds = pd.to_numeric(df['first_time'], errors='coerce')
+        df['first_time'] = [
+            f"{int(s) // 3600:02d}:{int(s) % 3600 // 60:02d}:{int(s) % 60:02d}" if pd.notna(s) else None
+            for s in seconds
+        ]
+        data = df.to_dict('records')
+
+        return Response(
+            json.dumps({'success': True, 'data': data, 'count': len(data)},
+                       cls=NanToNullEncoder, ensure_ascii=False),
+            mimetype='application/json'
+        )
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取连板梯队失败: {str(e)}'
+        })
+
+
 @app.route('/api/export')
 def export_excel():
     """导出Excel"""
@@ -139,7 +260,7 @@ def export_excel():
     
     try:
         # 读取数据
-        df = storage.load_emotion_indicators(start_date, end_date)
+        df = cache.load(start_date, end_date)
         
         if df.empty:
             return jsonify({
@@ -149,6 +270,16 @@ def export_excel():
         
         # 排序（最新日期在前：日期从大到小）
         df = df.sort_values('trade_date', ascending=False)
+        df = df.drop(columns=['def_versions'], errors='ignore')
+        # 数组/矩阵列在 Excel 中以 JSON 文本显示
+        for col in IndicatorCalculator.ARRAY_COLUMNS:
+            if col in df.columns:
+                df[col] = [json.dumps(int_list(v)) if v is not None else None for v in df[col]]
+        if 'pct_ranks' in df.columns:
+            df['pct_ranks'] = [
+                json.dumps(v, ensure_ascii=False) if isinstance(v, dict) else None
+                for v in df['pct_ranks']
+            ]
         
         # 生成临时文件
         output_file = os.path.join('data', f'情绪周期表_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
@@ -173,7 +304,9 @@ def get_color_config():
     """获取颜色标记配置"""
     return jsonify({
         'success': True,
-        'config': config.COLOR_THRESHOLDS
+        'config': config.COLOR_THRESHOLDS,
+        'pct_rank': config.PCT_RANK_THRESHOLDS,
+        'pct_rank_window': config.PCT_RANK_WINDOW
     })
 
 
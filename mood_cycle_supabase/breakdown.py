@@ -0,0 +1,123 @@
+"""
+分行业、分板块指标
+按 (交易日, 行业) 和 (交易日, 板块) 统计涨停数、最高板、炸板率、晋级率，
+用于观察板块轮动；结果写入 emotion_breakdown 表
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from limit_price import board_segment
+from security_index import SecurityIndex
+
+
+class BreakdownCalculator:
+    """分维度指标计算器
+
+    多日涨跌停明细拼成一张表，每个维度只做一次分类 groupby（交易日 × 维度取值），
+    晋级率按昨日涨停股所属的行业/板块归属。
+    """
+
+    # 维度 -> 取值来源（行业来自 limit_list_d 的 industry，板块由代码前缀判断）
+    DIMENSIONS = ('industry', 'segment')
+    LIMIT_COLUMNS = ['ts_code', 'limit', 'limit_times', 'industry']
+
+    def __init__(self, security_index: SecurityIndex = None):
+        self.security_index = security_index if security_index is not None else SecurityIndex()
+
+    def calculate_batch(self, all_data: List[dict], prev_data: dict = None) -> List[dict]:
+        """
+        批量计算多个交易日的分维度指标
+
+        Args:
+            all_data: 按日期升序排列的当日数据字典列表
+            prev_data: all_data 第一天的前一日数据（可选，用于首日晋级率）
+
+        Returns:
+            emotion_breakdown 行列表：trade_date, dimension, key, limit_up_count,
+            break_count, break_rate, max_board, advance_rate
+        """
+        if not all_data:
+            return []
+
+        days = ([prev_data] if prev_data is not None else []) + list(all_data)
+        offset = len(days) - len(all_data)
+        n = len(days)
+
+        frames = []
+        daily_codes = []
+        has_daily = np.zeros(n, dtype=bool)
+        for i, day in enumerate(days):
+            limit_df = day.get('limit_data')
+            if limit_df is not None and not limit_df.empty and 'limit' in limit_df.columns:
+                frame = limit_df.reindex(columns=self.LIMIT_COLUMNS).assign(di=i)
+                frames.append(frame)
+            daily_df = day.get('daily')
+            if daily_df is not None and not daily_df.empty:
+                has_daily[i] = True
+                daily_codes.append((i, daily_df['ts_code'].to_numpy(dtype=object)))
+        if not frames:
+            return []
+
+        limit = pd.concat(frames, ignore_index=True)
+        limit['segment'] = board_segment(limit['ts_code'])
+        for dim in self.DIMENSIONS:
+            limit[dim] = limit[dim].astype('category')
+
+        # (交易日序号, 证券序号) -> 整数键，次日同一证券的键 = 当前键 + n_codes
+        codes = self.security_index.encode(limit['ts_code']).astype(np.int64)
+        n_codes = max(len(self.security_index), 1)
+        keys = limit['di'].to_numpy() * n_codes + codes
+        daily_keys = np.concatenate(
+            [i * n_codes + self.security_index.encode(c).astype(np.int64) for i, c in daily_codes]
+        ) if daily_codes else np.zeros(0, dtype=np.int64)
+
+        is_up = (limit['limit'] == 'U').to_numpy()
+        limit['is_up'] = is_up
+        limit['is_break'] = (limit['limit'] == 'Z').to_numpy()
+        limit['board'] = pd.to_numeric(limit['limit_times'], errors='coerce').where(is_up)
+
+        # 昨日涨停 -> 今日（今日有交易才计入分母，今日无日线时不做判断）
+        prev_up = limit[is_up & (limit['di'].to_numpy() + 1 < n)].copy()
+        next_keys = keys[prev_up.index] + n_codes
+        prev_up['di'] = prev_up['di'] + 1
+        prev_up['advanced'] = np.isin(next_keys, keys[is_up])
+        traded = np.isin(next_keys, daily_keys) | ~has_daily[prev_up['di'].to_numpy()]
+        prev_up = prev_up[traded]
+
+        records = []
+        for dim in self.DIMENSIONS:
+            today = limit.groupby(['di', dim], observed=True).agg(
+                limit_up_count=('is_up', 'sum'),
+                break_count=('is_break', 'sum'),
+                max_board=('board', 'max'),
+            )
+            advance = prev_up.groupby(['di', dim], observed=True).agg(
+                advance_base=('advanced', 'size'),
+                advance_count=('advanced', 'sum'),
+            )
+            stats = today.join(advance, how='outer').reset_index()
+            stats = stats[stats['di'] >= offset]
+            records.extend(self._to_records(stats, dim, days))
+        return records
+
+    @staticmethod
+    def _to_records(stats: pd.DataFrame, dim: str, days: List[dict]) -> List[dict]:
+        records = []
+        for row in stats.itertuples(index=False):
+            n_up = int(row.limit_up_count) if pd.notna(row.limit_up_count) else 0
+            n_break = int(row.break_count) if pd.notna(row.break_count) else 0
+            base = int(row.advance_base) if pd.notna(row.advance_base) else 0
+            records.append({
+                'trade_date': days[row.di]['trade_date'],
+                'dimension': dim,
+                'key': str(getattr(row, dim)),
+                'limit_up_count': n_up,
+                'break_count': n_break,
+                'break_rate': round(n_break / (n_up + n_break) * 100, 2) if n_up + n_break > 0 else 0,
+                'max_board': int(row.max_board) if pd.notna(row.max_board) else 0,
+                'advance_rate': round(int(row.advance_count) / base * 100, 2) if base > 0 else None,
+            })
+        return records
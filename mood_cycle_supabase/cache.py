@@ -0,0 +1,127 @@
+"""
+情绪指标读穿透缓存
+Vercel 等无服务器环境下，同一个热实例的多次请求共享进程内缓存，
+并落盘到 /tmp（Parquet 列式格式），实例内重启后也无需重新读库
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+import pandas as pd
+
+import config
+from storage import DataStorage
+
+
+class EmotionCycleCache:
+    """emotion_cycle 全表缓存
+
+    以 update_log 最新一条的 run_at 作为版本号：
+    每隔 CACHE_PROBE_INTERVAL 秒探测一次版本（只读 1 行），
+    版本未变时直接使用进程内或 /tmp 中的数据，不再读取 emotion_cycle。
+    """
+
+    DATA_FILE = 'emotion_cycle.parquet'
+    META_FILE = 'emotion_cycle.meta.json'
+
+    def __init__(self, storage: DataStorage, cache_dir: str = None,
+                 probe_interval: float = None):
+        self.storage = storage
+        self.cache_dir = cache_dir or config.CACHE_DIR
+        self.probe_interval = config.CACHE_PROBE_INTERVAL if probe_interval is None else probe_interval
+
+        self._lock = threading.Lock()
+        self._df: Optional[pd.DataFrame] = None
+        self._version: Optional[str] = None
+        self._last_run: Optional[dict] = None
+        self._probed_at = 0.0
+
+    def _probe(self) -> Optional[dict]:
+        """探测最新一次更新记录（节流）"""
+        now = time.monotonic()
+        if self._last_run is None or now - self._probed_at >= self.probe_interval:
+            self._last_run = self.storage.get_last_update_run()
+            self._probed_at = now
+        return self._last_run
+
+    def _read_disk(self, version: str) -> Optional[pd.DataFrame]:
+        data_path = os.path.join(self.cache_dir, self.DATA_FILE)
+        meta_path = os.path.join(self.cache_dir, self.META_FILE)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != version:
+                return None
+            return pd.read_parquet(data_path)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, df: pd.DataFrame, version: str):
+        """先写临时文件再原子替换，避免并发请求读到半截文件"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data_path = os.path.join(self.cache_dir, self.DATA_FILE)
+            meta_path = os.path.join(self.cache_dir, self.META_FILE)
+            tmp_data = f'{data_path}.{os.getpid()}.tmp'
+            tmp_meta = f'{meta_path}.{os.getpid()}.tmp'
+
+            df.to_parquet(tmp_data, index=False, compression='zstd')
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump({'version': version, 'rows': len(df)}, f)
+            os.replace(tmp_data, data_path)
+            os.replace(tmp_meta, meta_path)
+        except Exception as e:
+            print(f"[警告] 写入本地缓存失败: {e}")
+
+    def get_all(self) -> pd.DataFrame:
+        """获取全表数据（按 trade_date 升序）"""
+        with self._lock:
+            last_run = self._probe()
+            version = last_run.get('run_at') if last_run else None
+
+            # 无法确定版本时不缓存，直接读库
+            if version is None:
+                return self.storage.load_emotion_indicators()
+
+            if self._df is not None and self._version == version:
+                return self._df
+
+            df = self._read_disk(version)
+            if df is None:
+                df = self.storage.load_emotion_indicators()
+                # 读库失败或无数据时不缓存，下次请求重试
+                if df.empty:
+                    return df
+                self._write_disk(df, version)
+
+            self._df = df
+            self._version = version
+            return df
+
+    def load(self, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        读取情绪指标数据（与 DataStorage.load_emotion_indicators 接口一致）
+
+        Args:
+            start_date: 开始日期 YYYY-MM-DD 或 YYYYMMDD
+            end_date: 结束日期 YYYY-MM-DD 或 YYYYMMDD
+        """
+        df = self.get_all()
+        if df.empty:
+            return df
+
+        mask = pd.Series(True, index=df.index)
+        if start_date:
+            mask &= df['trade_date'] >= pd.to_datetime(start_date)
+        if end_date:
+            mask &= df['trade_date'] <= pd.to_datetime(end_date)
+        # 返回副本，调用方可以放心修改
+        return df[mask].copy()
+
+    def last_update_run(self) -> Optional[dict]:
+        """最近一次更新记录（复用版本探测的结果）"""
+        with self._lock:
+            return self._probe()
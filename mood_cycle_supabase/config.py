@@ -3,6 +3,7 @@
 存储配置信息
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -15,12 +16,79 @@ TUSHARE_TOKEN = os.getenv('TUSHARE_TOKEN', '7fc6871c1e92fad3b8d5c9fa6dcaa0f3a47f
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
+# Supabase 写入配置
+# 批量 upsert 的并发度（同时在途的请求数）
+UPSERT_CONCURRENCY = int(os.getenv('UPSERT_CONCURRENCY', '4'))
+# 单批请求体的初始/最小/最大字节数，运行中按实际耗时自适应调整
+UPSERT_BATCH_BYTES = 256 * 1024
+UPSERT_MIN_BATCH_BYTES = 16 * 1024
+UPSERT_MAX_BATCH_BYTES = 2 * 1024 * 1024
+# 单批期望耗时（秒）：快于一半则放大批次，慢于该值则缩小批次
+UPSERT_TARGET_LATENCY = 1.0
+# HTTP 请求超时（秒）
+HTTP_TIMEOUT = 30
+
+# 是否把原始数据（daily / limit_list）写入 Supabase 的 raw_daily / raw_limit_list，
+# 开启后可用库内函数 refresh_emotion_cycle 直接重算历史指标
+STORE_RAW_IN_SUPABASE = os.getenv('STORE_RAW_IN_SUPABASE', 'False').lower() == 'true'
+
+# 是否同时把原始数据追加保存到本地 data/raw/*.parquet，
+# 指标口径调整后可用 update_data.py --recompute 离线重算
+STORE_RAW_LOCAL = os.getenv('STORE_RAW_LOCAL', 'True').lower() == 'true'
+RAW_DATA_DIR = os.getenv('RAW_DATA_DIR', 'data/raw')
+DAILY_DATA_FILE = os.path.join(RAW_DATA_DIR, 'daily.parquet')
+LIMIT_LIST_FILE = os.path.join(RAW_DATA_DIR, 'limit_list.parquet')
+DAILY_BASIC_FILE = os.path.join(RAW_DATA_DIR, 'daily_basic.parquet')
+# 离线重算时每次读入内存的交易日数
+RECOMPUTE_WINDOW_DAYS = 250
+
+# 前一日状态（跨日指标的计算起点）保留的交易日数
+PREV_STATE_KEEP_DAYS = 30
+
+# 并行计算配置（大区间回补时使用多进程）
+# 进程数，默认使用全部 CPU 核心
+COMPUTE_WORKERS = int(os.getenv('COMPUTE_WORKERS', str(os.cpu_count() or 1)))
+# 每个分片至少包含的交易日数，区间较短时直接单进程计算
+PARALLEL_MIN_CHUNK_DAYS = 60
+
+# 启用的指标分组（逗号分隔，见 IndicatorCalculator.INDICATOR_GROUPS），为空表示全部启用；
+# 更新时只向 tushare 获取启用分组实际用到的数据集
+ENABLED_INDICATOR_GROUPS = [g.strip() for g in os.getenv('ENABLED_INDICATOR_GROUPS', '').split(',') if g.strip()] or None
+
 # 初始数据范围
 INIT_START_DATE = '20260101'
 
 # 市场配置
 # 排除ST、退市股票
 EXCLUDE_ST = True
+# 排除退市整理期和已退市股票
+EXCLUDE_DELISTED = True
+# 排除上市不足N个自然日的次新股（新股连续一字板会抬高连板统计），0 表示不排除
+NEW_LISTING_DAYS = int(os.getenv('NEW_LISTING_DAYS', '30'))
+# 涨跌停数据来源：
+#   tushare - 使用 limit_list_d
+#   auto    - 优先 limit_list_d，当日无数据（如早于其覆盖范围）时由日线推导
+#   derived - 不调用 limit_list_d，全部由日线按板块规则推导（无封单金额等盘中数据）
+LIMIT_SOURCE = os.getenv('LIMIT_SOURCE', 'auto')
+# 接近涨停：最高价距涨停价不超过昨收的百分比
+NEAR_LIMIT_PCT = 1.0
+# 证券主数据（stock_basic、namechange、交易日历）本地缓存目录及刷新间隔（小时）
+SECURITY_MASTER_DIR = os.getenv('SECURITY_MASTER_DIR', 'data/master')
+SECURITY_MASTER_REFRESH_HOURS = 24
+# 缓存的交易日历起始日期
+TRADE_CAL_START = '20000101'
+# 稠密价格面板（交易日 × 证券，内存映射 .npy）目录及远期收益最长观察天数
+PANEL_DIR = os.getenv('PANEL_DIR', 'data/panel')
+FORWARD_HORIZON = 5
+# 个股日度特征数据集（Parquet，按交易日分区）目录
+FEATURES_DIR = os.getenv('FEATURES_DIR', 'data/features')
+# 指标滚动历史分位：窗口（交易日）、开始给出分位所需的最少有效天数
+PCT_RANK_WINDOW = int(os.getenv('PCT_RANK_WINDOW', '250'))
+PCT_RANK_MIN_PERIODS = 20
+# 情绪周期阶段：综合情绪分（平滑后）的冰点、高潮阈值，以及开始输出阶段前的预热交易日数
+CYCLE_ICE_SCORE = 25
+CYCLE_CLIMAX_SCORE = 75
+CYCLE_WARMUP_DAYS = 20
 
 # API调用配置
 API_DELAY = 0.3
@@ -30,6 +98,11 @@ WEB_HOST = '0.0.0.0'
 WEB_PORT = 5000
 DEBUG_MODE = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
 
+# Web读缓存配置（Vercel 中只有 /tmp 可写）
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mood_cycle_cache'))
+# 两次“最新更新时间”探测之间的最短间隔（秒）
+CACHE_PROBE_INTERVAL = float(os.getenv('CACHE_PROBE_INTERVAL', '30'))
+
 # 颜色标记阈值配置（用于前端展示）
 COLOR_THRESHOLDS = {
     'advance_1to2': {'good': 40, 'bad': 20},
@@ -44,3 +117,6 @@ COLOR_THRESHOLDS = {
     'second_premium': {'good': 3, 'bad': -1},
     'third_premium': {'good': 3, 'bad': -1},
 }
+
+# 历史分位着色阈值：分位 >= high 或 <= low 时按趋势方向深色标记（见 static/js/main.js）
+PCT_RANK_THRESHOLDS = {'high': 80, 'low': 20}
@@ -0,0 +1,135 @@
+"""
+情绪周期阶段识别
+逐日读取一行指标，O(1) 更新状态，输出综合情绪分（0~100）和周期阶段
+（冰点、启动、发酵、高潮、退潮）；状态可序列化，增量更新从上一交易日的状态继续，无需回放历史
+"""
+
+import math
+from typing import Optional
+
+import pandas as pd
+
+import config
+
+
+class CyclePhaseClassifier:
+    """情绪周期状态机
+
+    1. 各输入指标用指数加权均值/方差标准化（只用当日之前的统计量），按方向加权平均后
+       经 logistic 映射为综合情绪分；
+    2. 情绪分的快、慢两条指数均线之差作为趋势；
+    3. 阶段按平滑后的情绪分和趋势转移：低于冰点阈值为冰点，高于高潮阈值为高潮，
+       其间上行时 冰点/退潮 -> 启动 -> 发酵，下行时 高潮/发酵 -> 退潮，趋势不明时保持原阶段。
+    """
+
+    MODEL_NAME = 'cycle_phase'
+    VERSION = 1
+
+    PHASES = ('冰点', '启动', '发酵', '高潮', '退潮')
+    ICE, START, BUILD, CLIMAX, EBB = PHASES
+
+    # (指标列, 权重)：权重为负表示数值越小情绪越好
+    SCORE_INPUTS = (
+        ('limit_up_count', 1.0),
+        ('max_board', 1.0),
+        ('advance_1to2', 1.0),
+        ('first_premium', 1.0),
+        ('break_rate', -1.0),
+        ('limit_down_count', -1.0),
+        ('up_count', 0.5),
+        ('down_count', -0.5),
+    )
+    # 标准化后的截断范围和 logistic 斜率
+    Z_CLIP = 3.0
+    SCORE_SLOPE = 1.5
+    # 指数均线跨度（交易日）
+    NORM_SPAN = 120
+    FAST_SPAN = 3
+    SLOW_SPAN = 10
+
+    def __init__(self, state: Optional[dict] = None):
+        """
+        Args:
+            state: to_state() 的结果（前一交易日的状态）；版本不一致或为空时从头开始
+        """
+        if state and state.get('version') == self.VERSION:
+            self.stats = {col: list(v) for col, v in state['stats'].items()}
+            self.fast = state['fast']
+            self.slow = state['slow']
+            self.phase = state['phase']
+            self.days = state['days']
+        else:
+            self.stats = {}
+            self.fast = None
+            self.slow = None
+            self.phase = None
+            self.days = 0
+
+    def to_state(self) -> dict:
+        """可 JSON 序列化的状态"""
+        return {
+            'version': self.VERSION,
+            'stats': {col: list(v) for col, v in self.stats.items()},
+            'fast': self.fast,
+            'slow': self.slow,
+            'phase': self.phase,
+            'days': self.days,
+        }
+
+    def _zscore(self, col: str, value: float) -> Optional[float]:
+        """用当日之前的指数加权均值/方差标准化，再用当日值更新统计量"""
+        alpha = 2 / (self.NORM_SPAN + 1)
+        mean, var, n = self.stats.get(col, (value, 0.0, 0))
+        z = None
+        if n >= 2 and var > 0:
+            z = max(-self.Z_CLIP, min(self.Z_CLIP, (value - mean) / math.sqrt(var)))
+        diff = value - mean
+        incr = alpha * diff
+        self.stats[col] = [mean + incr, (1 - alpha) * (var + diff * incr), n + 1]
+        return z
+
+    def _transition(self, score: float, trend: float) -> str:
+        if score >= config.CYCLE_CLIMAX_SCORE:
+            return self.CLIMAX
+        if score <= config.CYCLE_ICE_SCORE:
+            return self.ICE
+        if trend > 0:
+            if self.phase in (self.BUILD, self.CLIMAX) or score >= 50:
+                return self.BUILD
+            return self.START
+        if trend < 0 and self.phase in (self.CLIMAX, self.BUILD, self.EBB):
+            return self.EBB
+        return self.phase or (self.START if trend > 0 else self.EBB)
+
+    def step(self, row: dict) -> dict:
+        """
+        处理一个交易日的指标行
+
+        Returns:
+            {'sentiment_score': 综合情绪分或 None, 'cycle_phase': 阶段或 None}；
+            前 CYCLE_WARMUP_DAYS 个交易日统计量不足，只更新状态不输出阶段
+        """
+        total, weight = 0.0, 0.0
+        for col, w in self.SCORE_INPUTS:
+            value = row.get(col)
+            if value is None or pd.isna(value):
+                continue
+            z = self._zscore(col, float(value))
+            if z is not None:
+                total += w * z
+                weight += abs(w)
+        self.days += 1
+        if weight == 0:
+            return {'sentiment_score': None, 'cycle_phase': None}
+
+        score = 100 / (1 + math.exp(-self.SCORE_SLOPE * total / weight))
+        fast_alpha = 2 / (self.FAST_SPAN + 1)
+        slow_alpha = 2 / (self.SLOW_SPAN + 1)
+        self.fast = score if self.fast is None else self.fast + fast_alpha * (score - self.fast)
+        self.slow = score if self.slow is None else self.slow + slow_alpha * (score - self.slow)
+        self.phase = self._transition(self.fast, self.fast - self.slow)
+
+        return {
+            'sentiment_score': round(score, 1),
+            'cycle_phase': self.phase if self.days > config.CYCLE_WARMUP_DAYS else None,
+        }
@@ -14,6 +14,13 @@ import config
 class DataFetcher:
     """tushare数据获取器"""
     
+    # 数据集 -> 获取方法名；指标通过 IndicatorCalculator.INDICATOR_GROUPS 的 requires 声明依赖
+    DATASET_FETCHERS = {
+        'daily': 'fetch_daily_data',
+        'limit_data': 'fetch_limit_list_all',
+        'daily_basic': 'fetch_daily_basic',
+    }
+    
     def __init__(self):
         """初始化tushare连接"""
         ts.set_token(config.TUSHARE_TOKEN)
@@ -51,6 +58,33 @@ class DataFetcher:
             print(f"❌ 获取交易日历失败: {e}")
             return []
     
+    def get_prev_trade_date(self, trade_date: str) -> str:
+        """
+        获取指定日期的上一个交易日
+        
+        Args:
+            trade_date: 日期，格式：YYYYMMDD
+            
+        Returns:
+            上一个交易日（YYYYMMDD），获取失败时返回None
+        """
+        try:
+            df = self.pro.trade_cal(
+                exchange='SSE',
+                start_date=trade_date,
+                end_date=trade_date,
+                fields='cal_date,is_open,pretrade_date'
+            )
+            
+            if df is None or df.empty:
+                return None
+            
+            return df['pretrade_date'].iloc[0]
+            
+        except Exception as e:
+            print(f"❌ 获取上一交易日失败 ({trade_date}): {e}")
+            return None
+    
     def fetch_daily_data(self, trade_date: str) -> pd.DataFrame:
         """
         获取指定日期的全市场日线行情数据
@@ -143,16 +177,83 @@ class DataFetcher:
             print(f"❌ 获取基础指标失败 ({trade_date}): {e}")
             return pd.DataFrame()
     
-    def fetch_all_data_for_date(self, trade_date: str) -> dict:
+    def fetch_stock_basic(self) -> pd.DataFrame:
+        """
+        获取全部证券的基础信息（上市、退市、暂停上市）
+        
+        Returns:
+            DataFrame: ts_code, name, list_status, list_date, delist_date
+        """
+        frames = []
+        for list_status in ('L', 'D', 'P'):
+            try:
+                time.sleep(config.API_DELAY)
+                df = self.pro.stock_basic(
+                    exchange='',
+                    list_status=list_status,
+                    fields='ts_code,name,list_status,list_date,delist_date'
+                )
+                if df is not None and not df.empty:
+                    frames.append(df)
+            except Exception as e:
+                print(f"❌ 获取证券基础信息失败 (list_status={list_status}): {e}")
+                return pd.DataFrame()
+        
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        print(f"  🗂️  获取证券基础信息: {len(df)}条")
+        return df
+    
+    def fetch_namechange(self, start_date: str = None, page_size: int = 5000) -> pd.DataFrame:
+        """
+        获取证券曾用名记录（分页获取）
+        
+        Args:
+            start_date: 只获取公告日期不早于该日期的记录，格式：YYYYMMDD；为空时获取全部
+            page_size: 每页行数
+            
+        Returns:
+            DataFrame: ts_code, name, start_date, end_date, ann_date
+        """
+        frames = []
+        offset = 0
+        try:
+            while True:
+                time.sleep(config.API_DELAY)
+                params = {'fields': 'ts_code,name,start_date,end_date,ann_date',
+                          'limit': page_size, 'offset': offset}
+                if start_date:
+                    params['start_date'] = start_date
+                df = self.pro.namechange(**params)
+                if df is None or df.empty:
+                    break
+                frames.append(df)
+                if len(df) < page_size:
+                    break
+                offset += page_size
+        except Exception as e:
+            print(f"❌ 获取曾用名记录失败: {e}")
+            return pd.DataFrame()
+        
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        print(f"  🗂️  获取曾用名记录: {len(df)}条")
+        return df
+    
+    def fetch_all_data_for_date(self, trade_date: str, datasets: List[str] = None) -> dict:
         """
         获取指定日期的所有数据
         
         Args:
             trade_date: 交易日期，格式：YYYYMMDD
+            datasets: 需要获取的数据集（默认全部）；未获取的数据集为空 DataFrame
             
         Returns:
             包含所有数据的字典
         """
+        datasets = list(self.DATASET_FETCHERS) if datasets is None else datasets
         print(f"\n🔍 开始获取 {trade_date} 的数据...")
         
         data = {
@@ -162,25 +263,22 @@ class DataFetcher:
             'daily_basic': pd.DataFrame()
         }
         
-        # 获取日线数据
-        data['daily'] = self.fetch_daily_data(trade_date)
-        
-        # 获取所有涨跌停炸板数据（一次性获取）
-        data['limit_data'] = self.fetch_limit_list_all(trade_date)
-        
-        # 获取基础指标
-        data['daily_basic'] = self.fetch_daily_basic(trade_date)
+        # 日线数据、所有涨跌停炸板数据（一次性获取）、基础指标，只获取用得到的
+        for dataset, method in self.DATASET_FETCHERS.items():
+            if dataset in datasets:
+                data[dataset] = getattr(self, method)(trade_date)
         
         print(f"✅ {trade_date} 数据获取完成\n")
         return data
     
-    def fetch_batch_data(self, start_date: str, end_date: str) -> List[dict]:
+    def fetch_batch_data(self, start_date: str, end_date: str, datasets: List[str] = None) -> List[dict]:
         """
         批量获取指定日期范围的数据
         
         Args:
             start_date: 开始日期，格式：YYYYMMDD
             end_date: 结束日期，格式：YYYYMMDD
+            datasets: 需要获取的数据集（默认全部）
             
         Returns:
             数据列表
@@ -199,12 +297,15 @@ class DataFetcher:
         total = len(trade_dates)
         
         print(f"\n🚀 开始批量获取数据，共{total}个交易日\n")
+        if datasets is not None:
+            skipped = [d for d in self.DATASET_FETCHERS if d not in datasets]
+            print(f"📋 获取数据集: {', '.join(datasets)}" + (f"（跳过 {', '.join(skipped)}）" if skipped else ''))
         print("=" * 60)
         
         for idx, trade_date in enumerate(trade_dates, 1):
             print(f"\n[{idx}/{total}] 进度: {idx/total*100:.1f}%")
             
-            data = self.fetch_all_data_for_date(trade_date)
+            data = self.fetch_all_data_for_date(trade_date, datasets)
             all_data.append(data)
             
             # 进度提示
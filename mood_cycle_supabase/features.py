@@ -0,0 +1,279 @@
+"""
+个股日度特征数据集
+从 data/raw 生成涨停、炸板、跌停个股的逐日特征（板数、封板时间、开板次数、封成比、换手率、
+行业热度、全市场情绪指标、未来收益），按交易日分区写入 Parquet 数据集（data/features/trade_date=YYYYMMDD/），
+每次运行只写入新增或未完成（未来收益尚未齐全）的分区，按窗口处理，内存占用与窗口大小成正比
+"""
+
+import argparse
+import json
+import os
+import shutil
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import config
+from indicators import IndicatorCalculator, parse_time_seconds
+from panel import forward_returns, open_premium
+from raw_store import LocalRawStore
+from security_index import SecurityIndex
+from security_master import SecurityMaster
+
+
+class FeatureExporter:
+    """逐 (股票, 交易日) 特征导出
+
+    分区在其后 horizon 个交易日的日线都已入库时视为完成，之后不再重写；
+    特征定义变化时把 VERSION 加 1，下次运行全部重建。
+    所有分区按同一个固定的 Arrow schema 写入（见 _schema），空分区或某列全为空的分区
+    不会被推断成 null 类型，整个数据集可以一次读取。
+    """
+
+    VERSION = 2
+    META_FILE = '_meta.json'
+    PART_FILE = 'part-0.parquet'
+
+    LIMIT_COLUMNS = ['ts_code', 'name', 'industry', 'limit', 'limit_times', 'pct_chg', 'amount', 'fd_amount',
+                     'first_time', 'last_time', 'open_times', 'float_mv', 'turnover_ratio']
+    # 文本列和布尔列，其余特征列均为 float64
+    STRING_FEATURES = ('ts_code', 'name', 'industry', 'limit')
+    BOOL_FEATURES = ('is_st',)
+    # 全市场情绪指标（列名加 mkt_ 前缀）
+    MARKET_COLUMNS = ['up_count', 'down_count', 'limit_up_count', 'limit_down_count', 'break_rate',
+                      'max_board', 'advance_1to2', 'first_red_rate', 'first_premium']
+
+    def __init__(self, raw_store: LocalRawStore = None, security_master: Optional[SecurityMaster] = None,
+                 output_dir: str = None, horizon: int = None):
+        self.raw_store = raw_store or LocalRawStore()
+        self.security_master = security_master
+        self.output_dir = output_dir or config.FEATURES_DIR
+        self.horizon = horizon or config.FORWARD_HORIZON
+        self.calculator = IndicatorCalculator(security_master.index if security_master is not None else None)
+        self.meta = self._load_meta()
+
+    # ---------- 元数据 ----------
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.output_dir, *parts)
+
+    def _load_meta(self) -> dict:
+        try:
+            with open(self._path(self.META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {'complete': []}
+        if meta.get('version') != self.VERSION or meta.get('horizon') != self.horizon:
+            return {'complete': []}
+        return meta
+
+    def _save_meta(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.meta.update({'version': self.VERSION, 'horizon': self.horizon})
+        tmp_path = self._path(self.META_FILE) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self._path(self.META_FILE))
+
+    # ---------- 生成 ----------
+
+    def run(self, start_date: str = '00000000', end_date: str = '99999999', window_days: int = None) -> int:
+        """
+        生成区间内新增或未完成的分区
+
+        Returns:
+            写入的分区数
+        """
+        all_dates = self.raw_store.trade_dates()
+        complete = set(self.meta['complete'])
+        pending = [d for d in all_dates if start_date <= d <= end_date and d not in complete]
+        if not pending:
+            print("✅ 特征数据集已是最新")
+            return 0
+
+        print(f"\n🧬 生成特征数据集：{len(pending)} 个交易日待写入")
+        pending_set = set(pending)
+        position = {d: i for i, d in enumerate(all_dates)}
+        written = 0
+        for prev_data, days in self.raw_store.iter_windows(pending[0], pending[-1], window_days):
+            targets = [d['trade_date'] for d in days if d['trade_date'] in pending_set]
+            if not targets:
+                continue
+            features = self._window_features(prev_data, days, all_dates)
+            groups = dict(tuple(features.groupby('trade_date'))) if not features.empty else {}
+            for trade_date in targets:
+                self._write_partition(trade_date, groups.get(trade_date))
+                if position[trade_date] + self.horizon < len(all_dates):
+                    complete.add(trade_date)
+            written += len(targets)
+            self.meta['complete'] = sorted(complete)
+            self._save_meta()
+            print(f"  [OK] 已写入 {written}/{len(pending)} 个分区（至 {targets[-1]}）")
+        return written
+
+    def _write_partition(self, trade_date: str, df: Optional[pd.DataFrame]):
+        """写入一个交易日的分区（先写临时文件再原子替换；分区键不重复存入文件）"""
+        partition = self._path(f'trade_date={trade_date}')
+        os.makedirs(partition, exist_ok=True)
+        if df is None:
+            df = pd.DataFrame(columns=self._columns())
+        schema = self._schema()
+        table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+        tmp_path = os.path.join(partition, self.PART_FILE + '.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(partition, self.PART_FILE))
+
+    def _columns(self) -> List[str]:
+        return (['trade_date', 'ts_code', 'name', 'industry', 'limit', 'is_st', 'board', 'seal_time',
+                 'last_seal_time', 'open_times', 'pct_chg', 'amount', 'float_mv', 'turnover_ratio',
+                 'fd_ratio', 'seal_strength', 'industry_limit_up', 'industry_share']
+                + [f'mkt_{col}' for col in self.MARKET_COLUMNS]
+                + ['fwd_open_premium'] + [f'fwd_ret_{h}' for h in range(1, self.horizon + 1)])
+
+    def _schema(self) -> pa.Schema:
+        """分区文件的 schema（不含分区键 trade_date）"""
+        def field_type(col: str) -> pa.DataType:
+            if col in self.STRING_FEATURES:
+                return pa.string()
+            if col in self.BOOL_FEATURES:
+                return pa.bool_()
+            return pa.float64()
+        return pa.schema([(col, field_type(col)) for col in self._columns() if col != 'trade_date'])
+
+    def _filter(self, data: Optional[dict]) -> Optional[dict]:
+        return self.security_master.filter_day(data) if self.security_master is not None else data
+
+    def _window_features(self, prev_data: Optional[dict], days: List[dict], all_dates: List[str]) -> pd.DataFrame:
+        """一个窗口内全部交易日的特征"""
+        first, last = days[0]['trade_date'], days[-1]['trade_date']
+        limit = self.raw_store.read('limit_data', first, last, columns=self.LIMIT_COLUMNS)
+        if limit.empty or 'limit' not in limit.columns:
+            return pd.DataFrame(columns=self._columns())
+        limit = limit[limit['limit'].isin(['U', 'Z', 'D'])].drop_duplicates(['trade_date', 'ts_code'])
+        limit = limit.reindex(columns=['trade_date'] + self.LIMIT_COLUMNS).reset_index(drop=True)
+        num = {col: pd.to_numeric(limit[col], errors='coerce')
+               for col in ('limit_times', 'pct_chg', 'amount', 'fd_amount', 'open_times', 'float_mv',
+                           'turnover_ratio')}
+        is_up = limit['limit'] == 'U'
+
+        features = pd.DataFrame({
+            'trade_date': limit['trade_date'],
+            'ts_code': limit['ts_code'],
+            'name': limit['name'],
+            'industry': limit['industry'],
+            'limit': limit['limit'],
+            'is_st': self._is_st(limit),
+            'board': num['limit_times'].where(is_up),
+            'seal_time': parse_time_seconds(limit['first_time']),
+            'last_seal_time': parse_time_seconds(limit['last_time']),
+            'open_times': num['open_times'],
+            'pct_chg': num['pct_chg'],
+            'amount': num['amount'],
+            'float_mv': num['float_mv'],
+            'turnover_ratio': num['turnover_ratio'],
+            # 封成比：封单金额 / 成交额；封单强度：封单金额 / 流通市值（%，与 seal_strength 指标同口径）
+            'fd_ratio': (num['fd_amount'] / num['amount'].where(num['amount'] > 0)).where(is_up),
+            'seal_strength': (num['fd_amount'] / num['float_mv'].where(num['float_mv'] > 0) * 100).where(is_up),
+        })
+
+        # 行业热度：同行业当日涨停数及其占全部涨停的比例（%）
+        up_by_industry = is_up.groupby([limit['trade_date'], limit['industry']]).transform('sum')
+        up_by_day = is_up.groupby(limit['trade_date']).transform('sum')
+        features['industry_limit_up'] = up_by_industry.where(limit['industry'].notna())
+        features['industry_share'] = (up_by_industry / up_by_day.where(up_by_day > 0) * 100).where(
+            limit['industry'].notna())
+
+        market = self._market_features(prev_data, days)
+        features = features.merge(market, on='trade_date', how='left')
+
+        fwd = self._forward_features(features, all_dates)
+        return pd.concat([features, fwd], axis=1)[self._columns()]
+
+    def _is_st(self, limit: pd.DataFrame) -> np.ndarray:
+        is_st = np.zeros(len(limit), dtype=bool)
+        if self.security_master is None or self.security_master.basic.empty:
+            return is_st
+        for trade_date, rows in limit.groupby('trade_date').indices.items():
+            is_st[rows] = self.security_master.is_st(trade_date, limit['ts_code'].to_numpy()[rows])
+        return is_st
+
+    def _market_features(self, prev_data: Optional[dict], days: List[dict]) -> pd.DataFrame:
+        """全市场情绪指标（剔除口径与指标计算一致）"""
+        rows = self.calculator.calculate_indicators_batch([self._filter(d) for d in days], self._filter(prev_data))
+        market = pd.DataFrame(rows).reindex(columns=['trade_date'] + self.MARKET_COLUMNS)
+        return market.rename(columns={col: f'mkt_{col}' for col in self.MARKET_COLUMNS})
+
+    def _forward_features(self, features: pd.DataFrame, all_dates: List[str]) -> pd.DataFrame:
+        """
+        未来收益：T+1 开盘溢价和 T+1..T+horizon 累计涨幅（%）
+
+        只为窗口内出现的股票读取窗口及其后 horizon 个交易日的日线，拼成小矩阵后花式索引。
+        """
+        columns = ['fwd_open_premium'] + [f'fwd_ret_{h}' for h in range(1, self.horizon + 1)]
+        if features.empty:
+            return pd.DataFrame(columns=columns, index=features.index)
+
+        first = features['trade_date'].min()
+        window_last = features['trade_date'].max()
+        after = [d for d in all_dates if d > window_last][:self.horizon]
+        dates = np.asarray([d for d in all_dates if first <= d <= window_last] + after, dtype=object)
+        codes = np.asarray(sorted(set(features['ts_code'])), dtype=object)
+
+        daily = self.raw_store.read('daily', first, dates[-1], columns=['ts_code', 'open', 'close', 'pre_close'])
+        daily = daily[daily['ts_code'].isin(set(codes))]
+        shape = (len(dates), len(codes))
+        matrices = {field: np.full(shape, np.nan) for field in ('open', 'close', 'pre_close')}
+        d_rows = np.searchsorted(dates, daily['trade_date'].to_numpy(dtype=object))
+        d_cols = np.searchsorted(codes, daily['ts_code'].to_numpy(dtype=object))
+        for field, matrix in matrices.items():
+            matrix[d_rows, d_cols] = pd.to_numeric(daily[field], errors='coerce').to_numpy(dtype=float)
+
+        rows = np.searchsorted(dates, features['trade_date'].to_numpy(dtype=object))
+        cols = np.searchsorted(codes, features['ts_code'].to_numpy(dtype=object))
+        returns = forward_returns(matrices['close'], matrices['pre_close'], rows, cols, self.horizon)
+        result = pd.DataFrame(np.round(returns, 4), columns=columns[1:], index=features.index)
+        result.insert(0, 'fwd_open_premium',
+                      np.round(open_premium(matrices['open'], matrices['pre_close'], rows, cols), 4))
+        return result
+
+    # ---------- 读取 ----------
+
+    def rebuild(self):
+        """删除已有数据集，下次 run 全部重建"""
+        if os.path.isdir(self.output_dir):
+            shutil.rmtree(self.output_dir)
+        self.meta = {'complete': []}
+
+    def read(self, start_date: str = None, end_date: str = None, columns: List[str] = None) -> pd.DataFrame:
+        """读取数据集（分区键 trade_date 读回为整数 YYYYMMDD）"""
+        if not os.path.isdir(self.output_dir):
+            return pd.DataFrame()
+        filters = []
+        if start_date:
+            filters.append(('trade_date', '>=', int(start_date)))
+        if end_date:
+            filters.append(('trade_date', '<=', int(end_date)))
+        return pd.read_parquet(self.output_dir, columns=columns, filters=filters or None)
+
+
+def main():
+    """命令行：增量生成特征数据集"""
+    parser = argparse.ArgumentParser(description='生成个股日度特征数据集（Parquet，按交易日分区）')
+    parser.add_argument('--start', type=str, default='00000000', help='开始日期（YYYYMMDD）')
+    parser.add_argument('--end', type=str, default='99999999', help='结束日期（YYYYMMDD）')
+    parser.add_argument('--window', type=int, help=f'每个窗口的交易日数（默认 {config.RECOMPUTE_WINDOW_DAYS}）')
+    parser.add_argument('--rebuild', action='store_true', help='删除已有数据集后全部重建')
+    args = parser.parse_args()
+
+    # 使用本地缓存的证券主数据（不调用 tushare）
+    exporter = FeatureExporter(security_master=SecurityMaster(SecurityIndex()))
+    if args.rebuild:
+        exporter.rebuild()
+    exporter.run(args.start, args.end, args.window)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,105 +3,803 @@
 负责计算所有市场情绪指标
 """
 
+import hashlib
+
 import pandas as pd
 import numpy as np
-from typing import Dict
+from functools import cached_property
+from typing import Dict, List, Optional
+
+from limit_price import classify_limits
+from security_index import SecurityIndex
+
+
+def parse_time_seconds(values) -> np.ndarray:
+    """
+    时间字符串（'092500'、'93000' 或 '09:25:00'）-> 当日秒数数组，无法解析时为 NaN
+    
+    整列一次向量化转换，面板引擎对多日拼接后的列只解析一次。
+    """
+    text = pd.Series(np.asarray(values, dtype=object)).astype(str).str.replace(':', '', regex=False)
+    hhmmss = pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+    return hhmmss // 10000 * 3600 + hhmmss // 100 % 100 * 60 + hhmmss % 100
+
+
+class DayContext:
+    """
+    单个交易日的派生视图
+    
+    涨跌停拆分、涨停与日线的合并、按连板数分桶、代码集合等在首次使用时计算一次，
+    当日各项指标共享同一份结果；逐日计算时，当日的上下文直接作为下一交易日的
+    前一日上下文传入，无需重新过滤。
+    
+    代码集合以 SecurityIndex 编号的有序 int32 数组表示，跨日成员判断用
+    np.intersect1d / np.isin 完成，不再构造字符串集合。
+    """
+    
+    # 涨停明细需要从日线补充的字段
+    DAILY_MERGE_COLUMNS = ['ts_code', 'open', 'high', 'low', 'pre_close']
+    
+    def __init__(self, data: dict, index: SecurityIndex = None):
+        self.data = data
+        self.index = index if index is not None else SecurityIndex()
+        self.trade_date = data['trade_date']
+        self.daily = self._frame(data.get('daily'))
+        self.limit_data = self._frame(data.get('limit_data'))
+        self.has_limit_data = not self.limit_data.empty and 'limit' in self.limit_data.columns
+        self._boards = {}
+    
+    @classmethod
+    def of(cls, data, index: SecurityIndex = None) -> 'DayContext':
+        """数据字典 -> DayContext（已是使用同一编号字典的 DayContext 时原样返回）"""
+        if isinstance(data, cls):
+            if index is None or data.index is index:
+                return data
+            data = data.data
+        return cls(data, index)
+    
+    @staticmethod
+    def _frame(df) -> pd.DataFrame:
+        return df if df is not None else pd.DataFrame()
+    
+    def _limit_type(self, limit_type: str) -> pd.DataFrame:
+        if not self.has_limit_data:
+            return pd.DataFrame()
+        return self.limit_data[self.limit_data['limit'] == limit_type].copy()
+    
+    @cached_property
+    def limit_up(self) -> pd.DataFrame:
+        """涨停明细（合并了当日日线的 open, high, low, pre_close）"""
+        limit_up_df = self._limit_type('U')
+        if not limit_up_df.empty and not self.daily.empty:
+            columns = [c for c in self.DAILY_MERGE_COLUMNS if c in self.daily.columns]
+            limit_up_df = limit_up_df.merge(self.daily[columns], on='ts_code', how='left')
+        return limit_up_df
+    
+    @cached_property
+    def limit_down(self) -> pd.DataFrame:
+        return self._limit_type('D')
+    
+    @cached_property
+    def break_board(self) -> pd.DataFrame:
+        return self._limit_type('Z')
+    
+    def board(self, min_times: int, max_times: int = None) -> pd.DataFrame:
+        """连板数在 [min_times, max_times] 区间内的涨停明细（max_times 为空表示不设上限）"""
+        key = (min_times, max_times)
+        if key not in self._boards:
+            limit_up_df = self.limit_up
+            if limit_up_df.empty or 'limit_times' not in limit_up_df.columns:
+                self._boards[key] = limit_up_df
+            else:
+                mask = limit_up_df['limit_times'] >= min_times
+                if max_times is not None:
+                    mask &= limit_up_df['limit_times'] <= max_times
+                self._boards[key] = limit_up_df[mask]
+        return self._boards[key]
+    
+    def _unique_ids(self, df: pd.DataFrame) -> np.ndarray:
+        if df.empty:
+            return np.zeros(0, dtype=np.int32)
+        return self.index.encode_unique(df['ts_code'])
+    
+    def board_ids(self, min_times: int, max_times: int = None) -> np.ndarray:
+        """连板数在区间内的涨停股编号（有序、去重）"""
+        key = ('ids', min_times, max_times)
+        if key not in self._boards:
+            self._boards[key] = self._unique_ids(self.board(min_times, max_times))
+        return self._boards[key]
+    
+    @cached_property
+    def limit_up_ids(self) -> np.ndarray:
+        """当日涨停股编号（有序、去重）"""
+        return self._unique_ids(self.limit_up)
+    
+    @cached_property
+    def seal_seconds(self) -> np.ndarray:
+        """涨停明细逐行的首次封板时间（当日秒数，缺失为 NaN）"""
+        if self.limit_up.empty or 'first_time' not in self.limit_up.columns:
+            return np.full(len(self.limit_up), np.nan)
+        return parse_time_seconds(self.limit_up['first_time'])
+    
+    @cached_property
+    def break_board_ids(self) -> np.ndarray:
+        """当日炸板股编号（有序、去重）"""
+        return self._unique_ids(self.break_board)
+    
+    @cached_property
+    def red_ids(self) -> np.ndarray:
+        """当日收红（涨幅 > 0）的股票编号（有序、去重）"""
+        if self.daily.empty or 'pct_chg' not in self.daily.columns:
+            return np.zeros(0, dtype=np.int32)
+        return np.unique(self.daily_ids[(self.daily['pct_chg'] > 0).to_numpy()])
+    
+    @cached_property
+    def traded_ids(self) -> np.ndarray:
+        """当日有交易的股票编号（有序、去重）"""
+        return self._unique_ids(self.daily)
+    
+    @cached_property
+    def daily_ids(self) -> np.ndarray:
+        """与日线逐行对应的股票编号"""
+        if self.daily.empty:
+            return np.zeros(0, dtype=np.int32)
+        return self.index.encode(self.daily['ts_code'])
+    
+    @cached_property
+    def prev_low(self) -> pd.DataFrame:
+        """作为前一日时使用：各股票最低价（ts_code, yesterday_low）"""
+        if self.daily.empty or 'low' not in self.daily.columns:
+            return pd.DataFrame(columns=['ts_code', 'yesterday_low'])
+        return self.daily[['ts_code', 'low']].dropna().rename(columns={'low': 'yesterday_low'})
 
 
 class IndicatorCalculator:
     """市场情绪指标计算器"""
     
-    def __init__(self):
-        """初始化"""
-        pass
+    # 跨日指标（反包、昨日涨停表现、晋级率）需要的前一日最小字段
+    CARRY_COLUMNS = {
+        'limit_data': ['ts_code', 'limit', 'limit_times'],
+        'daily': ['ts_code', 'low'],
+    }
+    
+    # 指标分组及其定义版本、依赖的数据集和列
+    # 修改某一组的计算口径时把该组 version 加 1：库中该组版本落后的行会被标记为过期，
+    # 可用 update_data.py --recompute --stale-only 只重算过期的日期和列；
+    # requires 决定更新时需要向 tushare 获取哪些数据集（见 required_datasets）；
+    # 股票池变化（如剔除 ST、退市、次新股）同样改变各组结果，也需加版本
+    INDICATOR_GROUPS = {
+        'market': {
+            'version': 2,
+            'columns': ['up_count', 'down_count', 'up5_count', 'down5_count'],
+            'requires': {'daily': ['ts_code', 'pct_chg']},
+        },
+        'limit': {
+            'version': 2,
+            'columns': ['limit_up_count', 'limit_down_count', 'break_count', 'break_rate'],
+            'requires': {'limit_data': ['ts_code', 'limit']},
+        },
+        'board': {
+            'version': 2,
+            'columns': ['first_board', 'second_board', 'third_board', 'above_third', 'max_board'],
+            'requires': {'limit_data': ['ts_code', 'limit', 'limit_times']},
+        },
+        'advanced': {
+            'version': 2,
+            'columns': ['fanpao_count', 'limit_amount', 'seal_amount'],
+            'requires': {
+                'limit_data': ['ts_code', 'limit', 'amount', 'fd_amount'],
+                'daily': ['ts_code', 'low'],
+            },
+        },
+        'premium': {
+            'version': 2,
+            'columns': ['first_red_rate', 'first_premium', 'second_red_rate', 'second_premium',
+                        'third_red_rate', 'third_premium', 'third_plus_red_rate', 'third_plus_premium'],
+            'requires': {
+                'limit_data': ['ts_code', 'limit', 'limit_times', 'pct_chg'],
+                'daily': ['ts_code', 'open', 'pre_close', 'pct_chg'],
+            },
+        },
+        'advance': {
+            'version': 3,
+            'columns': ['advance_1to2', 'advance_2to3', 'advance_3to4', 'advance_3plus', 'board_transitions'],
+            'requires': {
+                'limit_data': ['ts_code', 'limit', 'limit_times'],
+                'daily': ['ts_code', 'pct_chg'],
+            },
+        },
+        'near_limit': {
+            'version': 2,
+            'columns': ['near_limit_count'],
+            'requires': {'daily': ['ts_code', 'pre_close', 'close', 'high']},
+        },
+        'seal': {
+            'version': 1,
+            'columns': ['seal_early_count', 'seal_morning_count', 'seal_afternoon_count',
+                        'one_word_rate', 'open_times_median', 'seal_strength'],
+            'requires': {
+                'limit_data': ['ts_code', 'limit', 'first_time', 'open_times', 'fd_amount', 'float_mv'],
+            },
+        },
+        'breadth': {
+            'version': 2,
+            'columns': ['pct_histogram'],
+            'requires': {'daily': ['ts_code', 'pct_chg', 'pre_close', 'close', 'high']},
+        },
+    }
+    
+    # 数组列（不参与分位排名，导出时转为 JSON 文本）
+    ARRAY_COLUMNS = ('board_transitions', 'pct_histogram')
+    
+    # 全市场涨跌幅分布 pct_histogram 的档位：[跌停, -20%~-19%, ..., 19%~20%, 涨停]，
+    # 1% 一档（左闭右开，最后一档含 20%），超出 ±20% 的计入两端档；
+    # 收盘封涨停/跌停（按板块规则计算涨跌停价）的股票计入涨停/跌停档
+    PCT_HIST_EDGES = np.arange(-20, 21, 1)
+    
+    # 封板时间分段（当日秒数）：10:00 前、10:00~12:00（上午）、13:00 后（下午）
+    SEAL_MORNING_START = 10 * 3600
+    SEAL_AFTERNOON_START = 13 * 3600
+    # 集合竞价结束（一字板：竞价即封板且全天未开板）
+    CALL_AUCTION_END = 9 * 3600 + 25 * 60
+    
+    # 按文本处理（不转为数值）的列
+    TEXT_COLUMNS = ('ts_code', 'limit', 'first_time')
+    
+    # 连板晋级矩阵 board_transitions 的列：昨日N板股票今日的表现（互斥，按顺序优先判定）
+    # 再次涨停、炸板、收红（涨幅 > 0）、收绿（涨幅 <= 0）、停牌（今日无日线）；
+    # 第 N-1 行对应昨日N板
+    TRANSITION_OUTCOMES = ['limit_up', 'broken', 'red', 'green', 'suspended']
+    # 今日无日线数据时无法区分收红/收绿/停牌，计入该内部列（不写入矩阵）
+    _OUTCOME_UNKNOWN = len(TRANSITION_OUTCOMES)
+    
+    # 晋级率：昨日连板数区间 [lo, hi]（hi 为空表示不设上限）
+    ADVANCE_BUCKETS = (
+        ('advance_1to2', 1, 1),     # 昨日首板 → 今日任意涨停
+        ('advance_2to3', 2, 2),     # 昨日二板 → 今日任意涨停
+        ('advance_3to4', 3, 3),     # 昨日三板 → 今日任意涨停（3进4）
+        ('advance_3plus', 4, None), # 昨日四板及以上 → 今日任意涨停（3板+晋级，不含3板）
+    )
+    
+    def __init__(self, security_index: SecurityIndex = None, groups: List[str] = None):
+        """
+        初始化
+        
+        Args:
+            security_index: 证券代码字典（默认新建空字典，编号仅在本进程内有效）
+            groups: 启用的指标分组（默认全部）；未启用分组的列不出现在计算结果中
+        """
+        self.security_index = security_index if security_index is not None else SecurityIndex()
+        groups = groups or list(self.INDICATOR_GROUPS)
+        unknown = [g for g in groups if g not in self.INDICATOR_GROUPS]
+        if unknown:
+            raise ValueError(f"未知的指标分组: {unknown}")
+        self.groups = [g for g in self.INDICATOR_GROUPS if g in groups]
+        self._disabled_columns = self.group_columns([g for g in self.INDICATOR_GROUPS if g not in groups])
+    
+    @classmethod
+    def required_datasets(cls, groups: List[str] = None) -> Dict[str, List[str]]:
+        """
+        指定指标分组依赖的数据集及列（各分组需求的并集）
+        
+        Returns:
+            {数据集: [列]}，例如 {'daily': [...], 'limit_data': [...]}；
+            没有分组使用的数据集不会出现
+        """
+        datasets: Dict[str, List[str]] = {}
+        for group in groups or cls.INDICATOR_GROUPS:
+            for dataset, columns in cls.INDICATOR_GROUPS[group]['requires'].items():
+                merged = datasets.setdefault(dataset, [])
+                for col in columns:
+                    if col not in merged:
+                        merged.append(col)
+        return datasets
+    
+    @classmethod
+    def definition_versions(cls, groups: List[str] = None) -> Dict[str, int]:
+        """当前各指标分组的定义版本 {分组: 版本}"""
+        return {group: cls.INDICATOR_GROUPS[group]['version'] for group in groups or cls.INDICATOR_GROUPS}
     
-    def calculate_indicators(self, data: dict, prev_data: dict = None) -> dict:
+    @classmethod
+    def stale_groups(cls, def_versions, groups: List[str] = None) -> List[str]:
+        """
+        与当前定义版本不一致的指标分组
+        
+        Args:
+            def_versions: 行中记录的版本 {分组: 版本}；为空表示未记录版本，视为全部过期
+            groups: 只检查这些分组（默认全部）
+        """
+        groups = groups or list(cls.INDICATOR_GROUPS)
+        if not isinstance(def_versions, dict):
+            return list(groups)
+        stale = []
+        for group in groups:
+            spec = cls.INDICATOR_GROUPS[group]
+            version = def_versions.get(group)
+            if version is None or pd.isna(version) or int(version) != spec['version']:
+                stale.append(group)
+        return stale
+    
+    @classmethod
+    def group_columns(cls, groups: List[str]) -> List[str]:
+        """指标分组 -> 对应的列"""
+        return [col for group in groups for col in cls.INDICATOR_GROUPS[group]['columns']]
+    
+    def _finalize(self, indicators: dict) -> dict:
+        """去掉未启用分组的列，并记录各启用分组的定义版本"""
+        for col in self._disabled_columns:
+            indicators.pop(col, None)
+        indicators['def_versions'] = self.definition_versions(self.groups)
+        return indicators
+    
+    def build_carry_state(self, data: dict) -> dict:
+        """
+        从当日数据中提取次日计算所需的前一日状态
+        
+        只保留涨跌停代码/连板数和日线最低价，体积远小于完整的日线和涨停明细，
+        可持久化后作为下一次运行的 prev_data。
+        
+        Returns:
+            {'trade_date': str, 'limit_data': DataFrame, 'daily': DataFrame}
+        """
+        state = {'trade_date': data['trade_date']}
+        for key, columns in self.CARRY_COLUMNS.items():
+            df = data.get(key, pd.DataFrame())
+            if df is None or df.empty:
+                state[key] = pd.DataFrame(columns=columns)
+            else:
+                state[key] = df[[c for c in columns if c in df.columns]].reset_index(drop=True)
+        return state
+    
+    def build_context(self, data) -> 'DayContext':
+        """构建使用本计算器证券编号的 DayContext"""
+        return DayContext.of(data, self.security_index)
+    
+    def input_fingerprint(self, data: dict, prev_data: dict = None) -> str:
+        """
+        当日指标输入的内容指纹
+        
+        覆盖当日日线、涨跌停数据中参与计算的列，以及前一日的跨日状态
+        （涨跌停代码、连板数、最低价）；指纹不变则当日全部指标不变。
+        数值列统一转为 float 后再哈希，来源不同（tushare / 本地 / 状态快照）时结果一致。
+        """
+        hasher = hashlib.md5()
+        for key, columns in self.PANEL_COLUMNS.items():
+            self._digest_frame(hasher, data.get(key), columns)
+        prev_state = self.build_carry_state(prev_data) if prev_data is not None else {}
+        for key, columns in self.CARRY_COLUMNS.items():
+            self._digest_frame(hasher, prev_state.get(key), columns)
+        return hasher.hexdigest()
+    
+    @staticmethod
+    def _digest_frame(hasher, df: pd.DataFrame, columns: List[str]):
+        if df is None or df.empty:
+            hasher.update(b'\x00')
+            return
+        normalized = pd.DataFrame({
+            col: df[col].astype(str) if col in IndicatorCalculator.TEXT_COLUMNS
+            else pd.to_numeric(df[col], errors='coerce').astype(float)
+            for col in columns if col in df.columns
+        })
+        hasher.update(','.join(normalized.columns).encode('utf-8'))
+        hasher.update(pd.util.hash_pandas_object(normalized, index=False).to_numpy().tobytes())
+    
+    def calculate_indicators(self, data, prev_data=None) -> dict:
         """
         计算指定日期的所有指标
         
         Args:
-            data: 当日数据字典（包含daily, limit_data等）
-            prev_data: 前一日数据字典（用于计算晋级率等）
+            data: 当日数据字典（包含daily, limit_data等），或已构建的 DayContext
+            prev_data: 前一日数据字典或 DayContext（用于计算晋级率等）；
+                       逐日计算时把上一日的 DayContext 传入即可复用，无需重建
             
         Returns:
             指标字典
         """
-        trade_date = data['trade_date']
-        daily_df = data['daily']
-        limit_data_df = data['limit_data']
-        # 昨日日线数据（用于反包等跨日指标）
-        prev_daily_df = pd.DataFrame()
-        if prev_data is not None and isinstance(prev_data, dict):
-            prev_daily_df = prev_data.get('daily', pd.DataFrame())
-        
-        # 根据limit字段分离涨停、跌停、炸板数据
-        if not limit_data_df.empty and 'limit' in limit_data_df.columns:
-            limit_up_df = limit_data_df[limit_data_df['limit'] == 'U'].copy()
-            limit_down_df = limit_data_df[limit_data_df['limit'] == 'D'].copy()
-            break_board_df = limit_data_df[limit_data_df['limit'] == 'Z'].copy()
-        else:
-            limit_up_df = pd.DataFrame()
-            limit_down_df = pd.DataFrame()
-            break_board_df = pd.DataFrame()
-        
-        # 合并涨停数据与日线数据（获取open, high, low等字段）
-        if not limit_up_df.empty and not daily_df.empty:
-            limit_up_df = limit_up_df.merge(
-                daily_df[['ts_code', 'open', 'high', 'low', 'pre_close']],
-                on='ts_code',
-                how='left'
-            )
+        ctx = self.build_context(data)
+        prev_ctx = self.build_context(prev_data) if isinstance(prev_data, (dict, DayContext)) else None
         
         indicators = {
-            'trade_date': trade_date
+            'trade_date': ctx.trade_date
         }
         
         # 1. 市场基础指标
-        indicators.update(self._calc_market_basic(daily_df))
+        indicators.update(self._calc_market_basic(ctx.daily))
         
         # 2. 涨停跌停统计
-        indicators.update(self._calc_limit_stats(limit_up_df, limit_down_df, break_board_df))
+        indicators.update(self._calc_limit_stats(ctx))
         
         # 3. 连板统计
-        indicators.update(self._calc_board_stats(limit_up_df))
+        indicators.update(self._calc_board_stats(ctx))
         
         # 4. 高阶指标（包含反包、涨停金额、封单金额等）
-        indicators.update(self._calc_advanced_indicators(daily_df, limit_up_df, prev_daily_df))
+        indicators.update(self._calc_advanced_indicators(ctx, prev_ctx))
         
         # 5. 红盘率和溢价（当日涨停板的表现）
-        indicators.update(self._calc_red_rate_premium(limit_up_df, daily_df))
+        indicators.update(self._calc_red_rate_premium(ctx))
         
         # 6. 昨日涨停今日表现（需要前一日数据）
-        if prev_data is not None and not prev_data.get('limit_data', pd.DataFrame()).empty:
-            # 从前一日数据中提取涨停数据
-            prev_limit_data = prev_data['limit_data']
-            if not prev_limit_data.empty and 'limit' in prev_limit_data.columns:
-                prev_limit_up_df = prev_limit_data[prev_limit_data['limit'] == 'U'].copy()
-                indicators.update(self._calc_yesterday_performance(prev_limit_up_df, daily_df))
-        
-        # 7. 晋级率（需要前一日数据）
-        if prev_data is not None and not prev_data.get('limit_data', pd.DataFrame()).empty:
-            # 从前一日数据中提取涨停数据
-            prev_limit_data = prev_data['limit_data']
-            if not prev_limit_data.empty and 'limit' in prev_limit_data.columns:
-                prev_limit_up_df = prev_limit_data[prev_limit_data['limit'] == 'U'].copy()
-                indicators.update(self._calc_advance_rate(limit_up_df, prev_limit_up_df, daily_df, prev_data.get('daily', pd.DataFrame())))
-            else:
-                indicators.update({
-                    'advance_1to2': None,
-                    'advance_2to3': None,
-                    'advance_3to4': None,
-                    'advance_3plus': None
-                })
+        if prev_ctx is not None and prev_ctx.has_limit_data:
+            indicators.update(self._calc_yesterday_performance(prev_ctx, ctx))
+        
+        # 7. 封板质量（封板时间、一字板、开板次数、封单强度）
+        indicators.update(self._calc_seal_quality(ctx))
+        
+        # 8. 接近涨停（按日线本地计算涨停价）
+        indicators['near_limit_count'] = self._calc_near_limit(ctx.daily, ctx.trade_date)
+        
+        # 9. 连板晋级矩阵和晋级率（需要前一日数据）
+        if prev_ctx is not None and prev_ctx.has_limit_data:
+            indicators.update(self._calc_advance_rate(ctx, prev_ctx))
         else:
             indicators.update({
                 'advance_1to2': None,
                 'advance_2to3': None,
                 'advance_3to4': None,
-                'advance_3plus': None
+                'advance_3plus': None,
+                'board_transitions': None
             })
         
-        return indicators
+        # 10. 全市场涨跌幅分布
+        indicators['pct_histogram'] = self._calc_pct_histogram(ctx.daily, ctx.trade_date)
+        
+        return self._finalize(indicators)
+    
+    # 面板引擎用到的列（覆盖全部指标分组的 requires）；
+    # is_st 由 SecurityMaster.filter_day 在不剔除 ST 时加入，用于按 ST 涨跌幅限制计算涨跌停价
+    PANEL_COLUMNS = {
+        'daily': ['ts_code', 'pct_chg', 'open', 'low', 'pre_close', 'close', 'high', 'is_st'],
+        'limit_data': ['ts_code', 'limit', 'limit_times', 'pct_chg', 'amount', 'fd_amount',
+                       'first_time', 'open_times', 'float_mv'],
+    }
+    
+    def calculate_indicators_batch(self, all_data: List[dict], prev_data: dict = None) -> List[dict]:
+        """
+        批量计算多个交易日的指标（向量化面板引擎）
+        
+        把多日的日线和涨跌停数据拼接成一张面板，以 (交易日序号, 证券序号) 组成整数键，
+        所有分组统计一次完成；跨日指标通过把键平移一个交易日（滞后自连接）实现，
+        不再逐日过滤和合并。结果与逐日调用 calculate_indicators 完全一致。
+        
+        Args:
+            all_data: 按日期升序排列的当日数据字典列表
+            prev_data: all_data 第一天的前一日数据（可选）
+            
+        Returns:
+            指标字典列表，与 all_data 一一对应
+        """
+        if not all_data:
+            return []
+        
+        days = ([prev_data] if prev_data is not None else []) + list(all_data)
+        offset = len(days) - len(all_data)
+        n = len(days)
+        
+        daily, d_di = self._stack_frames(days, 'daily')
+        limit, l_di = self._stack_frames(days, 'limit_data', require='limit')
+        
+        has_daily = np.zeros(n, dtype=bool)
+        has_limit = np.zeros(n, dtype=bool)
+        has_daily[d_di] = True
+        has_limit[l_di] = True
+        
+        # (交易日序号, 证券序号) -> 整数键；前一日同一证券的键 = 当前键 - n_codes
+        codes = self.security_index.encode(np.concatenate([daily['ts_code'], limit['ts_code']])).astype(np.int64)
+        n_codes = max(len(self.security_index), 1)
+        daily_keys = d_di * n_codes + codes[:len(d_di)]
+        limit_keys = l_di * n_codes + codes[len(d_di):]
+        daily_order = np.argsort(daily_keys, kind='stable')
+        daily_sorted = daily_keys[daily_order]
+        
+        def lookup_daily(keys: np.ndarray, column: str) -> np.ndarray:
+            """按键取日线列的值，找不到时为 NaN"""
+            values = self._column(daily, column)
+            pos = np.searchsorted(daily_sorted, keys)
+            pos = np.minimum(pos, max(len(daily_sorted) - 1, 0))
+            found = (daily_sorted[pos] == keys) if len(daily_sorted) else np.zeros(len(keys), dtype=bool)
+            result = np.full(len(keys), np.nan)
+            result[found] = values[daily_order[pos[found]]]
+            return result
+        
+        # ---- 市场基础指标 ----
+        pct = self._column(daily, 'pct_chg')
+        up_count = np.bincount(d_di[pct > 0], minlength=n)
+        down_count = np.bincount(d_di[pct < 0], minlength=n)
+        up5_count = np.bincount(d_di[pct >= 5], minlength=n)
+        down5_count = np.bincount(d_di[pct <= -5], minlength=n)
+        
+        # 接近涨停、收盘封涨停/跌停（涨停价按各行所属交易日的板块规则计算）
+        if {'pre_close', 'close', 'high'}.issubset(daily):
+            trade_dates = np.array([int(day['trade_date']) for day in days], dtype=np.int64)
+            status = classify_limits(
+                pd.DataFrame({col: daily[col] for col in ('ts_code', 'pre_close', 'close', 'high')}),
+                trade_dates[d_di],
+                self._st_flags(daily.get('is_st')),
+            )
+            near_limit_count = np.bincount(d_di[status['near_limit']], minlength=n)
+            sealed_up, sealed_down = status['sealed_up'], status['sealed_down']
+        else:
+            near_limit_count = np.zeros(n, dtype=int)
+            sealed_up = sealed_down = np.zeros(len(d_di), dtype=bool)
+        
+        # 全市场涨跌幅分布：所有交易日一次计数（交易日序号 × 档位）
+        hist_bins = self._pct_hist_bins(pct, sealed_up, sealed_down)
+        n_hist = len(self.PCT_HIST_EDGES) + 1
+        hist_valid = hist_bins >= 0
+        pct_histogram = np.bincount(d_di[hist_valid] * n_hist + hist_bins[hist_valid],
+                                    minlength=n * n_hist).reshape(n, n_hist)
+        
+        # ---- 涨跌停、连板统计 ----
+        l_type = limit.get('limit', np.zeros(0, dtype=object))
+        l_times = self._column(limit, 'limit_times')
+        is_up = l_type == 'U'
+        limit_up_count = np.bincount(l_di[is_up], minlength=n)
+        limit_down_count = np.bincount(l_di[l_type == 'D'], minlength=n)
+        break_count = np.bincount(l_di[l_type == 'Z'], minlength=n)
+        first_board = np.bincount(l_di[is_up & (l_times == 1)], minlength=n)
+        second_board = np.bincount(l_di[is_up & (l_times == 2)], minlength=n)
+        third_board = np.bincount(l_di[is_up & (l_times == 3)], minlength=n)
+        above_third = np.bincount(l_di[is_up & (l_times >= 3)], minlength=n)
+        max_times = np.full(n, -np.inf)
+        valid_times = is_up & ~np.isnan(l_times)
+        np.maximum.at(max_times, l_di[valid_times], l_times[valid_times])
+        
+        # ---- 今日涨停（附当日日线的 open/low/pre_close）----
+        u_di = l_di[is_up]
+        u_keys = limit_keys[is_up]
+        u_times = l_times[is_up]
+        u_pct = self._column(limit, 'pct_chg')[is_up]
+        
+        # 涨停金额、封单金额（按涨停明细原始顺序求和）
+        amount_sum, _ = self._segment_sums(u_di, self._column(limit, 'amount')[is_up], n)
+        seal_sum, _ = self._segment_sums(u_di, self._column(limit, 'fd_amount')[is_up], n)
+        has_amount = 'amount' in limit
+        has_fd_amount = 'fd_amount' in limit
+        
+        # 封板质量：首次封板时间整列只解析一次
+        u_secs = parse_time_seconds(limit['first_time'][is_up]) if 'first_time' in limit \
+            else np.full(len(u_di), np.nan)
+        u_open_times = self._column(limit, 'open_times')[is_up]
+        seal_early = np.bincount(u_di[u_secs < self.SEAL_MORNING_START], minlength=n)
+        seal_morning = np.bincount(u_di[(u_secs >= self.SEAL_MORNING_START)
+                                        & (u_secs < self.SEAL_AFTERNOON_START)], minlength=n)
+        seal_afternoon = np.bincount(u_di[u_secs >= self.SEAL_AFTERNOON_START], minlength=n)
+        one_word = np.bincount(u_di[(u_secs <= self.CALL_AUCTION_END) & (u_open_times == 0)], minlength=n)
+        has_seal_time = np.bincount(u_di[~np.isnan(u_secs)], minlength=n) > 0
+        open_times_median = self._segment_medians(u_di, u_open_times, n)
+        seal_strength = self._segment_medians(
+            u_di, self._column(limit, 'fd_amount')[is_up] / self._column(limit, 'float_mv')[is_up] * 100, n)
+        
+        # 反包：今日涨停且最低价 < 昨日最低价（键平移一日即为昨日日线）
+        u_low = lookup_daily(u_keys, 'low')
+        u_prev_low = lookup_daily(u_keys - n_codes, 'low')
+        fanpao_count = np.bincount(u_di[u_low < u_prev_low], minlength=n)
+        
+        # 今日N板（红盘：开盘 >= 昨收；溢价：平均涨幅）
+        u_red = lookup_daily(u_keys, 'open') >= lookup_daily(u_keys, 'pre_close')
+        today_stats = {}
+        for name, mask in (('first', u_times == 1), ('second', u_times == 2), ('third', u_times >= 3)):
+            sums, valid = self._segment_sums(u_di[mask], u_pct[mask], n)
+            today_stats[name] = (
+                np.bincount(u_di[mask], minlength=n),
+                np.bincount(u_di[mask & u_red], minlength=n),
+                sums,
+                valid,
+            )
+        
+        # ---- 昨日涨停（滞后一日）----
+        prev_keys = u_keys + n_codes
+        prev_order = np.argsort(prev_keys, kind='stable')
+        prev_sorted = prev_keys[prev_order]
+        prev_up_count = np.bincount(np.minimum(u_di + 1, n), minlength=n + 1)[:n]
+        
+        # 昨日N板今日表现：按今日日线的原始顺序取出昨日涨停股
+        in_prev = np.isin(daily_keys, prev_keys)
+        p_di = d_di[in_prev]
+        p_pct = pct[in_prev]
+        p_times = u_times[prev_order[np.searchsorted(prev_sorted, daily_keys[in_prev])]]
+        yesterday_stats = {}
+        for name, mask in (('first', p_times == 1), ('second', p_times == 2),
+                           ('third', p_times == 3), ('third_plus', p_times >= 3)):
+            sums, valid = self._segment_sums(p_di[mask], p_pct[mask], n)
+            yesterday_stats[name] = (
+                np.bincount(p_di[mask], minlength=n),
+                np.bincount(p_di[mask & (p_pct > 0)], minlength=n),
+                sums,
+                valid,
+            )
+        
+        # 连板晋级矩阵：昨日N板 × 今日表现，所有交易日一次交叉计数
+        in_range = (u_di + 1 < n) & ~np.isnan(u_times)
+        a_di = u_di[in_range] + 1
+        a_keys = prev_keys[in_range]
+        a_levels = u_times[in_range].astype(np.int64)
+        a_outcomes = self._transition_outcomes(
+            is_limit_up=np.isin(a_keys, u_keys),
+            is_broken=np.isin(a_keys, limit_keys[l_type == 'Z']),
+            has_daily=has_daily[a_di],
+            is_traded=np.isin(a_keys, daily_keys),
+            is_red=np.isin(a_keys, daily_keys[pct > 0]),
+        )
+        transitions = np.zeros((n, int(a_levels.max()) if len(a_levels) else 0, self._OUTCOME_UNKNOWN + 1),
+                               dtype=np.int64)
+        np.add.at(transitions, (a_di, a_levels - 1, a_outcomes), 1)
+        
+        # ---- 组装结果 ----
+        results = []
+        for i in range(offset, n):
+            n_up = int(limit_up_count[i])
+            n_break = int(break_count[i])
+            break_rate = n_break / (n_up + n_break) * 100 if n_up + n_break > 0 else 0
+            seal_timed = n_up == 0 or has_seal_time[i]
+            
+            indicators = {
+                'trade_date': days[i]['trade_date'],
+                'up_count': int(up_count[i]),
+                'down_count': int(down_count[i]),
+                'up5_count': int(up5_count[i]),
+                'down5_count': int(down5_count[i]),
+                'limit_up_count': n_up,
+                'limit_down_count': int(limit_down_count[i]),
+                'break_count': n_break,
+                'break_rate': round(break_rate, 2),
+                'near_limit_count': int(near_limit_count[i]),
+                'pct_histogram': pct_histogram[i].tolist() if has_daily[i] else None,
+                'seal_early_count': int(seal_early[i]) if seal_timed else None,
+                'seal_morning_count': int(seal_morning[i]) if seal_timed else None,
+                'seal_afternoon_count': int(seal_afternoon[i]) if seal_timed else None,
+                'one_word_rate': round(int(one_word[i]) / n_up * 100, 2) if n_up > 0 and has_seal_time[i] else None,
+                'open_times_median': self._round_or_none(open_times_median[i]),
+                'seal_strength': self._round_or_none(seal_strength[i]),
+            }
+            
+            if n_up == 0:
+                indicators.update({
+                    'first_board': 0,
+                    'second_board': 0,
+                    'third_board': 0,
+                    'above_third': 0,
+                    'max_board': 0,
+                    'fanpao_count': 0,
+                    'limit_amount': 0,
+                    'seal_amount': 0,
+                })
+            else:
+                indicators.update({
+                    'first_board': int(first_board[i]),
+                    'second_board': int(second_board[i]),
+                    'third_board': int(third_board[i]),
+                    'above_third': int(above_third[i]),
+                    'max_board': int(max_times[i]) if np.isfinite(max_times[i]) else 0,
+                    'fanpao_count': int(fanpao_count[i]),
+                    'limit_amount': round(amount_sum[i] / 1e8, 2) if has_amount else 0,
+                    'seal_amount': round(seal_sum[i] / 1e8, 2) if has_fd_amount else 0,
+                })
+            
+            prev_has_limit = i > 0 and has_limit[i - 1]
+            if prev_has_limit:
+                # 昨日涨停今日表现
+                for name in ('first', 'second', 'third', 'third_plus'):
+                    indicators.update(self._rate_premium(name, yesterday_stats[name], i,
+                                                         prev_up_count[i] > 0 and has_daily[i]))
+            else:
+                # 今日涨停板表现
+                for name in ('first', 'second', 'third'):
+                    indicators.update(self._rate_premium(name, today_stats[name], i, True,
+                                                         with_red=has_daily[i]))
+            
+            if prev_has_limit:
+                indicators.update(self._summarize_transitions(transitions[i], n_up,
+                                                              has_limit[i] and has_daily[i]))
+            else:
+                indicators.update({name: None for name, _, _ in self.ADVANCE_BUCKETS})
+                indicators['board_transitions'] = None
+            
+            results.append(self._finalize(indicators))
+        
+        return results
+    
+    @classmethod
+    def _stack_frames(cls, days: List[dict], key: str, require: str = None):
+        """
+        把多日数据按列拼成一张面板（只保留面板引擎用到的列）
+        
+        直接拼接各列的 numpy 数组，避免逐日构造 DataFrame 的开销。
+        
+        Returns:
+            ({列名: 数组}, 每行对应的交易日序号数组)；
+            某列在所有交易日都不存在时不出现在字典中
+        """
+        frames = []
+        positions = []
+        for i, day in enumerate(days):
+            df = day.get(key)
+            if df is None or df.empty or (require and require not in df.columns):
+                continue
+            frames.append(df)
+            positions.append(np.full(len(df), i))
+        
+        panel = {}
+        for col in cls.PANEL_COLUMNS[key]:
+            if not any(col in df.columns for df in frames):
+                continue
+            if col in cls.TEXT_COLUMNS:
+                parts = [df[col].to_numpy(dtype=object) if col in df.columns
+                         else np.full(len(df), None, dtype=object) for df in frames]
+            else:
+                parts = [pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col in df.columns
+                         else np.full(len(df), np.nan) for df in frames]
+            panel[col] = np.concatenate(parts)
+        panel.setdefault('ts_code', np.zeros(0, dtype=object))
+        di = np.concatenate(positions) if positions else np.zeros(0, dtype=int)
+        return panel, di
+    
+    @staticmethod
+    def _column(panel: dict, name: str) -> np.ndarray:
+        """取面板中的数值列，列不存在时返回全 NaN"""
+        if name in panel:
+            return panel[name]
+        return np.full(len(panel['ts_code']), np.nan)
+    
+    @staticmethod
+    def _segment_sums(keys: np.ndarray, values: np.ndarray, n: int):
+        """
+        按交易日序号分段求和（跳过 NaN）
+        
+        逐段调用 numpy 求和而不是 groupby，保证与逐日计算时 pandas 的求和顺序
+        完全相同，四舍五入结果逐位一致。
+        
+        Returns:
+            (各段之和, 各段非空个数)
+        """
+        sums = np.zeros(n)
+        valid = np.zeros(n, dtype=int)
+        if len(keys) == 0:
+            return sums, valid
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        values = values[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        for segment_keys, segment in zip(np.split(keys, bounds), np.split(values, bounds)):
+            notna = ~np.isnan(segment)
+            sums[segment_keys[0]] = np.where(notna, segment, 0).sum()
+            valid[segment_keys[0]] = notna.sum()
+        return sums, valid
+    
+    @staticmethod
+    def _segment_medians(keys: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+        """按交易日序号分段取中位数（跳过 NaN），没有有效值的交易日为 NaN"""
+        medians = np.full(n, np.nan)
+        valid = ~np.isnan(values)
+        keys = keys[valid]
+        values = values[valid]
+        if len(keys) == 0:
+            return medians
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        values = values[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        for segment_keys, segment in zip(np.split(keys, bounds), np.split(values, bounds)):
+            medians[segment_keys[0]] = np.median(segment)
+        return medians
+    
+    @staticmethod
+    def _round_or_none(value) -> float:
+        """NaN -> None，否则保留两位小数"""
+        return None if np.isnan(value) else round(float(value), 2)
+    
+    @staticmethod
+    def _rate_premium(name: str, stats: tuple, i: int, enabled: bool, with_red: bool = True) -> dict:
+        """由分段统计结果生成 {name}_red_rate / {name}_premium"""
+        count, red, sums, valid = stats
+        result = {f'{name}_red_rate': None, f'{name}_premium': None}
+        if not enabled or count[i] == 0:
+            return result
+        if with_red:
+            result[f'{name}_red_rate'] = round(int(red[i]) / int(count[i]) * 100, 2)
+        mean = np.float64(sums[i]) / valid[i] if valid[i] > 0 else np.float64(np.nan)
+        result[f'{name}_premium'] = round(mean, 2)
+        return result
     
     def _calc_market_basic(self, daily_df: pd.DataFrame) -> dict:
         """计算市场基础指标"""
@@ -128,13 +826,95 @@ class IndicatorCalculator:
             'down5_count': down5_count
         }
     
-    def _calc_limit_stats(self, limit_up_df: pd.DataFrame, 
-                          limit_down_df: pd.DataFrame,
-                          break_board_df: pd.DataFrame) -> dict:
+    def _calc_seal_quality(self, ctx: 'DayContext') -> dict:
+        """
+        计算封板质量（基于当日涨停明细）
+        
+        - 封板时间分布：首次封板在 10:00 前 / 10:00~12:00 / 13:00 后的家数
+        - 一字板占比：集合竞价即封板（first_time <= 09:25:00）且全天未开板的比例
+        - 开板次数中位数：open_times 的中位数
+        - 封单强度：封单金额 / 流通市值（%）的中位数
+        """
+        limit_up_df = ctx.limit_up
+        secs = ctx.seal_seconds
+        n_up = len(limit_up_df)
+        
+        def column(name: str) -> np.ndarray:
+            if name not in limit_up_df.columns:
+                return np.full(n_up, np.nan)
+            return pd.to_numeric(limit_up_df[name], errors='coerce').to_numpy(dtype=float)
+        
+        open_times = column('open_times')
+        strength = column('fd_amount') / column('float_mv') * 100
+        one_word = (secs <= self.CALL_AUCTION_END) & (open_times == 0)
+        has_seal_time = bool((~np.isnan(secs)).any())
+        # 有涨停但都没有首次封板时间（如由日线推导的涨跌停数据）时封板时间分布未知
+        seal_timed = n_up == 0 or has_seal_time
+        return {
+            'seal_early_count': int((secs < self.SEAL_MORNING_START).sum()) if seal_timed else None,
+            'seal_morning_count': int(((secs >= self.SEAL_MORNING_START) & (secs < self.SEAL_AFTERNOON_START)).sum())
+                                  if seal_timed else None,
+            'seal_afternoon_count': int((secs >= self.SEAL_AFTERNOON_START).sum()) if seal_timed else None,
+            'one_word_rate': round(int(one_word.sum()) / n_up * 100, 2) if n_up > 0 and has_seal_time else None,
+            'open_times_median': self._round_or_none(np.median(open_times[~np.isnan(open_times)]))
+                                 if (~np.isnan(open_times)).any() else None,
+            'seal_strength': self._round_or_none(np.median(strength[~np.isnan(strength)]))
+                             if (~np.isnan(strength)).any() else None,
+        }
+    
+    def _calc_near_limit(self, daily_df: pd.DataFrame, trade_date: str) -> int:
+        """
+        接近涨停家数：最高价距涨停价不超过昨收的 NEAR_LIMIT_PCT%，但盘中未触及涨停
+        
+        涨停价按板块规则本地计算（见 limit_price）；ST 股票默认已在计算前剔除（EXCLUDE_ST），
+        不剔除时按日线的 is_st 列使用 ST 涨跌幅限制。
+        """
+        if daily_df.empty or not {'pre_close', 'close', 'high'}.issubset(daily_df.columns):
+            return 0
+        return int(classify_limits(daily_df, trade_date, self._st_flags(daily_df.get('is_st')))['near_limit'].sum())
+    
+    @staticmethod
+    def _st_flags(values) -> Optional[np.ndarray]:
+        """日线 is_st 列 -> 布尔数组（列不存在时为 None；拼接面板中缺失的值视为非 ST）"""
+        if values is None:
+            return None
+        return np.nan_to_num(pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)) > 0
+    
+    @classmethod
+    def _pct_hist_bins(cls, pct: np.ndarray, sealed_up: np.ndarray, sealed_down: np.ndarray) -> np.ndarray:
+        """涨跌幅 -> pct_histogram 的档位序号（与 np.histogram 按 PCT_HIST_EDGES 分档一致，涨跌幅缺失为 -1）"""
+        edges = cls.PCT_HIST_EDGES
+        n_middle = len(edges) - 1
+        with np.errstate(invalid='ignore'):
+            middle = np.clip(np.floor(np.nan_to_num(pct)) - edges[0], 0, n_middle - 1).astype(np.int64) + 1
+        bins = np.where(sealed_up, n_middle + 1, np.where(sealed_down, 0, middle))
+        return np.where(np.isnan(pct), -1, bins)
+    
+    def _calc_pct_histogram(self, daily_df: pd.DataFrame, trade_date: str) -> Optional[List[int]]:
+        """
+        全市场涨跌幅分布（见 PCT_HIST_EDGES）：[跌停, 1% 一档的 40 档, 涨停]
+        
+        缺少 pre_close/close/high 时无法判定封板，涨跌停档为 0、全部按涨跌幅分档。
+        """
+        if daily_df.empty:
+            return None
+        pct = pd.to_numeric(daily_df['pct_chg'], errors='coerce').to_numpy(dtype=float)
+        if {'pre_close', 'close', 'high'}.issubset(daily_df.columns):
+            status = classify_limits(daily_df, trade_date, self._st_flags(daily_df.get('is_st')))
+            sealed_up, sealed_down = status['sealed_up'], status['sealed_down']
+        else:
+            sealed_up = sealed_down = np.zeros(len(pct), dtype=bool)
+        valid = ~np.isnan(pct)
+        middle = pct[valid & ~sealed_up & ~sealed_down]
+        edges = self.PCT_HIST_EDGES
+        counts, _ = np.histogram(np.clip(middle, edges[0], edges[-1]), bins=edges)
+        return [int((valid & sealed_down).sum()), *counts.tolist(), int((valid & sealed_up).sum())]
+    
+    def _calc_limit_stats(self, ctx: 'DayContext') -> dict:
         """计算涨停跌停统计"""
-        limit_up_count = len(limit_up_df)
-        limit_down_count = len(limit_down_df)
-        break_count = len(break_board_df)
+        limit_up_count = len(ctx.limit_up)
+        limit_down_count = len(ctx.limit_down)
+        break_count = len(ctx.break_board)
         
         # 炸板率 = 炸板数 / (涨停数 + 炸板数)
         if limit_up_count + break_count > 0:
@@ -149,8 +929,9 @@ class IndicatorCalculator:
             'break_rate': round(break_rate, 2)
         }
     
-    def _calc_board_stats(self, limit_up_df: pd.DataFrame) -> dict:
+    def _calc_board_stats(self, ctx: 'DayContext') -> dict:
         """计算连板统计"""
+        limit_up_df = ctx.limit_up
         if limit_up_df.empty:
             return {
                 'first_board': 0,
@@ -161,10 +942,10 @@ class IndicatorCalculator:
             }
         
         # 连板数统计
-        first_board = len(limit_up_df[limit_up_df['limit_times'] == 1])
-        second_board = len(limit_up_df[limit_up_df['limit_times'] == 2])
-        third_board = len(limit_up_df[limit_up_df['limit_times'] == 3])
-        above_third = len(limit_up_df[limit_up_df['limit_times'] >= 3])
+        first_board = len(ctx.board(1, 1))
+        second_board = len(ctx.board(2, 2))
+        third_board = len(ctx.board(3, 3))
+        above_third = len(ctx.board(3))
         
         # 最高板
         max_board = int(limit_up_df['limit_times'].max()) if not limit_up_df['limit_times'].isna().all() else 0
@@ -177,15 +958,14 @@ class IndicatorCalculator:
             'max_board': max_board
         }
     
-    def _calc_advanced_indicators(self, daily_df: pd.DataFrame,
-                                   limit_up_df: pd.DataFrame,
-                                   prev_daily_df: pd.DataFrame) -> dict:
+    def _calc_advanced_indicators(self, ctx: 'DayContext', prev_ctx: 'DayContext' = None) -> dict:
         """
         计算高阶指标
 
         - 反包涨停：今日涨停，且今天最低价 < 昨日最低价
-          （需要用到昨日日线数据 prev_daily_df）
+          （需要用到昨日日线数据 prev_ctx.daily）
         """
+        limit_up_df = ctx.limit_up
         if limit_up_df.empty:
             return {
                 'fanpao_count': 0,
@@ -195,10 +975,9 @@ class IndicatorCalculator:
         
         # 反包涨停：今日涨停且最低价 < 昨日最低价
         fanpao_count = 0
-        if not prev_daily_df.empty and 'low' in limit_up_df.columns:
+        if prev_ctx is not None and not prev_ctx.daily.empty and 'low' in limit_up_df.columns:
             # 取昨日日线中的最低价
-            prev_low = prev_daily_df[['ts_code', 'low']].dropna().rename(columns={'low': 'yesterday_low'})
-            merged = limit_up_df.merge(prev_low, on='ts_code', how='left')
+            merged = limit_up_df.merge(prev_ctx.prev_low, on='ts_code', how='left')
             if 'yesterday_low' in merged.columns:
                 fanpao_mask = (merged['yesterday_low'].notna()) & (merged['low'] < merged['yesterday_low'])
                 fanpao_count = int(fanpao_mask.sum())
@@ -224,7 +1003,7 @@ class IndicatorCalculator:
             'seal_amount': round(seal_amount, 2)
         }
     
-    def _calc_red_rate_premium(self, limit_up_df: pd.DataFrame, daily_df: pd.DataFrame) -> dict:
+    def _calc_red_rate_premium(self, ctx: 'DayContext') -> dict:
         """
         计算红盘率和溢价
         
@@ -240,45 +1019,27 @@ class IndicatorCalculator:
             'third_premium': None
         }
         
-        if limit_up_df.empty:
+        if ctx.limit_up.empty:
             return result
         
-        # 首板
-        first_df = limit_up_df[limit_up_df['limit_times'] == 1]
-        if len(first_df) > 0:
+        # 首板、二板、三板以上
+        for name, board_df in (('first', ctx.board(1, 1)),
+                               ('second', ctx.board(2, 2)),
+                               ('third', ctx.board(3))):
+            if len(board_df) == 0:
+                continue
             # 红盘率：开盘价 >= 昨收价的比例
-            if 'open' in first_df.columns and 'pre_close' in first_df.columns:
-                red_count = len(first_df[first_df['open'] >= first_df['pre_close']])
-                result['first_red_rate'] = round(red_count / len(first_df) * 100, 2)
+            if 'open' in board_df.columns and 'pre_close' in board_df.columns:
+                red_count = len(board_df[board_df['open'] >= board_df['pre_close']])
+                result[f'{name}_red_rate'] = round(red_count / len(board_df) * 100, 2)
             
             # 溢价：平均涨幅
-            if 'pct_chg' in first_df.columns:
-                result['first_premium'] = round(first_df['pct_chg'].mean(), 2)
-        
-        # 二板
-        second_df = limit_up_df[limit_up_df['limit_times'] == 2]
-        if len(second_df) > 0:
-            if 'open' in second_df.columns and 'pre_close' in second_df.columns:
-                red_count = len(second_df[second_df['open'] >= second_df['pre_close']])
-                result['second_red_rate'] = round(red_count / len(second_df) * 100, 2)
-            
-            if 'pct_chg' in second_df.columns:
-                result['second_premium'] = round(second_df['pct_chg'].mean(), 2)
-        
-        # 三板以上
-        third_df = limit_up_df[limit_up_df['limit_times'] >= 3]
-        if len(third_df) > 0:
-            if 'open' in third_df.columns and 'pre_close' in third_df.columns:
-                red_count = len(third_df[third_df['open'] >= third_df['pre_close']])
-                result['third_red_rate'] = round(red_count / len(third_df) * 100, 2)
-            
-            if 'pct_chg' in third_df.columns:
-                result['third_premium'] = round(third_df['pct_chg'].mean(), 2)
+            if 'pct_chg' in board_df.columns:
+                result[f'{name}_premium'] = round(board_df['pct_chg'].mean(), 2)
         
         return result
     
-    def _calc_yesterday_performance(self, yesterday_limit_up_df: pd.DataFrame, 
-                                     today_daily_df: pd.DataFrame) -> dict:
+    def _calc_yesterday_performance(self, prev_ctx: 'DayContext', ctx: 'DayContext') -> dict:
         """
         计算昨日涨停股票今日的表现（用于红盘率和溢价）
         
@@ -303,57 +1064,34 @@ class IndicatorCalculator:
             'third_plus_premium': None,
         }
         
-        if yesterday_limit_up_df.empty or today_daily_df.empty:
+        today_daily_df = ctx.daily
+        if prev_ctx.limit_up.empty or today_daily_df.empty:
             return result
         
-        # 昨日首板股票
-        yesterday_first = yesterday_limit_up_df[yesterday_limit_up_df['limit_times'] == 1]['ts_code'].tolist()
-        if yesterday_first:
-            today_performance = today_daily_df[today_daily_df['ts_code'].isin(yesterday_first)]
+        # 昨日首板、二板、三板（严格 =3）、3板及以上（3板+）
+        for name, lo, hi in (('first', 1, 1), ('second', 2, 2),
+                             ('third', 3, 3), ('third_plus', 3, None)):
+            yesterday_ids = prev_ctx.board_ids(lo, hi)
+            if len(yesterday_ids) == 0:
+                continue
+            today_performance = today_daily_df[np.isin(ctx.daily_ids, yesterday_ids)]
             if not today_performance.empty:
                 # 溢价：今日平均涨幅
-                result['first_premium'] = round(today_performance['pct_chg'].mean(), 2)
+                result[f'{name}_premium'] = round(today_performance['pct_chg'].mean(), 2)
                 # 红盘率：今日涨幅 > 0 的比例
                 red_count = len(today_performance[today_performance['pct_chg'] > 0])
-                result['first_red_rate'] = round(red_count / len(today_performance) * 100, 2)
-        
-        # 昨日二板股票
-        yesterday_second = yesterday_limit_up_df[yesterday_limit_up_df['limit_times'] == 2]['ts_code'].tolist()
-        if yesterday_second:
-            today_performance = today_daily_df[today_daily_df['ts_code'].isin(yesterday_second)]
-            if not today_performance.empty:
-                result['second_premium'] = round(today_performance['pct_chg'].mean(), 2)
-                red_count = len(today_performance[today_performance['pct_chg'] > 0])
-                result['second_red_rate'] = round(red_count / len(today_performance) * 100, 2)
-        
-        # 昨日三板（严格 =3）
-        yesterday_third = yesterday_limit_up_df[yesterday_limit_up_df['limit_times'] == 3]['ts_code'].tolist()
-        if yesterday_third:
-            today_performance = today_daily_df[today_daily_df['ts_code'].isin(yesterday_third)]
-            if not today_performance.empty:
-                result['third_premium'] = round(today_performance['pct_chg'].mean(), 2)
-                red_count = len(today_performance[today_performance['pct_chg'] > 0])
-                result['third_red_rate'] = round(red_count / len(today_performance) * 100, 2)
-
-        # 昨日3板及以上（3板+）
-        yesterday_third_plus = yesterday_limit_up_df[yesterday_limit_up_df['limit_times'] >= 3]['ts_code'].tolist()
-        if yesterday_third_plus:
-            today_performance = today_daily_df[today_daily_df['ts_code'].isin(yesterday_third_plus)]
-            if not today_performance.empty:
-                result['third_plus_premium'] = round(today_performance['pct_chg'].mean(), 2)
-                red_count = len(today_performance[today_performance['pct_chg'] > 0])
-                result['third_plus_red_rate'] = round(red_count / len(today_performance) * 100, 2)
+                result[f'{name}_red_rate'] = round(red_count / len(today_performance) * 100, 2)
         
         return result
     
-    def _calc_advance_rate(self, today_limit_df: pd.DataFrame, 
-                           yesterday_limit_df: pd.DataFrame,
-                           today_daily_df: pd.DataFrame,
-                           yesterday_daily_df: pd.DataFrame) -> dict:
+    def _calc_advance_rate(self, ctx: 'DayContext', prev_ctx: 'DayContext') -> dict:
         """
-        计算晋级率（修正版）
+        计算连板晋级矩阵和晋级率
+        
+        连板晋级矩阵：昨日每只涨停股按其连板数（limit_times）和今日表现交叉计数，
+        见 TRANSITION_OUTCOMES；今日无涨跌停或日线数据时为空。
         
-        算法说明（分母仅统计「昨日N板且今日有交易」的股票，避免停牌拉低晋级率）：
+        晋级率由矩阵汇总（分母仅统计「昨日N板且今日有交易」的股票，避免停牌拉低晋级率）：
         - 1进2%: (昨日首板且今日再次涨停数) / (昨日首板且今日有交易数) × 100
         - 2进3%: (昨日二板且今日再次涨停数) / (昨日二板且今日有交易数) × 100
         - 3进4%: (昨日三板且今日再次涨停数) / (昨日三板且今日有交易数) × 100
@@ -361,49 +1099,64 @@ class IndicatorCalculator:
         
         limit_times 含义（tushare）：当日连续涨停天数，1=首板，2=二板，3=三板，4+=四板及以上。
         """
-        result = {
-            'advance_1to2': None,   # 昨日首板 → 今日任意涨停
-            'advance_2to3': None,   # 昨日二板 → 今日任意涨停
-            'advance_3to4': None,   # 昨日三板 → 今日任意涨停（3进4）
-            'advance_3plus': None   # 昨日四板及以上 → 今日任意涨停（3板+晋级，不含3板）
-        }
+        prev_up = prev_ctx.limit_up
+        if prev_up.empty or 'limit_times' not in prev_up.columns:
+            levels = np.zeros(0, dtype=np.int64)
+            ids = np.zeros(0, dtype=np.int32)
+        else:
+            times = pd.to_numeric(prev_up['limit_times'], errors='coerce').to_numpy(dtype=float)
+            valid = ~np.isnan(times)
+            levels = times[valid].astype(np.int64)
+            ids = self.security_index.encode(prev_up['ts_code'])[valid]
         
-        if today_limit_df.empty or yesterday_limit_df.empty:
-            return result
+        has_daily = not ctx.daily.empty
+        outcomes = self._transition_outcomes(
+            is_limit_up=np.isin(ids, ctx.limit_up_ids),
+            is_broken=np.isin(ids, ctx.break_board_ids),
+            has_daily=np.full(len(ids), has_daily),
+            is_traded=np.isin(ids, ctx.traded_ids),
+            is_red=np.isin(ids, ctx.red_ids),
+        )
+        transitions = np.zeros((int(levels.max()) if len(levels) else 0, self._OUTCOME_UNKNOWN + 1),
+                               dtype=np.int64)
+        np.add.at(transitions, (levels - 1, outcomes), 1)
+        return self._summarize_transitions(transitions, len(ctx.limit_up), ctx.has_limit_data and has_daily)
+    
+    @classmethod
+    def _transition_outcomes(cls, is_limit_up, is_broken, has_daily, is_traded, is_red) -> np.ndarray:
+        """昨日涨停股今日表现 -> TRANSITION_OUTCOMES 中的列号（按顺序优先判定）"""
+        return np.select(
+            [is_limit_up, is_broken, ~has_daily, ~is_traded, is_red],
+            [0, 1, cls._OUTCOME_UNKNOWN, 4, 2],
+            default=3,
+        )
+    
+    @classmethod
+    def _summarize_transitions(cls, transitions: np.ndarray, n_up: int, complete: bool) -> dict:
+        """
+        由当日连板晋级矩阵（含内部未知列）生成 board_transitions 和各晋级率
         
-        # 今日有交易的股票（用于分母：只统计“有机会晋级”的昨日涨停股，排除今日停牌）
-        today_traded = set(today_daily_df['ts_code']) if not today_daily_df.empty else set()
-        # 今日所有涨停股票
-        today_all_limit = set(today_limit_df['ts_code'])
-        
-        # 昨日首板股票；分母 = 昨日首板且今日有交易
-        yesterday_1b = set(yesterday_limit_df[yesterday_limit_df['limit_times'] == 1]['ts_code'])
-        yesterday_1b_traded = yesterday_1b & today_traded if today_traded else yesterday_1b
-        if len(yesterday_1b_traded) > 0:
-            advance_1to2_count = len(yesterday_1b_traded & today_all_limit)
-            result['advance_1to2'] = round(advance_1to2_count / len(yesterday_1b_traded) * 100, 2)
-        
-        # 昨日二板
-        yesterday_2b = set(yesterday_limit_df[yesterday_limit_df['limit_times'] == 2]['ts_code'])
-        yesterday_2b_traded = yesterday_2b & today_traded if today_traded else yesterday_2b
-        if len(yesterday_2b_traded) > 0:
-            advance_2to3_count = len(yesterday_2b_traded & today_all_limit)
-            result['advance_2to3'] = round(advance_2to3_count / len(yesterday_2b_traded) * 100, 2)
-        
-        # 昨日三板（严格 =3）
-        yesterday_3b = set(yesterday_limit_df[yesterday_limit_df['limit_times'] == 3]['ts_code'])
-        yesterday_3b_traded = yesterday_3b & today_traded if today_traded else yesterday_3b
-        if len(yesterday_3b_traded) > 0:
-            advance_3to4_count = len(yesterday_3b_traded & today_all_limit)
-            result['advance_3to4'] = round(advance_3to4_count / len(yesterday_3b_traded) * 100, 2)
-        
-        # 昨日四板及以上（>=4）
-        yesterday_3plus = set(yesterday_limit_df[yesterday_limit_df['limit_times'] >= 4]['ts_code'])
-        yesterday_3plus_traded = yesterday_3plus & today_traded if today_traded else yesterday_3plus
-        if len(yesterday_3plus_traded) > 0:
-            advance_3plus_count = len(yesterday_3plus_traded & today_all_limit)
-            result['advance_3plus'] = round(advance_3plus_count / len(yesterday_3plus_traded) * 100, 2)
+        Args:
+            transitions: (连板数, 表现) 计数矩阵，第 N-1 行对应昨日N板
+            n_up: 今日涨停数（为 0 时晋级率为空）
+            complete: 今日涨跌停和日线数据是否齐全（否则不输出矩阵）
+        """
+        rows = np.flatnonzero(transitions.sum(axis=1))
+        transitions = transitions[:rows[-1] + 1] if len(rows) else transitions[:0]
+        
+        result = {}
+        for name, lo, hi in cls.ADVANCE_BUCKETS:
+            bucket = transitions[lo - 1:hi]
+            # 分母：昨日N板且今日有交易（停牌不计入）
+            denominator = int(bucket.sum() - bucket[:, 4].sum())
+            if n_up > 0 and denominator > 0:
+                result[name] = round(int(bucket[:, 0].sum()) / denominator * 100, 2)
+            else:
+                result[name] = None
         
+        result['board_transitions'] = (
+            transitions[:, :cls._OUTCOME_UNKNOWN].tolist() if complete else None
+        )
         return result
 
 
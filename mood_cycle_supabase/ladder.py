@@ -0,0 +1,91 @@
+"""
+连板梯队
+逐日增量维护每只涨停股的连板高度，生成当日梯队（代码、名称、板数、首次封板时间、是否炸板），
+写入 board_ladder 表，任意日期的梯队或个股连板历史可直接查询
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators import parse_time_seconds
+
+
+class BoardLadderTracker:
+    """连板梯队增量跟踪器
+
+    只保存前一交易日涨停股的板数（ts_code -> 板数），每个交易日只处理当日的
+    涨停和炸板明细，更新代价与当日涨停数成正比。
+    """
+
+    # 用到的涨跌停明细列
+    LIMIT_COLUMNS = ['ts_code', 'limit', 'limit_times', 'name', 'first_time']
+
+    def __init__(self, prev_data: Optional[dict] = None):
+        """
+        Args:
+            prev_data: 起始交易日的前一日数据或状态快照（需含 limit_data 的 ts_code, limit, limit_times）
+        """
+        self._boards = pd.Series(dtype=float)
+        if prev_data is not None:
+            self._boards = self._sealed_boards(prev_data.get('limit_data'), self._boards)
+
+    @staticmethod
+    def _sealed_boards(limit_df: Optional[pd.DataFrame], prev_boards: pd.Series) -> pd.Series:
+        """当日封板股的板数：优先使用 limit_times，缺失时按前一日板数 + 1 递推"""
+        if limit_df is None or limit_df.empty or 'limit' not in limit_df.columns:
+            return pd.Series(dtype=float)
+        sealed = limit_df[limit_df['limit'] == 'U'].drop_duplicates('ts_code')
+        boards = sealed['ts_code'].map(prev_boards).fillna(0) + 1
+        if 'limit_times' in sealed.columns:
+            boards = pd.to_numeric(sealed['limit_times'], errors='coerce').fillna(boards)
+        return pd.Series(boards.to_numpy(dtype=float), index=sealed['ts_code'].to_numpy())
+
+    def step(self, data: dict) -> List[dict]:
+        """
+        处理一个交易日，返回当日梯队并把状态推进到该日
+
+        封板股的板数同 limit_times；炸板股记为其冲击的高度（前一日板数 + 1）。
+
+        Returns:
+            board_ladder 行列表：trade_date, ts_code, name, board, first_time（当日秒数）, broken
+        """
+        limit_df = data.get('limit_data')
+        if limit_df is None or limit_df.empty or 'limit' not in limit_df.columns:
+            self._boards = pd.Series(dtype=float)
+            return []
+
+        sealed_boards = self._sealed_boards(limit_df, self._boards)
+        broken = limit_df[limit_df['limit'] == 'Z'].drop_duplicates('ts_code')
+        broken = broken[~broken['ts_code'].isin(sealed_boards.index)]
+        ladder = pd.concat([limit_df[limit_df['limit'] == 'U'].drop_duplicates('ts_code'), broken],
+                           ignore_index=True)
+
+        is_broken = (ladder['limit'] == 'Z').to_numpy()
+        boards = np.where(is_broken,
+                          ladder['ts_code'].map(self._boards).fillna(0).to_numpy(dtype=float) + 1,
+                          ladder['ts_code'].map(sealed_boards).to_numpy(dtype=float))
+        first_time = parse_time_seconds(ladder['first_time']) if 'first_time' in ladder.columns \
+            else np.full(len(ladder), np.nan)
+        names = ladder['name'] if 'name' in ladder.columns else pd.Series([None] * len(ladder))
+
+        self._boards = sealed_boards
+        return [
+            {
+                'trade_date': data['trade_date'],
+                'ts_code': ts_code,
+                'name': name if isinstance(name, str) else None,
+                'board': int(board),
+                'first_time': int(seconds) if not np.isnan(seconds) else None,
+                'broken': bool(flag),
+            }
+            for ts_code, name, board, seconds, flag in zip(ladder['ts_code'], names, boards, first_time, is_broken)
+        ]
+
+    def run(self, all_data: List[dict]) -> List[dict]:
+        """按日期顺序处理多个交易日，返回全部梯队行"""
+        rows = []
+        for data in all_data:
+            rows.extend(self.step(data))
+        return rows
@@ -0,0 +1,167 @@
+"""
+涨跌停价计算
+按板块规则（主板 10%、创业板/科创板 20%、北交所 30%、主板 ST 5%）和交易所
+四舍五入到分的规则，从日线的 pre_close / close / high 一次性判定全市场的
+封板、炸板、跌停和接近涨停；可在 limit_list_d 不可用的日期（覆盖范围之前）
+本地推导涨跌停明细
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# 板块 -> (涨跌幅限制, 生效日期)；生效日期之前按主板规则
+BOARD_RULES = {
+    'main': (0.10, '00000000'),
+    'chinext': (0.20, '20200824'),   # 创业板注册制改革
+    'star': (0.20, '20190722'),      # 科创板开市
+    'bse': (0.30, '20211115'),       # 北交所开市
+}
+_SEGMENTS = list(BOARD_RULES)
+# 主板风险警示（ST）股票
+ST_LIMIT_RATE = 0.05
+
+# 价格比较容差（价格精确到分）
+_PRICE_EPS = 0.005
+
+
+def _segment_ids(ts_codes) -> np.ndarray:
+    """ts_code -> 板块序号（BOARD_RULES 中的顺序）"""
+    # 多日面板中同一代码重复出现，只对唯一代码做字符串判断
+    inverse, uniques = pd.factorize(np.asarray(ts_codes, dtype=object))
+    codes = pd.Series(uniques, dtype=object).astype(str)
+    prefix = codes.str[:3]
+    suffix = codes.str[-3:]
+    segment = np.zeros(len(codes), dtype=np.int8)
+    segment[((suffix == '.SZ') & prefix.isin(['300', '301', '302'])).to_numpy()] = _SEGMENTS.index('chinext')
+    segment[((suffix == '.SH') & prefix.isin(['688', '689'])).to_numpy()] = _SEGMENTS.index('star')
+    segment[(suffix == '.BJ').to_numpy()] = _SEGMENTS.index('bse')
+    return segment[inverse]
+
+
+def board_segment(ts_codes) -> np.ndarray:
+    """
+    ts_code -> 板块（main / chinext / star / bse）
+
+    - 北交所：.BJ
+    - 创业板：深市 300/301/302
+    - 科创板：沪市 688/689
+    """
+    return np.asarray(_SEGMENTS, dtype=object)[_segment_ids(ts_codes)]
+
+
+def limit_rates(ts_codes, trade_dates, is_st=None) -> np.ndarray:
+    """
+    各证券的涨跌幅限制
+
+    Args:
+        ts_codes: 证券代码序列
+        trade_dates: 交易日（YYYYMMDD 字符串或整数，单个或与 ts_codes 等长的序列）
+        is_st: 是否风险警示（可选，与 ts_codes 等长的布尔数组）；只影响主板
+    """
+    segment = _segment_ids(ts_codes)
+    dates = np.asarray(trade_dates)
+    if dates.dtype.kind in 'OUS':
+        dates = dates.astype(np.int64)
+    dates = np.broadcast_to(dates, segment.shape)
+    rates = np.full(len(segment), BOARD_RULES['main'][0])
+    for i, (rate, since) in enumerate(BOARD_RULES.values()):
+        rates[(segment == i) & (dates >= int(since))] = rate
+    if is_st is not None:
+        rates[(segment == 0) & np.asarray(is_st, dtype=bool)] = ST_LIMIT_RATE
+    return rates
+
+
+def limit_prices(pre_close, rates) -> tuple:
+    """
+    涨停价、跌停价（昨收 × (1 ± 涨跌幅限制)，四舍五入到分）
+
+    Returns:
+        (涨停价数组, 跌停价数组)
+    """
+    pre_close = np.asarray(pre_close, dtype=float)
+    # 加一个远小于 0.5 分的偏移，抵消 2.675 这类价格在二进制浮点下的舍入误差
+    up = np.floor(pre_close * (1 + rates) * 100 + 0.5 + 1e-6) / 100
+    down = np.floor(pre_close * (1 - rates) * 100 + 0.5 + 1e-6) / 100
+    return up, down
+
+
+def classify_limits(daily: pd.DataFrame, trade_dates, is_st=None, near_pct: float = None) -> dict:
+    """
+    按日线判定全市场涨跌停状态（一次向量化计算）
+
+    Args:
+        daily: 日线数据（ts_code, pre_close, close, high）
+        trade_dates: 交易日（单个或逐行）
+        is_st: 是否风险警示（可选）
+        near_pct: 接近涨停的阈值（最高价距涨停价不超过昨收的 near_pct%），默认 config.NEAR_LIMIT_PCT
+
+    Returns:
+        {'sealed_up': 收盘封涨停, 'broken': 盘中触及涨停但收盘未封住,
+         'sealed_down': 收盘跌停, 'near_limit': 最高价接近但未触及涨停,
+         'up_limit': 涨停价, 'down_limit': 跌停价}，均与 daily 逐行对应
+    """
+    near_pct = config.NEAR_LIMIT_PCT if near_pct is None else near_pct
+    pre_close = pd.to_numeric(daily['pre_close'], errors='coerce').to_numpy(dtype=float)
+    close = pd.to_numeric(daily['close'], errors='coerce').to_numpy(dtype=float)
+    high = pd.to_numeric(daily['high'], errors='coerce').to_numpy(dtype=float)
+
+    up, down = limit_prices(pre_close, limit_rates(daily['ts_code'], trade_dates, is_st))
+    touched = high >= up - _PRICE_EPS
+    sealed_up = close >= up - _PRICE_EPS
+    return {
+        'sealed_up': sealed_up,
+        'broken': touched & ~sealed_up,
+        'sealed_down': close <= down + _PRICE_EPS,
+        'near_limit': ~touched & (up - high <= pre_close * near_pct / 100),
+        'up_limit': up,
+        'down_limit': down,
+    }
+
+
+def derive_limit_data(daily: pd.DataFrame, trade_date: str, prev_limit: Optional[pd.DataFrame] = None,
+                      is_st=None) -> pd.DataFrame:
+    """
+    由日线推导与 limit_list_d 同结构的涨跌停明细
+
+    limit_times 由前一日的涨停明细递推（昨日涨停且今日封板则加 1，否则为 1）；
+    封单金额、首次封板时间等盘中数据无法推导，为空。
+
+    Args:
+        daily: 当日日线数据
+        trade_date: 交易日，格式：YYYYMMDD
+        prev_limit: 前一日的涨跌停明细（实际或推导的，需含 ts_code, limit, limit_times）
+        is_st: 是否风险警示（可选，与 daily 逐行对应）
+
+    Returns:
+        DataFrame: ts_code, trade_date, close, pct_chg, amount（元）, fd_amount, limit_times, limit
+    """
+    columns = ['ts_code', 'trade_date', 'close', 'pct_chg', 'amount', 'fd_amount', 'limit_times', 'limit']
+    if daily is None or daily.empty or not {'pre_close', 'close', 'high'}.issubset(daily.columns):
+        return pd.DataFrame(columns=columns)
+
+    status = classify_limits(daily, trade_date, is_st)
+    limit = np.select([status['sealed_up'], status['broken'], status['sealed_down']], ['U', 'Z', 'D'], default='')
+    rows = daily[limit != ''].reset_index(drop=True)
+    limit = limit[limit != '']
+
+    limit_times = np.ones(len(rows), dtype=np.int64)
+    if prev_limit is not None and not prev_limit.empty and 'limit_times' in prev_limit.columns:
+        prev_up = prev_limit[prev_limit['limit'] == 'U'].drop_duplicates('ts_code').set_index('ts_code')
+        prev_times = pd.to_numeric(rows['ts_code'].map(prev_up['limit_times']), errors='coerce').fillna(1)
+        limit_times = np.where(rows['ts_code'].isin(prev_up.index), prev_times.astype(np.int64) + 1, 1)
+
+    return pd.DataFrame({
+        'ts_code': rows['ts_code'],
+        'trade_date': trade_date,
+        'close': rows['close'],
+        'pct_chg': rows['pct_chg'] if 'pct_chg' in rows.columns else np.nan,
+        # 日线成交额单位为千元，limit_list_d 为元
+        'amount': pd.to_numeric(rows['amount'], errors='coerce') * 1000 if 'amount' in rows.columns else np.nan,
+        'fd_amount': np.nan,
+        'limit_times': np.where(limit == 'U', limit_times, np.nan),
+        'limit': limit,
+    }, columns=columns)
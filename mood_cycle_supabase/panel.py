@@ -0,0 +1,399 @@
+"""
+稠密价格面板与远期收益
+把 data/raw 中的日线和涨跌停明细展开为 交易日 × 证券 的稠密矩阵（open / close / pre_close、
+涨跌停状态、板数、首次封板时间），保存为 .npy 文件并按内存映射读取；
+在此之上用花式索引一次取出任意日内样本（板数、行业、封板时间、断板再涨停）在 T+1..T+N 的收益分布，
+不再逐日合并日线
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from indicators import IndicatorCalculator, parse_time_seconds
+from raw_store import LocalRawStore
+from security_index import SecurityIndex
+from security_master import SecurityMaster
+
+
+class PricePanel:
+    """交易日 × 证券 的稠密面板
+
+    行为 dates 中的交易日（升序），列为 codes 中的证券（升序）；停牌、未上市、
+    已退市的位置为 NaN（涨跌停状态为 0、板数为 0）。各字段是独立的 .npy 文件，
+    以 mmap 方式打开，只有被索引到的页才会读入内存。
+    """
+
+    # 字段 -> 数据类型
+    FIELDS = {
+        'open': np.float32,
+        'close': np.float32,
+        'pre_close': np.float32,
+        'limit': np.int8,
+        'board': np.int16,
+        'first_time': np.float32,
+    }
+    # 涨跌停状态编码（0 表示当日不在涨跌停明细中）
+    LIMIT_CODES = {'U': 1, 'Z': 2, 'D': 3}
+    META_FILE = 'meta.json'
+
+    def __init__(self, panel_dir: str = None):
+        self.panel_dir = panel_dir or config.PANEL_DIR
+        self.meta = {}
+        self.dates = np.zeros(0, dtype=object)
+        self.codes = np.zeros(0, dtype=object)
+        self.industry = np.zeros(0, dtype=object)
+        self._arrays = {}
+        self._load()
+
+    # ---------- 读写 ----------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.panel_dir, name)
+
+    def _load(self):
+        try:
+            with open(self._path(self.META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            arrays = {field: np.load(self._path(f'{field}.npy'), mmap_mode='r') for field in self.FIELDS}
+        except (OSError, ValueError):
+            return
+        self.meta = meta
+        self.dates = np.asarray(meta['dates'], dtype=object)
+        self.codes = np.asarray(meta['codes'], dtype=object)
+        self.industry = np.asarray(meta.get('industry') or [None] * len(self.codes), dtype=object)
+        self._arrays = arrays
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self._arrays[field]
+
+    @property
+    def empty(self) -> bool:
+        return not self._arrays or len(self.dates) == 0
+
+    @property
+    def shape(self) -> tuple:
+        return len(self.dates), len(self.codes)
+
+    def is_stale(self, raw_store: LocalRawStore) -> bool:
+        """原始数据文件在面板构建之后有更新时需要重建"""
+        if self.empty:
+            return True
+        mtimes = [os.path.getmtime(path) for path in raw_store.FILES.values() if os.path.exists(path)]
+        return bool(mtimes) and max(mtimes) > self.meta.get('source_mtime', 0)
+
+    def build(self, raw_store: LocalRawStore = None, start_date: str = '00000000',
+              end_date: str = '99999999') -> 'PricePanel':
+        """
+        从本地原始数据构建面板（覆盖已有文件）
+
+        每个字段先写入临时 .npy（open_memmap，不需要在内存中持有整张矩阵），
+        全部写完后再原子替换。
+        """
+        raw_store = raw_store or LocalRawStore()
+        print("\n🧮 构建价格面板...")
+        daily = raw_store.read('daily', start_date, end_date, columns=['ts_code', 'open', 'close', 'pre_close'])
+        limit = raw_store.read('limit_data', start_date, end_date,
+                               columns=['ts_code', 'limit', 'limit_times', 'first_time', 'industry'])
+        if daily.empty:
+            print("⚠️  本地没有日线数据，无法构建面板")
+            return self
+
+        dates = np.asarray(sorted(set(daily['trade_date']) | set(limit['trade_date'] if not limit.empty else [])),
+                           dtype=object)
+        codes = np.asarray(sorted(set(daily['ts_code'])), dtype=object)
+        shape = (len(dates), len(codes))
+
+        os.makedirs(self.panel_dir, exist_ok=True)
+        tmp_paths = {}
+        for field, dtype in self.FIELDS.items():
+            tmp_paths[field] = self._path(f'{field}.tmp.npy')
+            array = np.lib.format.open_memmap(tmp_paths[field], mode='w+', dtype=dtype, shape=shape)
+            array[:] = np.nan if np.issubdtype(dtype, np.floating) else 0
+            if field in ('open', 'close', 'pre_close'):
+                rows, cols = self._locate(dates, codes, daily)
+                array[rows, cols] = pd.to_numeric(daily[field], errors='coerce').to_numpy(dtype=dtype)
+            elif not limit.empty:
+                rows, cols = self._locate(dates, codes, limit)
+                known = cols >= 0
+                array[rows[known], cols[known]] = self._limit_values(limit, field)[known].astype(dtype)
+            array.flush()
+            del array
+
+        industry = np.full(len(codes), None, dtype=object)
+        if not limit.empty and 'industry' in limit.columns:
+            # 行业取最近一次出现的取值
+            latest = limit.dropna(subset=['industry']).drop_duplicates('ts_code', keep='last')
+            pos = np.searchsorted(codes, latest['ts_code'].to_numpy(dtype=object))
+            known = (pos < len(codes)) & (codes[np.minimum(pos, len(codes) - 1)] == latest['ts_code'].to_numpy())
+            industry[pos[known]] = latest['industry'].to_numpy(dtype=object)[known]
+
+        for field, tmp_path in tmp_paths.items():
+            os.replace(tmp_path, self._path(f'{field}.npy'))
+        mtimes = [os.path.getmtime(path) for path in raw_store.FILES.values() if os.path.exists(path)]
+        meta = {
+            'dates': dates.tolist(),
+            'codes': codes.tolist(),
+            'industry': industry.tolist(),
+            'built_at': time.time(),
+            'source_mtime': max(mtimes) if mtimes else 0,
+        }
+        with open(self._path(self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        self._load()
+        print(f"  [OK] 面板 {shape[0]} 个交易日 × {shape[1]} 只证券")
+        return self
+
+    @staticmethod
+    def _locate(dates: np.ndarray, codes: np.ndarray, df: pd.DataFrame) -> tuple:
+        """DataFrame 各行在面板中的 (行号, 列号)，面板中没有的证券列号为 -1"""
+        rows = np.searchsorted(dates, df['trade_date'].to_numpy(dtype=object))
+        ts_codes = df['ts_code'].to_numpy(dtype=object)
+        cols = np.searchsorted(codes, ts_codes)
+        cols[(cols >= len(codes)) | (codes[np.minimum(cols, len(codes) - 1)] != ts_codes)] = -1
+        return rows, cols
+
+    def _limit_values(self, limit: pd.DataFrame, field: str) -> np.ndarray:
+        if field == 'limit':
+            return limit['limit'].map(self.LIMIT_CODES).fillna(0).to_numpy()
+        if field == 'board':
+            boards = pd.to_numeric(limit['limit_times'], errors='coerce').fillna(0)
+            return boards.where(limit['limit'] == 'U', 0).to_numpy()
+        if 'first_time' not in limit.columns:
+            return np.full(len(limit), np.nan)
+        return parse_time_seconds(limit['first_time'])
+
+    # ---------- 索引 ----------
+
+    def date_index(self, trade_dates) -> np.ndarray:
+        """交易日 -> 行号（面板中没有的日期为 -1）"""
+        values = np.asarray(trade_dates, dtype=object)
+        pos = np.searchsorted(self.dates, values)
+        clipped = np.minimum(pos, max(len(self.dates) - 1, 0))
+        return np.where((pos < len(self.dates)) & (self.dates[clipped] == values), pos, -1)
+
+    def code_index(self, ts_codes) -> np.ndarray:
+        """ts_code -> 列号（面板中没有的证券为 -1）"""
+        values = np.asarray(ts_codes, dtype=object)
+        pos = np.searchsorted(self.codes, values)
+        clipped = np.minimum(pos, max(len(self.codes) - 1, 0))
+        return np.where((pos < len(self.codes)) & (self.codes[clipped] == values), pos, -1)
+
+
+def forward_returns(close: np.ndarray, pre_close: np.ndarray, rows: np.ndarray, cols: np.ndarray,
+                    horizon: int) -> np.ndarray:
+    """
+    样本自 T 日收盘起持有到 T+1..T+horizon 日收盘的累计涨幅（%）
+
+    收益按 close / pre_close 逐日连乘（除权除息日的 pre_close 已复权，不受分红送转影响）；
+    缺少价格的交易日只有在持有期内之后还有成交（停牌后复牌）时才按涨幅 0 计；
+    之后再无成交（退市、移出原始数据或停牌至持有期结束）时为 NaN，不当作平收；
+    T+h 超出矩阵最后一行时为 NaN。
+
+    Args:
+        close, pre_close: 交易日 × 证券 的价格矩阵（可以是内存映射数组）
+        rows, cols: 样本的 (行号, 列号)
+
+    Returns:
+        形状为 (样本数, horizon) 的数组
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    n_dates = close.shape[0]
+    ahead = rows[:, None] + np.arange(1, horizon + 1)
+    valid = ahead < n_dates
+    ahead = np.minimum(ahead, n_dates - 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        factor = (close[ahead, cols[:, None]].astype(np.float64)
+                  / pre_close[ahead, cols[:, None]].astype(np.float64))
+    traded = np.isfinite(factor) & valid
+    # 当日或之后（持有期内）有成交
+    trades_later = np.flip(np.logical_or.accumulate(np.flip(traded, axis=1), axis=1), axis=1)
+    factor[~traded] = np.where(trades_later[~traded], 1.0, np.nan)
+    return (np.cumprod(factor, axis=1) - 1) * 100
+
+
+def open_premium(open_: np.ndarray, pre_close: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """T+1 开盘相对昨收的涨幅（%），T+1 停牌或超出矩阵时为 NaN"""
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    result = np.full(len(rows), np.nan)
+    ok = rows + 1 < open_.shape[0]
+    nxt = rows[ok] + 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result[ok] = (open_[nxt, cols[ok]].astype(np.float64) / pre_close[nxt, cols[ok]] - 1) * 100
+    return result
+
+
+def load_panel(raw_store: LocalRawStore = None, rebuild: bool = False) -> PricePanel:
+    """打开面板；不存在、原始数据有更新或 rebuild=True 时重新构建"""
+    raw_store = raw_store or LocalRawStore()
+    panel = PricePanel()
+    if rebuild or panel.is_stale(raw_store):
+        panel.build(raw_store)
+    return panel
+
+
+class ForwardReturns:
+    """面板上的远期收益引擎
+
+    样本用 (行号, 列号) 两个整数数组表示，T+1..T+N 的价格一次花式索引取出。
+    面板行只包含本地原始数据中存在的交易日；给出交易日历时，相邻行之间缺少交易日的
+    前后日属性和远期收益记为缺失，不把隔了几天的行当作 T-1 / T+1。
+    """
+
+    SEAL_BUCKETS = ('early', 'morning', 'afternoon')
+
+    def __init__(self, panel: PricePanel, horizon: int = None, calendar: np.ndarray = None):
+        """
+        Args:
+            panel: 价格面板
+            horizon: 观察天数（默认 config.FORWARD_HORIZON）
+            calendar: 交易日历（YYYYMMDD，见 SecurityMaster.trade_cal）；为空时按面板行号视为连续交易日
+        """
+        self.panel = panel
+        self.horizon = horizon or config.FORWARD_HORIZON
+        self.cal_pos = self._calendar_positions(panel.dates, calendar)
+
+    @staticmethod
+    def _calendar_positions(dates: np.ndarray, calendar: Optional[np.ndarray]) -> np.ndarray:
+        """面板各行在交易日历中的序号；不在日历中的日期（日历过旧）按上一行序号 + 1 计"""
+        n = len(dates)
+        if calendar is None or len(calendar) == 0 or n == 0:
+            return np.arange(n, dtype=np.int64)
+        calendar = np.sort(np.asarray(calendar, dtype=object).astype(str))
+        dates = np.asarray(dates).astype(str)
+        pos = np.searchsorted(calendar, dates)
+        known = (pos < len(calendar)) & (calendar[np.minimum(pos, len(calendar) - 1)] == dates)
+        for r in np.flatnonzero(~known):
+            pos[r] = pos[r - 1] + 1 if r > 0 else pos[r]
+        return pos.astype(np.int64)
+
+    def _consecutive(self, rows: np.ndarray, offset: int) -> np.ndarray:
+        """rows 与 rows + offset 两行在交易日历中是否正好相隔 offset 个交易日（超出面板为 False）"""
+        other = rows + offset
+        inside = (other >= 0) & (other < len(self.cal_pos))
+        other = np.clip(other, 0, max(len(self.cal_pos) - 1, 0))
+        return inside & (self.cal_pos[other] - self.cal_pos[rows] == offset)
+
+    def returns(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """样本 T+1..T+N 的累计涨幅（%），形状为 (样本数, horizon)，见 forward_returns；
+        T 到 T+h 之间缺少交易日时该列为 NaN"""
+        rows = np.asarray(rows, dtype=np.int64)
+        result = forward_returns(self.panel['close'], self.panel['pre_close'], rows, cols, self.horizon)
+        for h in range(1, self.horizon + 1):
+            result[~self._consecutive(rows, h), h - 1] = np.nan
+        return result
+
+    def open_premium(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """T+1 开盘相对昨收的涨幅（%），面板下一行不是下一个交易日时为 NaN"""
+        rows = np.asarray(rows, dtype=np.int64)
+        result = open_premium(self.panel['open'], self.panel['pre_close'], rows, cols)
+        result[~self._consecutive(rows, 1)] = np.nan
+        return result
+
+    def limit_up_events(self, start_date: str = '00000000', end_date: str = '99999999') -> pd.DataFrame:
+        """
+        区间内全部涨停样本及其分组属性
+
+        Returns:
+            DataFrame: row, col, trade_date, ts_code, board（1 / 2 / 3+）, industry,
+            seal_time（early / morning / afternoon，无首次封板时间为 None）,
+            re_limit（断板再涨停：今日涨停、昨日未涨停、前日涨停；前两行不是连续交易日时为 None）
+        """
+        panel = self.panel
+        if panel.empty:
+            return pd.DataFrame()
+        in_range = (panel.dates >= start_date) & (panel.dates <= end_date)
+        limit = panel['limit']
+        rows, cols = np.nonzero(limit[in_range] == PricePanel.LIMIT_CODES['U'])
+        rows = rows + int(np.argmax(in_range))
+
+        up = PricePanel.LIMIT_CODES['U']
+        prev1 = np.where(rows >= 1, limit[np.maximum(rows - 1, 0), cols], 0)
+        prev2 = np.where(rows >= 2, limit[np.maximum(rows - 2, 0), cols], 0)
+        re_limit = np.where(self._consecutive(rows, -2), (prev1 != up) & (prev2 == up), None)
+
+        board = panel['board'][rows, cols].astype(np.int64)
+        seconds = panel['first_time'][rows, cols].astype(np.float64)
+        seal_time = np.select(
+            [seconds < IndicatorCalculator.SEAL_MORNING_START,
+             seconds < IndicatorCalculator.SEAL_AFTERNOON_START,
+             seconds >= IndicatorCalculator.SEAL_AFTERNOON_START],
+            list(self.SEAL_BUCKETS), default=None,
+        )
+        return pd.DataFrame({
+            'row': rows,
+            'col': cols,
+            'trade_date': panel.dates[rows],
+            'ts_code': panel.codes[cols],
+            'board': np.select([board >= 3, board == 2], ['3+', '2'], default='1'),
+            'industry': panel.industry[cols],
+            'seal_time': seal_time,
+            're_limit': re_limit,
+        })
+
+    def cohort_stats(self, events: pd.DataFrame, by: str) -> pd.DataFrame:
+        """
+        按样本分组统计 T+1..T+N 收益分布
+
+        Args:
+            events: limit_up_events 的结果（或任意含 row, col 和分组列的样本表）
+            by: 分组列（board / industry / seal_time / re_limit 或自定义列）
+
+        Returns:
+            DataFrame: 分组, horizon, count, mean, median, win_rate, p10, p90（收益单位 %）
+        """
+        columns = [by, 'horizon', 'count', 'mean', 'median', 'win_rate', 'p10', 'p90']
+        if events.empty:
+            return pd.DataFrame(columns=columns)
+
+        returns = self.returns(events['row'].to_numpy(), events['col'].to_numpy())
+        long = pd.DataFrame({
+            by: np.repeat(events[by].to_numpy(dtype=object), self.horizon),
+            'horizon': np.tile(np.arange(1, self.horizon + 1), len(events)),
+            'ret': returns.ravel(),
+        }).dropna(subset=[by, 'ret'])
+        if long.empty:
+            return pd.DataFrame(columns=columns)
+
+        grouped = long.groupby([by, 'horizon'])['ret']
+        stats = grouped.agg(count='size', mean='mean', median='median').join(
+            grouped.apply(lambda r: (r > 0).mean() * 100).rename('win_rate')
+        ).join(grouped.quantile(0.1).rename('p10')).join(grouped.quantile(0.9).rename('p90'))
+        return stats.round(2).reset_index()[columns]
+
+
+def main():
+    """命令行：打印各类涨停样本的远期收益分布"""
+    parser = argparse.ArgumentParser(description='涨停样本远期收益分析')
+    parser.add_argument('--start', type=str, default='00000000', help='样本开始日期（YYYYMMDD）')
+    parser.add_argument('--end', type=str, default='99999999', help='样本结束日期（YYYYMMDD）')
+    parser.add_argument('--by', type=str, default='board', help='分组：board / industry / seal_time / re_limit')
+    parser.add_argument('--horizon', type=int, help=f'观察天数（默认 {config.FORWARD_HORIZON}）')
+    parser.add_argument('--rebuild', action='store_true', help='强制重建价格面板')
+    args = parser.parse_args()
+
+    panel = load_panel(rebuild=args.rebuild)
+    if panel.empty:
+        return
+    master = SecurityMaster(SecurityIndex())
+    if len(master.trade_cal) == 0:
+        print("[警告] 本地没有交易日历缓存，无法识别原始数据中缺失的交易日，按相邻行计算")
+    engine = ForwardReturns(panel, args.horizon, master.trade_cal)
+    events = engine.limit_up_events(args.start, args.end)
+    print(f"\n📈 涨停样本 {len(events)} 个，按 {args.by} 分组：")
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(engine.cohort_stats(events, args.by).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
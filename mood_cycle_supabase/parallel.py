@@ -0,0 +1,121 @@
+"""
+并行指标计算
+大区间回补时，把交易日切成首尾重叠一天的分片，在进程池中分别用面板引擎计算；
+原始数据写入临时目录中的 Arrow (Feather) 文件，子进程以内存映射方式读取，
+不再逐个 pickle 大 DataFrame
+"""
+
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow.feather as feather
+
+import config
+from indicators import IndicatorCalculator
+from security_index import SecurityIndex
+
+# 分片文件中标记交易日序号的列
+DAY_COLUMN = '__day'
+
+
+def _write_chunk(days: List[dict], path_prefix: str) -> dict:
+    """把一个分片的日线和涨跌停数据各写成一个 Arrow 文件"""
+    files = {}
+    for key, columns in IndicatorCalculator.PANEL_COLUMNS.items():
+        frames = []
+        for i, day in enumerate(days):
+            df = day.get(key)
+            if df is None or df.empty:
+                continue
+            df = df[[c for c in columns if c in df.columns]].copy()
+            df[DAY_COLUMN] = i
+            frames.append(df)
+        if frames:
+            path = f'{path_prefix}.{key}.arrow'
+            feather.write_feather(pd.concat(frames, ignore_index=True), path, compression='uncompressed')
+            files[key] = path
+    return {
+        'trade_dates': [day['trade_date'] for day in days],
+        'files': files,
+    }
+
+
+def _read_chunk(chunk: dict) -> List[dict]:
+    """读取分片文件，还原为按交易日排列的数据字典列表"""
+    days = [{'trade_date': trade_date, 'daily': pd.DataFrame(), 'limit_data': pd.DataFrame()}
+            for trade_date in chunk['trade_dates']]
+    for key, path in chunk['files'].items():
+        df = feather.read_table(path, memory_map=True).to_pandas()
+        for i, group in df.groupby(DAY_COLUMN, sort=False):
+            days[i][key] = group.drop(columns=DAY_COLUMN).reset_index(drop=True)
+    return days
+
+
+def _compute_chunk(job: dict) -> List[dict]:
+    """子进程入口：计算一个分片（首日仅作为前一日数据，不输出）"""
+    calculator = IndicatorCalculator(SecurityIndex(job['security_ids']), groups=job['groups'])
+    days = _read_chunk(job['chunk'])
+    if job['has_prev']:
+        return calculator.calculate_indicators_batch(days[1:], days[0])
+    return calculator.calculate_indicators_batch(days)
+
+
+def compute_indicators_parallel(calculator: IndicatorCalculator, all_data: List[dict],
+                                prev_data: Optional[dict] = None,
+                                workers: int = None) -> List[dict]:
+    """
+    多进程批量计算指标，结果与 calculator.calculate_indicators_batch 一致
+
+    每个交易日的指标只依赖当日和前一日，因此分片之间只需重叠一天。
+
+    Args:
+        calculator: 指标计算器（提供证券编号字典和启用的指标分组）
+        all_data: 按日期升序排列的当日数据字典列表
+        prev_data: all_data 第一天的前一日数据（可选）
+        workers: 进程数，默认 config.COMPUTE_WORKERS
+
+    Returns:
+        指标字典列表，与 all_data 一一对应
+    """
+    workers = workers or config.COMPUTE_WORKERS
+    n_chunks = min(workers, math.ceil(len(all_data) / config.PARALLEL_MIN_CHUNK_DAYS))
+    if workers <= 1 or n_chunks <= 1:
+        return calculator.calculate_indicators_batch(all_data, prev_data)
+
+    # 先在主进程登记全部证券编号，子进程使用同一份字典，新编号也能随本次运行持久化
+    for day in all_data:
+        for key in ('daily', 'limit_data'):
+            df = day.get(key)
+            if df is not None and not df.empty:
+                calculator.security_index.encode(df['ts_code'])
+    security_ids = calculator.security_index.mapping()
+
+    days = ([prev_data] if prev_data is not None else []) + list(all_data)
+    offset = len(days) - len(all_data)
+    chunk_days = math.ceil(len(all_data) / n_chunks)
+
+    with tempfile.TemporaryDirectory(prefix='mood_cycle_') as tmp_dir:
+        jobs = []
+        for k, start in enumerate(range(offset, len(days), chunk_days)):
+            end = min(start + chunk_days, len(days))
+            # 与上一分片重叠一天，作为本分片首日的前一日数据
+            first = max(start - 1, 0)
+            jobs.append({
+                'chunk': _write_chunk(days[first:end], os.path.join(tmp_dir, f'chunk{k:04d}')),
+                'has_prev': first < start,
+                'security_ids': security_ids,
+                'groups': calculator.groups,
+            })
+
+        print(f"  并行计算：{len(jobs)}个分片，{workers}个进程")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map 按提交顺序返回，结果直接按日期顺序拼接
+            results = []
+            for chunk_result in pool.map(_compute_chunk, jobs):
+                results.extend(chunk_result)
+
+    return results
@@ -0,0 +1,80 @@
+"""
+滚动历史分位
+每个交易日的指标在最近 N 个交易日（含当日）中的百分位排名，写入 emotion_cycle.pct_ranks，
+前端按分位着色，阈值不再随市场环境漂移
+"""
+
+import bisect
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from indicators import IndicatorCalculator
+
+
+class RollingPercentile:
+    """单个指标的滚动分位（有序窗口）
+
+    窗口按交易日计数，缺失值占一个交易日但不参与排名。
+    有序列表用二分查找插入和删除，每天 O(log N) 次比较加一次内存移动，不再每天重新排序整个窗口。
+    """
+
+    def __init__(self, window: int = None, min_periods: int = None):
+        self.window = window or config.PCT_RANK_WINDOW
+        self.min_periods = config.PCT_RANK_MIN_PERIODS if min_periods is None else min_periods
+        self._days = deque()
+        self._sorted: List[float] = []
+
+    def push(self, value) -> Optional[float]:
+        """
+        加入一个交易日的值，返回它在窗口中的分位（0~100）
+
+        分位 = (比它小的个数 + 相等个数的一半，均不含自身) / (窗口内有效值个数 - 1)，
+        窗口最小值为 0、最大值为 100。当日值缺失或有效值不足 min_periods 时返回 None。
+        """
+        value = None if value is None or pd.isna(value) else float(value)
+        self._days.append(value)
+        if value is not None:
+            bisect.insort(self._sorted, value)
+        if len(self._days) > self.window:
+            expired = self._days.popleft()
+            if expired is not None:
+                del self._sorted[bisect.bisect_left(self._sorted, expired)]
+
+        n = len(self._sorted)
+        if value is None or n < max(self.min_periods, 2):
+            return None
+        less = bisect.bisect_left(self._sorted, value)
+        equal = bisect.bisect_right(self._sorted, value) - less
+        return round((less + (equal - 1) / 2) / (n - 1) * 100, 1)
+
+
+def rank_columns(groups: List[str] = None) -> List[str]:
+    """参与分位排名的指标列（启用分组的标量列）"""
+    groups = groups or config.ENABLED_INDICATOR_GROUPS or list(IndicatorCalculator.INDICATOR_GROUPS)
+    return [col for col in IndicatorCalculator.group_columns(groups) if col not in IndicatorCalculator.ARRAY_COLUMNS]
+
+
+def rolling_pct_ranks(df: pd.DataFrame, columns: List[str] = None, window: int = None,
+                      min_periods: int = None) -> List[Dict[str, Optional[float]]]:
+    """
+    按日期顺序计算每行各指标的滚动分位
+
+    Args:
+        df: 按 trade_date 升序排列的指标表
+        columns: 参与排名的列（默认 rank_columns()）
+
+    Returns:
+        与 df 逐行对应的 {列: 分位} 字典列表（缺失的列为 None）
+    """
+    columns = [col for col in (columns or rank_columns()) if col in df.columns]
+    ranks = [{} for _ in range(len(df))]
+    for col in columns:
+        tracker = RollingPercentile(window, min_periods)
+        values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+        for i, value in enumerate(values):
+            ranks[i][col] = tracker.push(None if np.isnan(value) else value)
+    return ranks
@@ -0,0 +1,130 @@
+"""
+本地原始数据存储
+把 tushare 返回的日线、涨跌停、基础指标追加保存为 data/raw/*.parquet，
+指标口径调整后可直接从本地重算，无需再次调用 tushare
+"""
+
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import config
+from indicators import IndicatorCalculator
+
+
+class LocalRawStore:
+    """Parquet 原始数据存储（与情绪周期表本地版的文件布局一致）"""
+
+    FILES = {
+        'daily': config.DAILY_DATA_FILE,
+        'limit_data': config.LIMIT_LIST_FILE,
+        'daily_basic': config.DAILY_BASIC_FILE,
+    }
+
+    def save(self, all_data: List[dict]):
+        """
+        追加保存原始数据（同一交易日、同一股票以新数据为准）
+
+        Args:
+            all_data: 数据列表，每个元素是一个日期的所有数据
+        """
+        print("\n[保存] 开始保存原始数据到本地...")
+        os.makedirs(config.RAW_DATA_DIR, exist_ok=True)
+        for key, file_path in self.FILES.items():
+            frames = [data[key] for data in all_data if data.get(key) is not None and not data[key].empty]
+            if frames:
+                df = pd.concat(frames, ignore_index=True)
+                self._append_or_create(file_path, df)
+                print(f"  [OK] {os.path.basename(file_path)}: {len(df)}条")
+
+    def _append_or_create(self, file_path: str, new_df: pd.DataFrame):
+        """
+        追加数据到Parquet文件，如果文件不存在则创建
+
+        先写临时文件再原子替换，中途失败不会损坏已有文件。
+        """
+        if os.path.exists(file_path):
+            existing_df = pd.read_parquet(file_path)
+            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
+            combined_df = combined_df.drop_duplicates(subset=['trade_date', 'ts_code'], keep='last')
+        else:
+            combined_df = new_df
+
+        # 按交易日排序（稳定排序，保留同一交易日内的原始顺序），读取时可按行组跳过无关日期
+        combined_df = combined_df.sort_values('trade_date', kind='stable')
+        tmp_path = f'{file_path}.tmp'
+        combined_df.to_parquet(tmp_path, index=False, compression='snappy')
+        os.replace(tmp_path, file_path)
+
+    def _read(self, key: str, start_date: str, end_date: str, columns: List[str] = None) -> pd.DataFrame:
+        file_path = self.FILES[key]
+        if not os.path.exists(file_path):
+            return pd.DataFrame()
+        if columns is not None:
+            names = pq.read_schema(file_path).names
+            columns = [c for c in ['trade_date'] + columns if c in names]
+        return pd.read_parquet(
+            file_path,
+            columns=columns,
+            filters=[('trade_date', '>=', start_date), ('trade_date', '<=', end_date)],
+        )
+
+    def read(self, key: str, start_date: str = '00000000', end_date: str = '99999999',
+             columns: List[str] = None) -> pd.DataFrame:
+        """读取区间内某类原始数据的整张表（columns 中文件没有的列会被忽略）"""
+        return self._read(key, start_date, end_date, columns=columns)
+
+    def trade_dates(self, start_date: str = '00000000', end_date: str = '99999999') -> List[str]:
+        """本地已保存的交易日（升序）"""
+        dates = set()
+        for key in ('daily', 'limit_data'):
+            df = self._read(key, start_date, end_date, columns=[])
+            if not df.empty:
+                dates.update(df['trade_date'].unique())
+        return sorted(dates)
+
+    def load_days(self, start_date: str, end_date: str,
+                  columns: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        """
+        读取区间内逐日的数据字典（只读取指标计算用到的列）
+
+        Args:
+            columns: {数据集: 列名}，默认 IndicatorCalculator.PANEL_COLUMNS；
+                     同时生成分行业指标、连板梯队时需额外读取其用到的列
+
+        Returns:
+            与 DataFetcher.fetch_batch_data 同结构的列表（不含 daily_basic）
+        """
+        days = {trade_date: {'trade_date': trade_date, 'daily': pd.DataFrame(), 'limit_data': pd.DataFrame()}
+                for trade_date in self.trade_dates(start_date, end_date)}
+        for key, key_columns in (columns or IndicatorCalculator.PANEL_COLUMNS).items():
+            df = self._read(key, start_date, end_date, columns=key_columns)
+            if df.empty:
+                continue
+            for trade_date, group in df.groupby('trade_date', sort=False):
+                days[trade_date][key] = group.reset_index(drop=True)
+        return [days[trade_date] for trade_date in sorted(days)]
+
+    def iter_windows(self, start_date: str, end_date: str, window_days: int = None,
+                     columns: Optional[Dict[str, List[str]]] = None) -> Iterator[Tuple[Optional[dict], List[dict]]]:
+        """
+        按窗口流式读取区间内的数据，内存占用与窗口大小成正比（columns 见 load_days）
+
+        Yields:
+            (窗口首日的前一交易日数据或 None, 窗口内逐日数据列表)
+        """
+        window_days = window_days or config.RECOMPUTE_WINDOW_DAYS
+        all_dates = self.trade_dates()
+        dates = [d for d in all_dates if start_date <= d <= end_date]
+        if not dates:
+            return
+
+        before = [d for d in all_dates if d < dates[0]]
+        prev_data = self.load_days(before[-1], before[-1], columns)[0] if before else None
+        for i in range(0, len(dates), window_days):
+            window = dates[i:i + window_days]
+            days = self.load_days(window[0], window[-1], columns)
+            yield prev_data, days
+            prev_data = days[-1]
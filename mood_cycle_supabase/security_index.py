@@ -0,0 +1,87 @@
+"""
+证券代码字典
+把 ts_code 映射为稠密的 int32 编号，跨日集合运算（交集、成员判断）改为整数数组运算
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+class SecurityIndex:
+    """ts_code <-> int32 编号
+
+    编号从 0 开始连续分配，已分配的编号永不改变；
+    由 DataStorage 持久化到 security_dict 表，跨运行保持一致。
+    """
+
+    def __init__(self, mapping: Dict[str, int] = None):
+        self._ids: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._pending: Dict[str, int] = {}
+        for code, sec_id in sorted((mapping or {}).items(), key=lambda item: item[1]):
+            self._ids[code] = sec_id
+            self._codes.append(code)
+        # 持久化的编号应当连续，不连续时说明字典被手工改过
+        if self._codes and len(self._codes) != max(self._ids.values()) + 1:
+            raise ValueError('security_dict 中的编号不连续')
+
+    @classmethod
+    def load(cls, storage) -> 'SecurityIndex':
+        """从存储层读取已有的编号"""
+        return cls(storage.load_security_dict())
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def encode(self, codes) -> np.ndarray:
+        """
+        ts_code 序列 -> int32 编号数组（未见过的代码自动分配新编号）
+
+        先对输入去重，只对唯一值查字典，一天数千只股票只需数千次字典查询。
+        """
+        if len(codes) == 0:
+            return np.zeros(0, dtype=np.int32)
+        inverse, uniques = pd.factorize(np.asarray(codes, dtype=object))
+        ids = np.empty(len(uniques), dtype=np.int32)
+        for i, code in enumerate(uniques):
+            sec_id = self._ids.get(code)
+            if sec_id is None:
+                sec_id = len(self._codes)
+                self._ids[code] = sec_id
+                self._codes.append(code)
+                self._pending[code] = sec_id
+            ids[i] = sec_id
+        return ids[inverse]
+
+    def encode_unique(self, codes) -> np.ndarray:
+        """ts_code 序列 -> 去重并排序后的编号数组（可直接用于 np.intersect1d 等）"""
+        return np.unique(self.encode(codes))
+
+    def decode(self, ids) -> np.ndarray:
+        """编号数组 -> ts_code 数组"""
+        return np.asarray(self._codes, dtype=object)[np.asarray(ids, dtype=np.int64)]
+
+    def mapping(self) -> Dict[str, int]:
+        """当前全部编号 {ts_code: sec_id}"""
+        return dict(self._ids)
+
+    def pop_pending(self) -> Dict[str, int]:
+        """取出自上次持久化以来新分配的编号"""
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+def test_security_index():
+    """测试证券代码字典"""
+    index = SecurityIndex({'000001.SZ': 0, '600000.SH': 1})
+    ids = index.encode(['600000.SH', '300750.SZ', '000001.SZ', '300750.SZ'])
+    print(f"编码: {ids.tolist()}")
+    print(f"解码: {index.decode(ids).tolist()}")
+    print(f"新分配: {index.pop_pending()}")
+    print(f"交集: {np.intersect1d(index.encode_unique(['000001.SZ', '300750.SZ']), ids).tolist()}")
+
+
+if __name__ == '__main__':
+    test_security_index()
@@ -0,0 +1,254 @@
+"""
+证券主数据
+本地缓存 stock_basic（上市/退市日期）和 namechange（曾用名），按日期给出
+ST、退市、次新股的排除掩码，供指标计算前统一过滤股票池；
+同时缓存交易日历，供离线分析识别本地原始数据中缺失的交易日
+"""
+
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from security_index import SecurityIndex
+
+# 日期统一转为整数 YYYYMMDD 便于向量化比较
+_MIN_DATE = 0
+_MAX_DATE = 99991231
+
+
+def _date_int(values: pd.Series, default: int) -> np.ndarray:
+    return pd.to_numeric(values, errors='coerce').fillna(default).astype(np.int64).to_numpy()
+
+
+class SecurityMaster:
+    """证券主数据缓存与按日排除掩码
+
+    - ST：当日名称（按曾用名区间）含 "ST"
+    - 退市：当日名称含 "退"（退市整理期），或已过退市日期
+    - 次新：上市不足 config.NEW_LISTING_DAYS 个自然日（新股连续一字板）
+
+    掩码按 SecurityIndex 编号组织，过滤一天的数据只需一次数组索引。
+    """
+
+    BASIC_FILE = 'stock_basic.parquet'
+    NAMECHANGE_FILE = 'namechange.parquet'
+    TRADE_CAL_FILE = 'trade_cal.parquet'
+    META_FILE = 'meta.json'
+
+    def __init__(self, security_index: SecurityIndex, cache_dir: str = None):
+        self.index = security_index
+        self.cache_dir = cache_dir or config.SECURITY_MASTER_DIR
+        self.basic = pd.DataFrame()
+        self.namechange = pd.DataFrame()
+        # 交易日历（YYYYMMDD 升序）；为空表示本地没有缓存
+        self.trade_cal = np.zeros(0, dtype=object)
+        self.meta = {}
+        self._arrays = None
+        self._masks = {}
+        self._load_cache()
+
+    # ---------- 缓存 ----------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _load_cache(self):
+        try:
+            with open(self._path(self.META_FILE), 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+            self.basic = pd.read_parquet(self._path(self.BASIC_FILE))
+            if os.path.exists(self._path(self.NAMECHANGE_FILE)):
+                self.namechange = pd.read_parquet(self._path(self.NAMECHANGE_FILE))
+            if os.path.exists(self._path(self.TRADE_CAL_FILE)):
+                self.trade_cal = pd.read_parquet(self._path(self.TRADE_CAL_FILE))['cal_date'].to_numpy(dtype=object)
+        except (OSError, ValueError, KeyError):
+            self.meta = {}
+            self.basic = pd.DataFrame()
+            self.namechange = pd.DataFrame()
+            self.trade_cal = np.zeros(0, dtype=object)
+
+    def _save_cache(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        trade_cal = pd.DataFrame({'cal_date': self.trade_cal})
+        for name, df in ((self.BASIC_FILE, self.basic), (self.NAMECHANGE_FILE, self.namechange),
+                         (self.TRADE_CAL_FILE, trade_cal)):
+            tmp_path = self._path(name) + '.tmp'
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(name))
+        with open(self._path(self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+
+    def refresh(self, fetcher, force: bool = False):
+        """
+        增量刷新缓存
+
+        stock_basic、交易日历每次全量获取（数据量小）；namechange 只获取上次缓存之后公告的记录。
+        距上次刷新不足 SECURITY_MASTER_REFRESH_HOURS 小时时跳过。
+        """
+        refreshed_at = self.meta.get('refreshed_at', 0)
+        if not force and not self.basic.empty and \
+                time.time() - refreshed_at < config.SECURITY_MASTER_REFRESH_HOURS * 3600:
+            return
+
+        print("\n🗂️  刷新证券主数据...")
+        basic = fetcher.fetch_stock_basic()
+        if basic.empty:
+            print("⚠️  未获取到证券基础信息，继续使用本地缓存")
+            return
+
+        since = self.meta.get('namechange_ann_date')
+        changes = fetcher.fetch_namechange(start_date=since)
+        if not changes.empty:
+            namechange = pd.concat([self.namechange, changes], ignore_index=True)
+            self.namechange = namechange.drop_duplicates(
+                subset=['ts_code', 'name', 'start_date'], keep='last'
+            ).reset_index(drop=True)
+            self.meta['namechange_ann_date'] = str(self.namechange['ann_date'].dropna().max())
+
+        calendar = fetcher.get_trade_cal(config.TRADE_CAL_START, time.strftime('%Y%m%d'))
+        if calendar:
+            self.trade_cal = np.asarray(sorted(set(calendar)), dtype=object)
+
+        self.basic = basic
+        self.meta['refreshed_at'] = time.time()
+        self._arrays = None
+        self._masks = {}
+        try:
+            self._save_cache()
+        except OSError as e:
+            print(f"[警告] 写入证券主数据缓存失败: {e}")
+
+    # ---------- 掩码 ----------
+
+    def _build_arrays(self) -> dict:
+        """把主数据展开为按证券编号索引的数组和名称区间数组"""
+        basic = self.basic
+
+        # 名称区间：有曾用名记录的证券用曾用名区间；没有记录的用当前名称覆盖全部日期
+        names = self.namechange
+        if not names.empty:
+            intervals = pd.DataFrame({
+                'ts_code': names['ts_code'],
+                'name': names['name'].astype(str),
+                'start': _date_int(names['start_date'], _MIN_DATE),
+                'end': _date_int(names['end_date'], _MAX_DATE),
+            }).sort_values(['ts_code', 'start'], kind='stable')
+            # 增量获取时旧记录的 end_date 不会回填，用同一证券下一条记录的起始日截断
+            next_start = intervals.groupby('ts_code')['start'].shift(-1)
+            intervals['end'] = np.minimum(intervals['end'], (next_start - 1).fillna(_MAX_DATE).astype(np.int64))
+            known = set(names['ts_code'])
+            current = basic[~basic['ts_code'].isin(known)] if not basic.empty else basic
+        else:
+            intervals = pd.DataFrame(columns=['ts_code', 'name', 'start', 'end'])
+            current = basic
+        if not current.empty:
+            intervals = pd.concat([intervals, pd.DataFrame({
+                'ts_code': current['ts_code'],
+                'name': current['name'].astype(str),
+                'start': _MIN_DATE,
+                'end': _MAX_DATE,
+            })], ignore_index=True)
+
+        # 先完成全部编码（可能分配新编号），再按最终长度建数组
+        basic_ids = self.index.encode(basic['ts_code'])
+        interval_ids = self.index.encode(intervals['ts_code'])
+        n = len(self.index)
+        list_date = np.full(n, _MIN_DATE, dtype=np.int64)
+        delist_date = np.full(n, _MAX_DATE, dtype=np.int64)
+        if len(basic_ids):
+            list_date[basic_ids] = _date_int(basic['list_date'], _MIN_DATE)
+            delist_date[basic_ids] = _date_int(basic['delist_date'], _MAX_DATE)
+
+        names = intervals['name']
+        start = intervals['start'].to_numpy(dtype=np.int64)
+        end = intervals['end'].to_numpy(dtype=np.int64)
+        arrays = {'n': n, 'list_date': list_date, 'delist_date': delist_date}
+        flagged = {
+            'st': names.str.upper().str.contains('ST', regex=False).to_numpy(dtype=bool),
+            'delisting': names.str.contains('退', regex=False).to_numpy(dtype=bool),
+        }
+        for key, rows in flagged.items():
+            arrays[key] = (interval_ids[rows], start[rows], end[rows])
+        return arrays
+
+    def _ensure_arrays(self) -> dict:
+        if self._arrays is None or self._arrays['n'] != len(self.index):
+            self._arrays = self._build_arrays()
+            self._masks = {}
+        return self._arrays
+
+    def _named(self, key: str, trade_date: str) -> np.ndarray:
+        """当日名称带某类标记（st / delisting）的证券（按编号索引的布尔数组）"""
+        arrays = self._ensure_arrays()
+        date = int(trade_date)
+        ids, start, end = arrays[key]
+        flagged = np.zeros(arrays['n'], dtype=bool)
+        flagged[ids[(start <= date) & (date <= end)]] = True
+        return flagged
+
+    def is_st(self, trade_date: str, ts_codes) -> np.ndarray:
+        """指定交易日各证券是否为风险警示（ST）股票，与 ts_codes 逐个对应（用于涨跌停价计算）"""
+        ids = self.index.encode(ts_codes)
+        if self.basic.empty:
+            return np.zeros(len(ids), dtype=bool)
+        st = self._named('st', trade_date)
+        result = np.zeros(len(ids), dtype=bool)
+        known = ids < len(st)
+        result[known] = st[ids[known]]
+        return result
+
+    def exclusion_mask(self, trade_date: str) -> np.ndarray:
+        """
+        指定交易日应排除的证券（按 SecurityIndex 编号索引的布尔数组）
+
+        编号超出数组长度的证券（主数据中没有的代码）视为不排除。
+        """
+        if self.basic.empty:
+            return np.zeros(len(self.index), dtype=bool)
+        arrays = self._ensure_arrays()
+        if trade_date in self._masks:
+            return self._masks[trade_date]
+
+        date = int(trade_date)
+        excluded = np.zeros(arrays['n'], dtype=bool)
+
+        if config.EXCLUDE_ST:
+            excluded |= self._named('st', trade_date)
+        if config.EXCLUDE_DELISTED:
+            excluded |= self._named('delisting', trade_date)
+            excluded |= arrays['delist_date'] <= date
+        if config.NEW_LISTING_DAYS > 0:
+            cutoff = int((pd.Timestamp(trade_date) - pd.Timedelta(days=config.NEW_LISTING_DAYS)).strftime('%Y%m%d'))
+            excluded |= arrays['list_date'] > cutoff
+
+        self._masks[trade_date] = excluded
+        return excluded
+
+    def filter_day(self, data: Optional[dict]) -> Optional[dict]:
+        """
+        去掉当日被排除的证券（日线和涨跌停数据各一次布尔索引），返回新的数据字典
+
+        不剔除 ST（EXCLUDE_ST=False）时，日线增加 is_st 列，涨跌停价按 ST 涨跌幅限制计算。
+        """
+        if data is None or self.basic.empty:
+            return data
+
+        filtered = dict(data)
+        for key in ('daily', 'limit_data'):
+            df = data.get(key)
+            if df is None or df.empty or 'ts_code' not in df.columns:
+                continue
+            ids = self.index.encode(df['ts_code'])
+            mask = self.exclusion_mask(data['trade_date'])
+            keep = ids >= len(mask)
+            keep[~keep] = ~mask[ids[~keep]]
+            filtered[key] = df[keep].reset_index(drop=True)
+        daily = filtered.get('daily')
+        if not config.EXCLUDE_ST and daily is not None and not daily.empty and 'ts_code' in daily.columns:
+            filtered['daily'] = daily.assign(is_st=self.is_st(data['trade_date'], daily['ts_code']))
+        return filtered
@@ -1,6 +1,9 @@
 // 全局变量
 let dataTable = null;
 let colorConfig = {};
+let pctRankConfig = { high: 80, low: 20 };
+let pctRankWindow = 250;
+let pctHistogramEdges = [];
 
 // 趋势配置：哪些列是“数值越小越好”
 // 其他未列出的数值列，默认“数值越大越好”
@@ -35,6 +38,10 @@ function loadColorConfig() {
     $.get('/api/color_config', function(response) {
         if (response.success) {
             colorConfig = response.config;
+            if (response.pct_rank) {
+                pctRankConfig = response.pct_rank;
+                pctRankWindow = response.pct_rank_window;
+            }
         }
     });
 }
@@ -87,7 +94,7 @@ function loadData() {
     }
     dataTable = null;
     
-    $('#tableBody').html('<tr><td colspan="29" class="loading">数据加载中...</td></tr>');
+    $('#tableBody').html('<tr><td colspan="32" class="loading">数据加载中...</td></tr>');
     
     // 请求数据
     $.get('/api/data', {
@@ -95,22 +102,53 @@ function loadData() {
         end_date: endDate
     }, function(response) {
         if (response.success) {
+            pctHistogramEdges = response.pct_histogram_edges || [];
             renderTable(response.data);
         } else {
-            $('#tableBody').html(`<tr><td colspan="26" class="loading">${response.message}</td></tr>`);
+            $('#tableBody').html(`<tr><td colspan="32" class="loading">${response.message}</td></tr>`);
         }
     }).fail(function() {
-        $('#tableBody').html('<tr><td colspan="26" class="loading">数据加载失败</td></tr>');
+        $('#tableBody').html('<tr><td colspan="32" class="loading">数据加载失败</td></tr>');
     });
 }
 
+// 全市场涨跌分布热力条：[跌停, 各 1% 档, 涨停]，颜色深浅按该档家数占比，上涨档红、下跌档绿
+function renderHistogram(counts) {
+    const strip = $('<div class="hist-strip"></div>');
+    const total = counts.reduce((a, b) => a + b, 0);
+    const peak = Math.max(...counts, 1);
+    const last = counts.length - 1;
+    counts.forEach((count, i) => {
+        let label, up;
+        if (i === 0) {
+            label = '跌停';
+            up = false;
+        } else if (i === last) {
+            label = '涨停';
+            up = true;
+        } else {
+            const lo = pctHistogramEdges[i - 1], hi = pctHistogramEdges[i];
+            label = `${lo}% ~ ${hi}%`;
+            up = lo >= 0;
+        }
+        const alpha = count > 0 ? 0.15 + 0.85 * count / peak : 0;
+        const rgb = up ? '220, 53, 69' : '40, 167, 69';
+        const share = total > 0 ? (count / total * 100).toFixed(1) : '0.0';
+        $('<span class="hist-cell"></span>')
+            .css('background-color', `rgba(${rgb}, ${alpha.toFixed(2)})`)
+            .attr('title', `${label}：${count} 家（${share}%）`)
+            .appendTo(strip);
+    });
+    return strip;
+}
+
 // 渲染表格
 function renderTable(data) {
     const tbody = $('#tableBody');
     tbody.empty();
     
     if (data.length === 0) {
-        tbody.html('<tr><td colspan="29" class="loading">暂无数据</td></tr>');
+        tbody.html('<tr><td colspan="32" class="loading">暂无数据</td></tr>');
         return;
     }
     
@@ -122,8 +160,11 @@ function renderTable(data) {
         // 列定义
         const columns = [
             { key: 'trade_date', type: 'text' },
+            { key: 'cycle_phase', type: 'text' },
+            { key: 'sentiment_score', type: 'number' },
             { key: 'up_count', type: 'number' },
             { key: 'down_count', type: 'number' },
+            { key: 'pct_histogram', type: 'histogram' },
             { key: 'limit_up_count', type: 'number' },
             { key: 'limit_down_count', type: 'number' },
             { key: 'break_count', type: 'number' },
@@ -159,6 +200,10 @@ function renderTable(data) {
             // 显示值
             if (value === null || value === undefined || value === 'None') {
                 td.text('-');
+            } else if (col.type === 'histogram') {
+                td.append(renderHistogram(value));
+                tr.append(td);
+                return;
             } else if (col.type === 'percent') {
                 // 百分比统一保留1位小数
                 const num = parseFloat(value);
@@ -201,6 +246,16 @@ function renderTable(data) {
                 }
             }
             
+            // 历史分位着色：分位落在两端时按趋势方向深色标记（覆盖环比浅色）
+            const pct = row.pct_ranks ? row.pct_ranks[col.key] : null;
+            if (!isNaN(num) && pct !== null && pct !== undefined) {
+                td.attr('title', `近${pctRankWindow}个交易日分位：${pct}%`);
+                const pctClass = getPctRankColor(pct, col.key);
+                if (pctClass) {
+                    td.removeClass('cell-red-light cell-green-light').addClass(pctClass);
+                }
+            }
+            
             tr.append(td);
         });
         
@@ -266,6 +321,18 @@ function getCellColor(value, key, reverse = false) {
     return null;
 }
 
+// 按历史分位获取单元格颜色（越大越好的列分位高为好，越小越好的列分位低为好）
+function getPctRankColor(pct, key) {
+    const smaller = trendConfig[key] === 'smaller';
+    if (pct >= pctRankConfig.high) {
+        return smaller ? 'cell-green-dark' : 'cell-red-dark';
+    }
+    if (pct <= pctRankConfig.low) {
+        return smaller ? 'cell-red-dark' : 'cell-green-dark';
+    }
+    return null;
+}
+
 // 导出Excel
 function exportExcel() {
     const startDate = $('#startDate').val();
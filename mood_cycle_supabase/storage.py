@@ -4,11 +4,20 @@
 """
 
 import pandas as pd
+import numpy as np
+import httpx
 from supabase import create_client, Client
 import config
+from indicators import IndicatorCalculator
+from raw_store import LocalRawStore
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Optional
+import hashlib
+import json
+import math
 import os
+import threading
 import time
 
 class DataStorage:
@@ -25,17 +34,54 @@ class DataStorage:
         else:
             self.supabase: Client = create_client(self.url, self.key)
 
-    def _recreate_client(self):
-        if not self.url or not self.key:
-            self.supabase = None
-            return
-        self.supabase = create_client(self.url, self.key)
+        # 批量写入专用的 HTTP 连接池（keep-alive，跨调用复用，线程安全）
+        self._http: Optional[httpx.Client] = None
+        self._http_lock = threading.Lock()
+
+    def _get_http(self) -> httpx.Client:
+        """
+        获取（懒创建）直连 PostgREST 的连接池客户端
+
+        连接池大小与并发度一致，连接在多次写入之间保持复用；
+        单个连接出错时由连接池自行剔除，不需要重建整个客户端。
+        """
+        with self._http_lock:
+            if self._http is None:
+                workers = max(1, config.UPSERT_CONCURRENCY)
+                self._http = httpx.Client(
+                    base_url=f"{self.url.rstrip('/')}/rest/v1",
+                    headers={
+                        'apikey': self.key,
+                        'Authorization': f'Bearer {self.key}',
+                        'Content-Type': 'application/json',
+                    },
+                    limits=httpx.Limits(
+                        max_connections=workers,
+                        max_keepalive_connections=workers,
+                        keepalive_expiry=60,
+                    ),
+                    timeout=config.HTTP_TIMEOUT,
+                )
+            return self._http
+
+    def close(self):
+        """关闭连接池"""
+        with self._http_lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
 
     def _should_retry(self, exc: Exception) -> bool:
+        if isinstance(exc, httpx.TransportError):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in (408, 429, 500, 502, 503, 504)
         msg = str(exc).lower()
         return any(s in msg for s in ['eof occurred', 'ssl', 'timed out', 'timeout', 'connection reset', 'connection aborted', 'temporary failure'])
 
     def _run_with_retry(self, fn, max_attempts: int = 5):
+        # 失败的连接会被 httpx 连接池丢弃，重试时自动新建连接，
+        # 因此这里只做退避重试，不再重建客户端（否则会丢掉整个连接池）
         last_exc = None
         for attempt in range(1, max_attempts + 1):
             try:
@@ -44,16 +90,307 @@ class DataStorage:
                 last_exc = e
                 if attempt >= max_attempts or not self._should_retry(e):
                     raise
-                try:
-                    self._recreate_client()
-                except Exception:
-                    pass
                 time.sleep(min(2 ** (attempt - 1), 16))
         raise last_exc
+
+    @staticmethod
+    def _json_default(obj):
+        """json.dumps 兜底：numpy 标量转为 Python 原生类型"""
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return str(obj)
+
+    @staticmethod
+    def _clean_value(value):
+        """NaN/inf 无法被 PostgREST 接受，统一转为 null"""
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+
+    def _post_batch(self, table: str, body: bytes, on_conflict: str) -> float:
+        """发送一批 upsert 请求，返回耗时（秒）"""
+        http = self._get_http()
+
+        def do_post():
+            resp = http.post(
+                f'/{table}',
+                params={'on_conflict': on_conflict},
+                content=body,
+                headers={'Prefer': 'resolution=merge-duplicates,return=minimal'},
+            )
+            resp.raise_for_status()
+            return resp
+
+        started = time.perf_counter()
+        self._run_with_retry(do_post)
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _next_batch_bytes(batch_bytes: int, latency: float) -> int:
+        """根据上一轮最慢批次的耗时调整批次大小"""
+        target = config.UPSERT_TARGET_LATENCY
+        if latency < target / 2:
+            batch_bytes = int(batch_bytes * 1.5)
+        elif latency > target:
+            batch_bytes = int(batch_bytes * max(target / latency, 0.25))
+        return min(max(batch_bytes, config.UPSERT_MIN_BATCH_BYTES), config.UPSERT_MAX_BATCH_BYTES)
+
+    def _upsert_rows(self, table: str, records: List[dict], on_conflict: str):
+        """
+        并发、自适应批量 upsert
+
+        - 每行只序列化一次，按字节数切批（而不是固定行数）
+        - 每轮并发发送 UPSERT_CONCURRENCY 个批次，共享同一个连接池
+        - 每轮结束后按最慢批次的耗时放大/缩小下一轮的批次字节数
+        """
+        if not records:
+            return
+
+        # PostgREST 批量写入要求每行的键一致，缺失的字段补 null
+        columns = []
+        for record in records:
+            for key in record:
+                if key not in columns:
+                    columns.append(key)
+        rows = [
+            json.dumps(
+                {col: self._clean_value(record.get(col)) for col in columns},
+                ensure_ascii=False,
+                default=self._json_default,
+            ).encode('utf-8')
+            for record in records
+        ]
+
+        workers = max(1, config.UPSERT_CONCURRENCY)
+        batch_bytes = config.UPSERT_BATCH_BYTES
+        total = len(rows)
+        i = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while i < total:
+                bodies = []
+                while i < total and len(bodies) < workers:
+                    j = i
+                    size = 2
+                    while j < total and (j == i or size + len(rows[j]) + 1 <= batch_bytes):
+                        size += len(rows[j]) + 1
+                        j += 1
+                    bodies.append(b'[' + b','.join(rows[i:j]) + b']')
+                    i = j
+
+                latencies = list(pool.map(lambda body: self._post_batch(table, body, on_conflict), bodies))
+                batch_bytes = self._next_batch_bytes(batch_bytes, max(latencies))
     
-    def save_emotion_indicators(self, indicators_list: List[dict]):
+    def _select_all(self, build_query, page_size: int = 1000) -> List[dict]:
+        """
+        分页读取全部结果（PostgREST 默认单次最多返回 1000 行）
+
+        Args:
+            build_query: 无参函数，每次返回一个新的查询构造器
+        """
+        rows = []
+        offset = 0
+        while True:
+            res = self._run_with_retry(
+                lambda: build_query().range(offset, offset + page_size - 1).execute()
+            )
+            batch = res.data or []
+            rows.extend(batch)
+            if len(batch) < page_size:
+                return rows
+            offset += page_size
+
+    def _row_hash(self, record: dict) -> str:
+        """
+        计算一行指标的内容哈希
+
+        空值与缺失字段视为相同；元数据列（row_hash、created_at）不参与计算。
+        """
+        content = {
+            k: self._clean_value(v)
+            for k, v in record.items()
+            if k not in ('row_hash', 'created_at')
+        }
+        content = {k: v for k, v in content.items() if v is not None}
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=self._json_default)
+        return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+    def load_row_hashes(self, start_date: str, end_date: str) -> Dict[str, str]:
+        """
+        读取已存储行的内容哈希
+
+        Returns:
+            {trade_date(YYYY-MM-DD): row_hash}
+        """
+        if not self.supabase:
+            return {}
+
+        rows = self._select_all(
+            lambda: self.supabase.table('emotion_cycle')
+            .select('trade_date,row_hash')
+            .gte('trade_date', start_date)
+            .lte('trade_date', end_date)
+            .order('trade_date')
+        )
+        return {row['trade_date']: row.get('row_hash') for row in rows}
+
+    def _format_indicator_record(self, item: dict) -> dict:
+        """指标字典 -> emotion_cycle 行（日期转为 YYYY-MM-DD，附上定义版本和 row_hash）"""
+        # 复制一份以防修改原数据
+        record = item.copy()
+        # 确保 trade_date 是 YYYY-MM-DD 格式 (数据库通常用 date 类型)
+        if 'trade_date' in record:
+            # 如果是 '20260101' 格式，转为 '2026-01-01'
+            record['trade_date'] = self._to_db_date(record['trade_date'])
+        # 记录产生该行的各指标分组定义版本
+        record.setdefault('def_versions', IndicatorCalculator.definition_versions())
+        record['row_hash'] = self._row_hash(record)
+        return record
+
+    def load_def_versions(self, start_date: str = None, end_date: str = None) -> Dict[str, Optional[dict]]:
+        """
+        读取已存储行的指标定义版本
+
+        Returns:
+            {trade_date(YYYYMMDD): def_versions 或 None}
+        """
+        if not self.supabase:
+            return {}
+
+        def build_query():
+            query = self.supabase.table('emotion_cycle').select('trade_date,def_versions')
+            if start_date:
+                query = query.gte('trade_date', self._to_db_date(start_date))
+            if end_date:
+                query = query.lte('trade_date', self._to_db_date(end_date))
+            return query.order('trade_date')
+
+        rows = self._select_all(build_query)
+        return {row['trade_date'].replace('-', ''): row.get('def_versions') for row in rows}
+
+    def load_input_state(self, start_date: str, end_date: str) -> Dict[str, dict]:
+        """
+        读取已存储行的输入指纹和定义版本（用于跳过输入未变化的交易日）
+
+        Returns:
+            {trade_date(YYYYMMDD): {'input_hash': ..., 'def_versions': ...}}
+        """
+        if not self.supabase:
+            return {}
+
+        try:
+            rows = self._select_all(
+                lambda: self.supabase.table('emotion_cycle')
+                .select('trade_date,input_hash,def_versions')
+                .gte('trade_date', self._to_db_date(start_date))
+                .lte('trade_date', self._to_db_date(end_date))
+                .order('trade_date')
+            )
+        except Exception as e:
+            print(f"[警告] 读取输入指纹失败，将全部重算: {e}")
+            return {}
+        return {row['trade_date'].replace('-', ''): row for row in rows}
+
+    def save_indicator_columns(self, records: List[dict]):
+        """
+        只更新部分指标列（选择性重算）
+
+        每行只包含 trade_date、重算过的列和新的 def_versions，其余列保持不变；
+        row_hash 置空，下次完整写入时重新计算。
+        """
+        if not records or not self.supabase:
+            return
+
+        print("\n[保存] 开始更新过期的指标列...")
+        # _upsert_rows 会为缺失字段补 null，因此按列集合分组写入，避免覆盖未重算的列
+        groups: Dict[tuple, List[dict]] = {}
+        for item in records:
+            record = item.copy()
+            record['trade_date'] = self._to_db_date(record['trade_date'])
+            record['row_hash'] = None
+            groups.setdefault(tuple(sorted(record)), []).append(record)
+        try:
+            for rows in groups.values():
+                self._upsert_rows('emotion_cycle', rows, on_conflict='trade_date')
+            print(f"  [OK] 已更新 {len(records)} 个交易日")
+        except Exception as e:
+            print(f"[错误] 更新指标列失败: {e}")
+            raise
+
+    DERIVED_COLUMNS = ('pct_ranks', 'cycle_phase', 'sentiment_score')
+
+    def save_derived_columns(self, records: List[dict]):
+        """
+        只更新派生列（滚动历史分位 pct_ranks、情绪周期 cycle_phase / sentiment_score）
+
+        派生列由已保存的指标计算，不参与 row_hash，写入时其余列保持不变。
+        """
+        if not records or not self.supabase:
+            return
+
+        rows = [
+            {'trade_date': self._to_db_date(r['trade_date']), **{col: r.get(col) for col in self.DERIVED_COLUMNS}}
+            for r in records
+        ]
+        try:
+            self._upsert_rows('emotion_cycle', rows, on_conflict='trade_date')
+            print(f"[保存] 历史分位和情绪周期 {len(rows)} 个交易日")
+        except Exception as e:
+            print(f"[错误] 保存派生列失败: {e}")
+            raise
+
+    def load_model_state(self, model: str, before_date: str) -> Optional[dict]:
+        """
+        读取某个模型在 before_date 之前最近一个交易日的状态快照
+
+        Returns:
+            {'trade_date': YYYYMMDD, 'state': 状态字典}，没有快照时返回 None
+        """
+        if not self.supabase:
+            return None
+
+        try:
+            response = self._run_with_retry(
+                lambda: self.supabase.table('model_state').select('trade_date,state')
+                .eq('model', model)
+                .lt('trade_date', self._to_db_date(before_date))
+                .order('trade_date', desc=True).limit(1).execute()
+            )
+        except Exception as e:
+            print(f"[警告] 读取模型状态失败，将从头计算: {e}")
+            return None
+        if not response.data:
+            return None
+        row = response.data[0]
+        return {'trade_date': row['trade_date'].replace('-', ''), 'state': row['state']}
+
+    def save_model_states(self, model: str, snapshots: List[dict]):
+        """
+        保存模型逐日状态快照（按 model, trade_date upsert）
+
+        Args:
+            snapshots: [{'trade_date': ..., 'state': 状态字典}]
+        """
+        if not self.supabase or not snapshots:
+            return
+
+        records = [
+            {'model': model, 'trade_date': self._to_db_date(s['trade_date']), 'state': s['state']}
+            for s in snapshots
+        ]
+        try:
+            self._upsert_rows('model_state', records, on_conflict='model,trade_date')
+        except Exception as e:
+            print(f"[错误] 保存模型状态失败: {e}")
+            raise
+
+    def save_emotion_indicators(self, indicators_list: List[dict], only_changed: bool = True):
         """
         保存情绪指标到 Supabase
+
+        Args:
+            indicators_list: 指标列表
+            only_changed: 为 True 时先与库中 row_hash 比对，仅写入新增和内容有变化的行
         """
         if not indicators_list or not self.supabase:
             return
@@ -64,27 +401,21 @@ class DataStorage:
         # Supabase 的 upsert 需要指定 conflict column，这里假设是 trade_date
         try:
             # 确保数据格式正确，特别是日期
-            formatted_data = []
-            for item in indicators_list:
-                # 复制一份以防修改原数据
-                record = item.copy()
-                # 确保 trade_date 是 YYYY-MM-DD 格式 (数据库通常用 date 类型)
-                if 'trade_date' in record:
-                    # 如果是 '20260101' 格式，转为 '2026-01-01'
-                    if isinstance(record['trade_date'], str) and len(record['trade_date']) == 8:
-                        record['trade_date'] = f"{record['trade_date'][:4]}-{record['trade_date'][4:6]}-{record['trade_date'][6:]}"
-                formatted_data.append(record)
-
-            # 分批处理，避免一次请求过大
-            batch_size = 100
-            for i in range(0, len(formatted_data), batch_size):
-                batch = formatted_data[i:i+batch_size]
-                def do_upsert():
-                    return self.supabase.table('emotion_cycle').upsert(batch, on_conflict='trade_date').execute()
-
-                self._run_with_retry(do_upsert)
+            formatted_data = [self._format_indicator_record(item) for item in indicators_list]
+
+            # 与库中已有行比对，跳过内容未变化的行
+            if only_changed:
+                dates = [r['trade_date'] for r in formatted_data]
+                stored = self.load_row_hashes(min(dates), max(dates))
+                changed = [r for r in formatted_data if stored.get(r['trade_date']) != r['row_hash']]
+            else:
+                changed = formatted_data
+            skipped = len(formatted_data) - len(changed)
+
+            # 按字节数自适应分批，并发写入
+            self._upsert_rows('emotion_cycle', changed, on_conflict='trade_date')
             
-            print(f"  [OK] 成功保存 {len(formatted_data)} 条记录")
+            print(f"  [OK] 成功保存 {len(changed)} 条记录（{skipped} 条未变化已跳过）")
             
         except Exception as e:
             print(f"[错误] 保存到 Supabase 失败: {e}")
@@ -101,22 +432,20 @@ class DataStorage:
             return pd.DataFrame()
         
         try:
-            query = self.supabase.table('emotion_cycle').select("*")
-            
-            if start_date:
-                # 统一格式化为 YYYY-MM-DD
-                if len(start_date) == 8:
-                    start_date = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
-                query = query.gte('trade_date', start_date)
-            
-            if end_date:
-                if len(end_date) == 8:
-                    end_date = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
-                query = query.lte('trade_date', end_date)
+            def build_query():
+                query = self.supabase.table('emotion_cycle').select("*")
+                
+                if start_date:
+                    # 统一格式化为 YYYY-MM-DD
+                    query = query.gte('trade_date', self._to_db_date(start_date))
+                
+                if end_date:
+                    query = query.lte('trade_date', self._to_db_date(end_date))
+                
+                return query.order('trade_date')
             
-            # 执行查询
-            response = self._run_with_retry(lambda: query.execute())
-            data = response.data
+            # 分页执行查询（单次最多返回 1000 行）
+            data = self._select_all(build_query)
             
             if not data:
                 return pd.DataFrame()
@@ -133,6 +462,115 @@ class DataStorage:
             print(f"[错误] 从 Supabase 读取失败: {e}")
             return pd.DataFrame()
 
+    def replace_emotion_breakdown(self, rows: List[dict], start_date: str, end_date: str) -> int:
+        """
+        原子替换指定区间的分行业、分板块指标（调用库内 replace_emotion_breakdown）
+
+        重算后已不存在的行业/板块行随区间一起删除。
+
+        Args:
+            rows: BreakdownCalculator.calculate_batch 的结果（区间内全部交易日）
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+
+        Returns:
+            写入的行数
+        """
+        return self._replace_range('replace_emotion_breakdown', rows, start_date, end_date, '分行业/分板块指标')
+
+    def load_emotion_breakdown(self, dimension: str, start_date: str = None, end_date: str = None,
+                               key: str = None) -> pd.DataFrame:
+        """
+        读取分维度指标
+
+        Args:
+            dimension: industry 或 segment
+            start_date: 开始日期 YYYY-MM-DD 或 YYYYMMDD
+            end_date: 结束日期 YYYY-MM-DD 或 YYYYMMDD
+            key: 只读取某个行业/板块（可选）
+        """
+        if not self.supabase:
+            return pd.DataFrame()
+
+        try:
+            def build_query():
+                # 按分区键过滤，只扫描对应分区
+                query = self.supabase.table('emotion_breakdown').select('*').eq('dimension', dimension)
+                if start_date:
+                    query = query.gte('trade_date', self._to_db_date(start_date))
+                if end_date:
+                    query = query.lte('trade_date', self._to_db_date(end_date))
+                if key:
+                    query = query.eq('key', key)
+                return query.order('trade_date').order('key')
+
+            data = self._select_all(build_query)
+            if not data:
+                return pd.DataFrame()
+
+            df = pd.DataFrame(data)
+            df['trade_date'] = pd.to_datetime(df['trade_date'])
+            return df
+
+        except Exception as e:
+            print(f"[错误] 读取分维度指标失败: {e}")
+            return pd.DataFrame()
+
+    def replace_board_ladder(self, rows: List[dict], start_date: str, end_date: str) -> int:
+        """
+        原子替换指定区间的连板梯队（调用库内 replace_board_ladder）
+
+        不再出现在当日梯队中的股票（被剔除或数据修正）随区间一起删除。
+
+        Args:
+            rows: BoardLadderTracker 生成的梯队行（区间内全部交易日）
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+
+        Returns:
+            写入的行数
+        """
+        return self._replace_range('replace_board_ladder', rows, start_date, end_date, '连板梯队')
+
+    def load_board_ladder(self, trade_date: str = None, ts_code: str = None) -> pd.DataFrame:
+        """
+        读取连板梯队
+
+        Args:
+            trade_date: 读取某一日的梯队（YYYY-MM-DD 或 YYYYMMDD）；与 ts_code 都为空时读取最新一日
+            ts_code: 读取某只股票的连板历史
+        """
+        if not self.supabase:
+            return pd.DataFrame()
+
+        try:
+            if trade_date is None and ts_code is None:
+                latest = self._run_with_retry(lambda: self.supabase.table('board_ladder').select('trade_date')
+                                              .order('trade_date', desc=True).limit(1).execute())
+                if not latest.data:
+                    return pd.DataFrame()
+                trade_date = latest.data[0]['trade_date']
+
+            def build_query():
+                query = self.supabase.table('board_ladder').select('trade_date,ts_code,name,board,first_time,broken')
+                if trade_date:
+                    query = query.eq('trade_date', self._to_db_date(trade_date))
+                if ts_code:
+                    query = query.eq('ts_code', ts_code)
+                return query.order('trade_date').order('board', desc=True).order('first_time')
+
+            data = self._select_all(build_query)
+            if not data:
+                return pd.DataFrame()
+
+            df = pd.DataFrame(data)
+            df['trade_date'] = pd.to_datetime(df['trade_date'])
+            return df
+
+        except Exception as e:
+            print(f"[错误] 读取连板梯队失败: {e}")
+            return pd.DataFrame()
+
     def get_latest_date(self) -> Optional[str]:
         """
         获取数据库中最新的交易日期
@@ -173,6 +611,122 @@ class DataStorage:
             print(f"[错误] 写入 update_log 失败: {e}")
             raise
 
+    @classmethod
+    def _frame_to_columns(cls, df: pd.DataFrame) -> dict:
+        """DataFrame -> 列式 JSON（{列名: 值列表}），比逐行对象紧凑得多"""
+        return {
+            col: [cls._clean_value(v.item() if isinstance(v, np.generic) else v) for v in df[col].tolist()]
+            for col in df.columns
+        }
+
+    def save_prev_day_state(self, state: dict):
+        """
+        保存跨日计算所需的前一日状态（见 IndicatorCalculator.build_carry_state）
+
+        仅保留最近 PREV_STATE_KEEP_DAYS 个交易日，旧状态自动清理。
+        """
+        if not self.supabase or not state:
+            return
+
+        payload = {
+            'trade_date': self._to_db_date(state['trade_date']),
+            'limit_data': self._frame_to_columns(state['limit_data']),
+            'daily': self._frame_to_columns(state['daily']),
+        }
+        try:
+            self._run_with_retry(
+                lambda: self.supabase.table('prev_day_state').upsert(payload, on_conflict='trade_date').execute()
+            )
+
+            keep = self._run_with_retry(
+                lambda: self.supabase.table('prev_day_state')
+                .select('trade_date')
+                .order('trade_date', desc=True)
+                .range(config.PREV_STATE_KEEP_DAYS - 1, config.PREV_STATE_KEEP_DAYS - 1)
+                .execute()
+            )
+            if keep.data:
+                cutoff = keep.data[0]['trade_date']
+                self._run_with_retry(
+                    lambda: self.supabase.table('prev_day_state').delete().lt('trade_date', cutoff).execute()
+                )
+        except Exception as e:
+            print(f"[错误] 保存前一日状态失败: {e}")
+            raise
+
+    def load_prev_day_state(self, trade_date: str) -> Optional[dict]:
+        """
+        读取指定交易日的前一日状态
+
+        Args:
+            trade_date: 交易日期 YYYYMMDD
+
+        Returns:
+            与 IndicatorCalculator.build_carry_state 同结构的字典，不存在时返回 None
+        """
+        if not self.supabase:
+            return None
+
+        try:
+            res = self._run_with_retry(
+                lambda: self.supabase.table('prev_day_state')
+                .select('trade_date,limit_data,daily')
+                .eq('trade_date', self._to_db_date(trade_date))
+                .limit(1)
+                .execute()
+            )
+            if not res.data:
+                return None
+
+            row = res.data[0]
+            return {
+                'trade_date': row['trade_date'].replace('-', ''),
+                'limit_data': pd.DataFrame(row['limit_data']),
+                'daily': pd.DataFrame(row['daily']),
+            }
+        except Exception as e:
+            print(f"[错误] 读取前一日状态失败: {e}")
+            return None
+
+    def load_security_dict(self) -> Dict[str, int]:
+        """
+        读取证券代码字典（见 security_index.SecurityIndex）
+
+        Returns:
+            {ts_code: sec_id}
+        """
+        if not self.supabase:
+            return {}
+
+        try:
+            rows = self._select_all(
+                lambda: self.supabase.table('security_dict')
+                .select('ts_code,sec_id')
+                .order('sec_id')
+            )
+            return {row['ts_code']: int(row['sec_id']) for row in rows}
+        except Exception as e:
+            print(f"[错误] 读取证券代码字典失败: {e}")
+            return {}
+
+    def save_security_dict(self, mapping: Dict[str, int]):
+        """
+        追加新分配的证券编号
+
+        Args:
+            mapping: {ts_code: sec_id}，通常为 SecurityIndex.pop_pending() 的结果
+        """
+        if not self.supabase or not mapping:
+            return
+
+        records = [{'ts_code': code, 'sec_id': int(sec_id)} for code, sec_id in mapping.items()]
+        try:
+            self._upsert_rows('security_dict', records, on_conflict='ts_code')
+            print(f"[保存] 证券代码字典新增 {len(records)} 条")
+        except Exception as e:
+            print(f"[错误] 保存证券代码字典失败: {e}")
+            raise
+
     def get_last_update_run(self) -> Optional[dict]:
         if not self.supabase:
             return None
@@ -214,23 +768,190 @@ class DataStorage:
             print(f"[错误] 获取日期范围失败: {e}")
             return None, None
 
-    # 以下方法暂时保留空实现或简化实现，因为 Vercel 部署主要关注 emotion_cycle 的展示
-    # 如果需要完整功能（如 raw data 存储），需要在 Supabase 建更多表
-    
+    # 原始数据（daily / limit_list）默认不入库以节省数据库空间；
+    # 开启 STORE_RAW_IN_SUPABASE 后写入 raw_daily / raw_limit_list，
+    # 库内的 compute_emotion_cycle / refresh_emotion_cycle 即可在数据旁直接重算指标
+
+    RAW_TABLE_COLUMNS = {
+        'raw_daily': [
+            'trade_date', 'ts_code', 'open', 'high', 'low', 'close', 'pre_close',
+            'change', 'pct_chg', 'vol', 'amount',
+        ],
+        'raw_limit_list': [
+            'trade_date', 'ts_code', 'industry', 'name', 'close', 'pct_chg', 'amount',
+            'limit_amount', 'float_mv', 'total_mv', 'turnover_ratio', 'fd_amount',
+            'first_time', 'last_time', 'open_times', 'up_stat', 'limit_times', 'limit',
+        ],
+    }
+
+    @staticmethod
+    def _to_db_date(date_str: str) -> str:
+        """YYYYMMDD -> YYYY-MM-DD（其他格式原样返回）"""
+        if isinstance(date_str, str) and len(date_str) == 8:
+            return f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+        return date_str
+
+    def _raw_records(self, table: str, df: pd.DataFrame) -> List[dict]:
+        """把 tushare 返回的 DataFrame 转为 raw 表的行"""
+        columns = [c for c in self.RAW_TABLE_COLUMNS[table] if c in df.columns]
+        df = df[columns].astype(object).where(df[columns].notna(), None)
+        records = df.to_dict('records')
+        for record in records:
+            record['trade_date'] = self._to_db_date(record['trade_date'])
+        return records
+
     def save_raw_data(self, all_data: List[dict]):
         """
-        (简化版) 仅打印日志，实际生产环境建议存到 Supabase Storage 或其他表
+        保存原始数据到本地 data/raw（STORE_RAW_LOCAL）和 Supabase（STORE_RAW_IN_SUPABASE）
         """
-        print("[提示] Supabase 版本暂不存储 raw_data (daily/limit/basic) 以节省数据库空间，仅存储 emotion_cycle 指标。")
-        pass
+        if config.STORE_RAW_LOCAL:
+            LocalRawStore().save(all_data)
+
+        if not config.STORE_RAW_IN_SUPABASE or not self.supabase:
+            print("[提示] 未开启 STORE_RAW_IN_SUPABASE，不存储 raw_data (daily/limit/basic)，仅存储 emotion_cycle 指标。")
+            return
+
+        print("\n[保存] 开始保存原始数据到 Supabase...")
+        daily_records = []
+        limit_records = []
+        for data in all_data:
+            if not data['daily'].empty:
+                daily_records.extend(self._raw_records('raw_daily', data['daily']))
+            if not data['limit_data'].empty:
+                limit_records.extend(self._raw_records('raw_limit_list', data['limit_data']))
+
+        try:
+            self._upsert_rows('raw_daily', daily_records, on_conflict='trade_date,ts_code')
+            print(f"  [OK] 日线数据: {len(daily_records)}条")
+            self._upsert_rows('raw_limit_list', limit_records, on_conflict='trade_date,ts_code')
+            print(f"  [OK] 涨跌停数据: {len(limit_records)}条")
+        except Exception as e:
+            print(f"[错误] 保存原始数据失败: {e}")
+            raise
+
+    def _load_raw(self, table: str, start_date: str, end_date: str, limit_type: str = None) -> pd.DataFrame:
+        if not config.STORE_RAW_IN_SUPABASE or not self.supabase:
+            return pd.DataFrame()
+
+        try:
+            def build_query():
+                query = (
+                    self.supabase.table(table)
+                    .select('*')
+                    .gte('trade_date', self._to_db_date(start_date))
+                    .lte('trade_date', self._to_db_date(end_date))
+                )
+                if limit_type:
+                    query = query.eq('limit', limit_type)
+                return query.order('trade_date').order('ts_code')
+
+            rows = self._select_all(build_query)
+            if not rows:
+                return pd.DataFrame()
+
+            df = pd.DataFrame(rows)
+            # 与 tushare 返回保持一致：trade_date 为 YYYYMMDD 字符串
+            df['trade_date'] = df['trade_date'].str.replace('-', '')
+            return df
+        except Exception as e:
+            print(f"[错误] 从 {table} 读取失败: {e}")
+            return pd.DataFrame()
 
     def load_limit_data(self, start_date: str, end_date: str, limit_type: str = None) -> pd.DataFrame:
-        """暂不支持从 Supabase 读取详细涨跌停数据"""
-        return pd.DataFrame()
+        """读取指定日期范围的涨跌停数据（需开启 STORE_RAW_IN_SUPABASE）"""
+        return self._load_raw('raw_limit_list', start_date, end_date, limit_type)
     
     def load_daily_data(self, start_date: str, end_date: str) -> pd.DataFrame:
-        """暂不支持从 Supabase 读取详细日线数据"""
-        return pd.DataFrame()
+        """读取指定日期范围的日线数据（需开启 STORE_RAW_IN_SUPABASE）"""
+        return self._load_raw('raw_daily', start_date, end_date)
+
+    def compute_indicators_server_side(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        调用库内 compute_emotion_cycle 计算指标（只读，不写回）
+
+        Returns:
+            与 emotion_cycle 同结构的 DataFrame
+        """
+        if not self.supabase:
+            return pd.DataFrame()
+
+        params = {'p_start': self._to_db_date(start_date), 'p_end': self._to_db_date(end_date)}
+        rows = self._select_all(lambda: self.supabase.rpc('compute_emotion_cycle', params))
+        df = pd.DataFrame(rows)
+        if 'trade_date' in df.columns:
+            df['trade_date'] = pd.to_datetime(df['trade_date'])
+        return df
+
+    def refresh_indicators_server_side(self, start_date: str, end_date: str) -> int:
+        """
+        调用库内 refresh_emotion_cycle，在数据库中重算并写回指定区间
+
+        Returns:
+            写入的行数
+        """
+        if not self.supabase:
+            return 0
+
+        params = {'p_start': self._to_db_date(start_date), 'p_end': self._to_db_date(end_date)}
+        res = self._run_with_retry(lambda: self.supabase.rpc('refresh_emotion_cycle', params).execute())
+        return int(res.data or 0)
+
+    def replace_emotion_indicators(self, indicators_list: List[dict], start_date: str, end_date: str) -> int:
+        """
+        原子替换指定区间的情绪指标（调用库内 replace_emotion_cycle，删除与写入在同一事务中）
+
+        Args:
+            indicators_list: 区间内全部交易日的指标列表
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+
+        Returns:
+            写入的行数
+        """
+        if not self.supabase:
+            return 0
+
+        print("\n[保存] 开始原子替换情绪指标...")
+        rows = [
+            {k: self._clean_value(v.item() if isinstance(v, np.generic) else v) for k, v in record.items()}
+            for record in map(self._format_indicator_record, indicators_list)
+        ]
+        params = {
+            'p_start': self._to_db_date(start_date),
+            'p_end': self._to_db_date(end_date),
+            'p_rows': rows,
+        }
+        try:
+            res = self._run_with_retry(lambda: self.supabase.rpc('replace_emotion_cycle', params).execute())
+            affected = int(res.data or 0)
+            print(f"  [OK] {start_date} ~ {end_date} 已替换为 {affected} 条记录")
+            return affected
+        except Exception as e:
+            print(f"[错误] 替换情绪指标失败: {e}")
+            raise
+
+    def _replace_range(self, function: str, rows: List[dict], start_date: str, end_date: str, label: str) -> int:
+        """调用库内替换函数：在一个事务内删除 [start_date, end_date] 的旧行并写入 rows"""
+        if not self.supabase:
+            return 0
+
+        params = {
+            'p_start': self._to_db_date(start_date),
+            'p_end': self._to_db_date(end_date),
+            'p_rows': [
+                {k: self._clean_value(v.item() if isinstance(v, np.generic) else v)
+                 for k, v in {**row, 'trade_date': self._to_db_date(row['trade_date'])}.items()}
+                for row in rows
+            ],
+        }
+        try:
+            res = self._run_with_retry(lambda: self.supabase.rpc(function, params).execute())
+            affected = int(res.data or 0)
+            print(f"[保存] {label} {start_date} ~ {end_date} 已替换为 {affected} 条")
+            return affected
+        except Exception as e:
+            print(f"[错误] 替换{label}失败: {e}")
+            raise
 
     def export_to_excel(self, df: pd.DataFrame, output_file: str):
         """保持原有的 Excel 导出逻辑 (在内存/临时文件处理)"""
@@ -0,0 +1,2 @@
+-- 指标行内容哈希：写入前与新计算结果比对，未变化的行不再重复 upsert
+alter table emotion_cycle add column if not exists row_hash text;
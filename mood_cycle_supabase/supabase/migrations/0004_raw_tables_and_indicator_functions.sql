@@ -0,0 +1,353 @@
+-- 原始数据表：日线行情与涨跌停明细（字段与 tushare 返回保持一致）
+create table if not exists raw_daily (
+  trade_date date not null,
+  ts_code text not null,
+  open float,
+  high float,
+  low float,
+  close float,
+  pre_close float,
+  change float,
+  pct_chg float,
+  vol float,
+  amount float,
+  primary key (trade_date, ts_code)
+);
+
+create table if not exists raw_limit_list (
+  trade_date date not null,
+  ts_code text not null,
+  industry text,
+  name text,
+  close float,
+  pct_chg float,
+  amount float,
+  limit_amount float,
+  float_mv float,
+  total_mv float,
+  turnover_ratio float,
+  fd_amount float,
+  first_time text,
+  last_time text,
+  open_times int,
+  up_stat text,
+  limit_times int,
+  "limit" text,
+  primary key (trade_date, ts_code)
+);
+
+create index if not exists raw_limit_list_limit_idx on raw_limit_list (trade_date, "limit");
+
+alter table raw_daily enable row level security;
+alter table raw_limit_list enable row level security;
+
+create policy "Allow public read access"
+  on raw_daily for select
+  using (true);
+
+create policy "Allow public read access"
+  on raw_limit_list for select
+  using (true);
+
+-- 与 emotion_cycle 一致：允许写入（生产环境建议改用 service_role key 并收紧策略）
+create policy "Allow public insert"
+  on raw_daily for insert
+  with check (true);
+
+create policy "Allow public update"
+  on raw_daily for update
+  using (true);
+
+create policy "Allow public insert"
+  on raw_limit_list for insert
+  with check (true);
+
+create policy "Allow public update"
+  on raw_limit_list for update
+  using (true);
+
+
+-- 指标计算函数：与 indicators.IndicatorCalculator 的口径逐项对应
+--
+-- 前一交易日 = 原始表中早于当日的最近一个交易日。
+-- 红盘率/溢价：前一交易日有涨跌停数据时，按「昨日N板今日表现」计算
+--   （今日涨幅 > 0 为红盘，溢价为今日平均涨幅）；
+--   否则按「今日N板」计算（开盘价 >= 昨收为红盘，溢价为涨停股平均涨幅）。
+-- 晋级率：分母 = 昨日N板且今日有交易，分子 = 其中今日涨停的只数；
+--   今日无日线数据时分母不做交易过滤。
+create or replace function compute_emotion_cycle(p_start date, p_end date)
+returns table (
+  trade_date date,
+  up_count int,
+  down_count int,
+  up5_count int,
+  down5_count int,
+  limit_up_count int,
+  limit_down_count int,
+  break_count int,
+  break_rate float,
+  first_board int,
+  second_board int,
+  third_board int,
+  above_third int,
+  max_board int,
+  fanpao_count int,
+  limit_amount float,
+  seal_amount float,
+  first_red_rate float,
+  first_premium float,
+  second_red_rate float,
+  second_premium float,
+  third_red_rate float,
+  third_premium float,
+  third_plus_red_rate float,
+  third_plus_premium float,
+  advance_1to2 float,
+  advance_2to3 float,
+  advance_3to4 float,
+  advance_3plus float
+)
+language sql stable
+as $$
+with trade_days as (
+  select r.trade_date from raw_daily r
+  union
+  select l.trade_date from raw_limit_list l
+),
+days as (
+  select t.trade_date as day, lag(t.trade_date) over (order by t.trade_date) as prev_day
+  from trade_days t
+),
+sel as (
+  select
+    d.day,
+    d.prev_day,
+    exists (select 1 from raw_daily r where r.trade_date = d.day) as has_daily,
+    exists (select 1 from raw_daily r where r.trade_date = d.prev_day) as has_prev_daily,
+    exists (select 1 from raw_limit_list l where l.trade_date = d.prev_day) as has_prev_limit
+  from days d
+  where d.day between p_start and p_end
+),
+mkt as (
+  select
+    r.trade_date as day,
+    count(*) filter (where r.pct_chg > 0) as up_count,
+    count(*) filter (where r.pct_chg < 0) as down_count,
+    count(*) filter (where r.pct_chg >= 5) as up5_count,
+    count(*) filter (where r.pct_chg <= -5) as down5_count
+  from raw_daily r
+  join sel s on s.day = r.trade_date
+  group by r.trade_date
+),
+lim as (
+  select
+    l.trade_date as day,
+    count(*) filter (where l."limit" = 'U') as limit_up_count,
+    count(*) filter (where l."limit" = 'D') as limit_down_count,
+    count(*) filter (where l."limit" = 'Z') as break_count,
+    count(*) filter (where l."limit" = 'U' and l.limit_times = 1) as first_board,
+    count(*) filter (where l."limit" = 'U' and l.limit_times = 2) as second_board,
+    count(*) filter (where l."limit" = 'U' and l.limit_times = 3) as third_board,
+    count(*) filter (where l."limit" = 'U' and l.limit_times >= 3) as above_third,
+    coalesce(max(l.limit_times) filter (where l."limit" = 'U'), 0) as max_board,
+    coalesce(sum(l.amount) filter (where l."limit" = 'U'), 0) / 1e8 as limit_amount,
+    coalesce(sum(l.fd_amount) filter (where l."limit" = 'U'), 0) / 1e8 as seal_amount
+  from raw_limit_list l
+  join sel s on s.day = l.trade_date
+  group by l.trade_date
+),
+-- 今日涨停 + 当日日线（open/low/pre_close）
+up_today as (
+  select l.trade_date as day, l.ts_code, l.limit_times, l.pct_chg, r.open, r.low, r.pre_close
+  from raw_limit_list l
+  join sel s on s.day = l.trade_date
+  left join raw_daily r on r.trade_date = l.trade_date and r.ts_code = l.ts_code
+  where l."limit" = 'U'
+),
+-- 昨日涨停（挂到今日）
+prev_up as (
+  select s.day, p.ts_code, p.limit_times
+  from sel s
+  join raw_limit_list p on p.trade_date = s.prev_day and p."limit" = 'U'
+),
+fanpao as (
+  select u.day, count(*) as fanpao_count
+  from up_today u
+  join sel s on s.day = u.day
+  join raw_daily pr on pr.trade_date = s.prev_day and pr.ts_code = u.ts_code
+  where pr.low is not null and u.low < pr.low
+  group by u.day
+),
+-- 今日N板的开盘红盘与平均涨幅
+tperf as (
+  select
+    u.day,
+    count(*) filter (where u.limit_times = 1) as n1,
+    count(*) filter (where u.limit_times = 1 and u.open >= u.pre_close) as red1,
+    avg(u.pct_chg) filter (where u.limit_times = 1) as prem1,
+    count(*) filter (where u.limit_times = 2) as n2,
+    count(*) filter (where u.limit_times = 2 and u.open >= u.pre_close) as red2,
+    avg(u.pct_chg) filter (where u.limit_times = 2) as prem2,
+    count(*) filter (where u.limit_times >= 3) as n3,
+    count(*) filter (where u.limit_times >= 3 and u.open >= u.pre_close) as red3,
+    avg(u.pct_chg) filter (where u.limit_times >= 3) as prem3
+  from up_today u
+  group by u.day
+),
+-- 昨日N板在今日的表现
+yperf as (
+  select
+    pu.day,
+    count(*) filter (where pu.limit_times = 1) as n1,
+    count(*) filter (where pu.limit_times = 1 and r.pct_chg > 0) as red1,
+    avg(r.pct_chg) filter (where pu.limit_times = 1) as prem1,
+    count(*) filter (where pu.limit_times = 2) as n2,
+    count(*) filter (where pu.limit_times = 2 and r.pct_chg > 0) as red2,
+    avg(r.pct_chg) filter (where pu.limit_times = 2) as prem2,
+    count(*) filter (where pu.limit_times = 3) as n3,
+    count(*) filter (where pu.limit_times = 3 and r.pct_chg > 0) as red3,
+    avg(r.pct_chg) filter (where pu.limit_times = 3) as prem3,
+    count(*) filter (where pu.limit_times >= 3) as n3p,
+    count(*) filter (where pu.limit_times >= 3 and r.pct_chg > 0) as red3p,
+    avg(r.pct_chg) filter (where pu.limit_times >= 3) as prem3p
+  from prev_up pu
+  join raw_daily r on r.trade_date = pu.day and r.ts_code = pu.ts_code
+  group by pu.day
+),
+-- 晋级：昨日N板（今日有交易）→ 今日涨停
+adv as (
+  select
+    pu.day,
+    count(*) filter (where pu.limit_times = 1 and (r.ts_code is not null or not s.has_daily)) as n1,
+    count(*) filter (where pu.limit_times = 1 and (r.ts_code is not null or not s.has_daily) and t.ts_code is not null) as a1,
+    count(*) filter (where pu.limit_times = 2 and (r.ts_code is not null or not s.has_daily)) as n2,
+    count(*) filter (where pu.limit_times = 2 and (r.ts_code is not null or not s.has_daily) and t.ts_code is not null) as a2,
+    count(*) filter (where pu.limit_times = 3 and (r.ts_code is not null or not s.has_daily)) as n3,
+    count(*) filter (where pu.limit_times = 3 and (r.ts_code is not null or not s.has_daily) and t.ts_code is not null) as a3,
+    count(*) filter (where pu.limit_times >= 4 and (r.ts_code is not null or not s.has_daily)) as n4,
+    count(*) filter (where pu.limit_times >= 4 and (r.ts_code is not null or not s.has_daily) and t.ts_code is not null) as a4
+  from prev_up pu
+  join sel s on s.day = pu.day
+  left join raw_daily r on r.trade_date = pu.day and r.ts_code = pu.ts_code
+  left join raw_limit_list t on t.trade_date = pu.day and t.ts_code = pu.ts_code and t."limit" = 'U'
+  group by pu.day
+)
+select
+  s.day as trade_date,
+  coalesce(m.up_count, 0)::int,
+  coalesce(m.down_count, 0)::int,
+  coalesce(m.up5_count, 0)::int,
+  coalesce(m.down5_count, 0)::int,
+  coalesce(l.limit_up_count, 0)::int,
+  coalesce(l.limit_down_count, 0)::int,
+  coalesce(l.break_count, 0)::int,
+  case when coalesce(l.limit_up_count, 0) + coalesce(l.break_count, 0) > 0
+       then round(l.break_count * 100.0 / (l.limit_up_count + l.break_count), 2)::float
+       else 0 end,
+  coalesce(l.first_board, 0)::int,
+  coalesce(l.second_board, 0)::int,
+  coalesce(l.third_board, 0)::int,
+  coalesce(l.above_third, 0)::int,
+  coalesce(l.max_board, 0)::int,
+  case when s.has_daily and s.has_prev_daily then coalesce(f.fanpao_count, 0) else 0 end::int,
+  round(coalesce(l.limit_amount, 0)::numeric, 2)::float,
+  round(coalesce(l.seal_amount, 0)::numeric, 2)::float,
+  -- 红盘率/溢价
+  case when s.has_prev_limit
+       then case when y.n1 > 0 then round(y.red1 * 100.0 / y.n1, 2)::float end
+       else case when s.has_daily and tp.n1 > 0 then round(tp.red1 * 100.0 / tp.n1, 2)::float end end,
+  case when s.has_prev_limit
+       then case when y.n1 > 0 then round(y.prem1::numeric, 2)::float end
+       else case when tp.n1 > 0 then round(tp.prem1::numeric, 2)::float end end,
+  case when s.has_prev_limit
+       then case when y.n2 > 0 then round(y.red2 * 100.0 / y.n2, 2)::float end
+       else case when s.has_daily and tp.n2 > 0 then round(tp.red2 * 100.0 / tp.n2, 2)::float end end,
+  case when s.has_prev_limit
+       then case when y.n2 > 0 then round(y.prem2::numeric, 2)::float end
+       else case when tp.n2 > 0 then round(tp.prem2::numeric, 2)::float end end,
+  case when s.has_prev_limit
+       then case when y.n3 > 0 then round(y.red3 * 100.0 / y.n3, 2)::float end
+       else case when s.has_daily and tp.n3 > 0 then round(tp.red3 * 100.0 / tp.n3, 2)::float end end,
+  case when s.has_prev_limit
+       then case when y.n3 > 0 then round(y.prem3::numeric, 2)::float end
+       else case when tp.n3 > 0 then round(tp.prem3::numeric, 2)::float end end,
+  case when s.has_prev_limit and y.n3p > 0 then round(y.red3p * 100.0 / y.n3p, 2)::float end,
+  case when s.has_prev_limit and y.n3p > 0 then round(y.prem3p::numeric, 2)::float end,
+  -- 晋级率（今日无涨停时为空）
+  case when coalesce(l.limit_up_count, 0) > 0 and a.n1 > 0 then round(a.a1 * 100.0 / a.n1, 2)::float end,
+  case when coalesce(l.limit_up_count, 0) > 0 and a.n2 > 0 then round(a.a2 * 100.0 / a.n2, 2)::float end,
+  case when coalesce(l.limit_up_count, 0) > 0 and a.n3 > 0 then round(a.a3 * 100.0 / a.n3, 2)::float end,
+  case when coalesce(l.limit_up_count, 0) > 0 and a.n4 > 0 then round(a.a4 * 100.0 / a.n4, 2)::float end
+from sel s
+left join mkt m on m.day = s.day
+left join lim l on l.day = s.day
+left join fanpao f on f.day = s.day
+left join tperf tp on tp.day = s.day
+left join yperf y on y.day = s.day
+left join adv a on a.day = s.day
+order by s.day
+$$;
+
+
+-- 在库内重算指定区间并写回 emotion_cycle（一条集合语句完成）
+-- row_hash 置空，下一次客户端写入时会重新比对
+create or replace function refresh_emotion_cycle(p_start date, p_end date)
+returns integer
+language plpgsql
+as $$
+declare
+  affected integer;
+begin
+  insert into emotion_cycle (
+    trade_date, up_count, down_count, up5_count, down5_count,
+    limit_up_count, limit_down_count, break_count, break_rate,
+    first_board, second_board, third_board, above_third, max_board,
+    fanpao_count, limit_amount, seal_amount,
+    first_red_rate, first_premium, second_red_rate, second_premium,
+    third_red_rate, third_premium, third_plus_red_rate, third_plus_premium,
+    advance_1to2, advance_2to3, advance_3to4, advance_3plus, row_hash
+  )
+  select
+    c.trade_date, c.up_count, c.down_count, c.up5_count, c.down5_count,
+    c.limit_up_count, c.limit_down_count, c.break_count, c.break_rate,
+    c.first_board, c.second_board, c.third_board, c.above_third, c.max_board,
+    c.fanpao_count, c.limit_amount, c.seal_amount,
+    c.first_red_rate, c.first_premium, c.second_red_rate, c.second_premium,
+    c.third_red_rate, c.third_premium, c.third_plus_red_rate, c.third_plus_premium,
+    c.advance_1to2, c.advance_2to3, c.advance_3to4, c.advance_3plus, null
+  from compute_emotion_cycle(p_start, p_end) c
+  on conflict (trade_date) do update set
+    up_count = excluded.up_count,
+    down_count = excluded.down_count,
+    up5_count = excluded.up5_count,
+    down5_count = excluded.down5_count,
+    limit_up_count = excluded.limit_up_count,
+    limit_down_count = excluded.limit_down_count,
+    break_count = excluded.break_count,
+    break_rate = excluded.break_rate,
+    first_board = excluded.first_board,
+    second_board = excluded.second_board,
+    third_board = excluded.third_board,
+    above_third = excluded.above_third,
+    max_board = excluded.max_board,
+    fanpao_count = excluded.fanpao_count,
+    limit_amount = excluded.limit_amount,
+    seal_amount = excluded.seal_amount,
+    first_red_rate = excluded.first_red_rate,
+    first_premium = excluded.first_premium,
+    second_red_rate = excluded.second_red_rate,
+    second_premium = excluded.second_premium,
+    third_red_rate = excluded.third_red_rate,
+    third_premium = excluded.third_premium,
+    third_plus_red_rate = excluded.third_plus_red_rate,
+    third_plus_premium = excluded.third_plus_premium,
+    advance_1to2 = excluded.advance_1to2,
+    advance_2to3 = excluded.advance_2to3,
+    advance_3to4 = excluded.advance_3to4,
+    advance_3plus = excluded.advance_3plus,
+    row_hash = null;
+
+  get diagnostics affected = row_count;
+  return affected;
+end;
+$$;
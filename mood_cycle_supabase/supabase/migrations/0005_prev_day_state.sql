@@ -0,0 +1,27 @@
+-- 前一日状态快照：次日计算反包、昨日涨停表现、晋级率所需的最小数据
+-- limit_data: {"ts_code": [...], "limit": [...], "limit_times": [...]}
+-- daily:      {"ts_code": [...], "low": [...]}
+create table if not exists prev_day_state (
+  trade_date date primary key,
+  limit_data jsonb not null,
+  daily jsonb not null,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+alter table prev_day_state enable row level security;
+
+create policy "Allow public read access"
+  on prev_day_state for select
+  using (true);
+
+create policy "Allow public insert"
+  on prev_day_state for insert
+  with check (true);
+
+create policy "Allow public update"
+  on prev_day_state for update
+  using (true);
+
+create policy "Allow public delete"
+  on prev_day_state for delete
+  using (true);
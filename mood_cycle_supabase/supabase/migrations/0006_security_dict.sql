@@ -0,0 +1,21 @@
+-- 证券代码字典：ts_code -> 稠密整数编号（从 0 连续分配，分配后不再改变）
+-- 指标计算时跨日集合运算使用整数编号，由 update_data.py 在运行结束时追加新编号
+create table if not exists security_dict (
+  ts_code text primary key,
+  sec_id integer not null unique,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+alter table security_dict enable row level security;
+
+create policy "Allow public read access"
+  on security_dict for select
+  using (true);
+
+create policy "Allow public insert"
+  on security_dict for insert
+  with check (true);
+
+create policy "Allow public update"
+  on security_dict for update
+  using (true);
@@ -0,0 +1,27 @@
+-- 离线重算（update_data.py --recompute）使用：在一个事务内删除区间旧行并写入新行，
+-- 读者要么看到全部旧数据，要么看到全部新数据；区间内已不存在的交易日也会被删除
+-- p_rows: emotion_cycle 行组成的 JSON 数组（字段名与表列名一致，缺失字段为 null）
+create policy "Allow public delete"
+  on emotion_cycle for delete
+  using (true);
+
+create or replace function replace_emotion_cycle(p_start date, p_end date, p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  affected integer;
+begin
+  delete from emotion_cycle where trade_date between p_start and p_end;
+
+  insert into emotion_cycle
+  select (jsonb_populate_record(
+    null::emotion_cycle,
+    jsonb_build_object('created_at', timezone('utc'::text, now())) || r
+  )).*
+  from jsonb_array_elements(p_rows) r;
+
+  get diagnostics affected = row_count;
+  return affected;
+end;
+$$;
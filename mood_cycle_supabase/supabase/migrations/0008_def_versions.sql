@@ -0,0 +1,3 @@
+-- 各指标分组的定义版本（见 IndicatorCalculator.INDICATOR_GROUPS），例如 {"market": 1, "premium": 2}
+-- 为空或版本落后的分组视为过期，可用 update_data.py --recompute --stale-only 选择性重算
+alter table emotion_cycle add column if not exists def_versions jsonb;
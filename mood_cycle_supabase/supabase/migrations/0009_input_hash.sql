@@ -0,0 +1,3 @@
+-- 当日指标输入的内容指纹（见 IndicatorCalculator.input_fingerprint）
+-- 重跑区间时，指纹与定义版本都未变化的交易日跳过原始数据写入和指标重算
+alter table emotion_cycle add column if not exists input_hash text;
@@ -0,0 +1,3 @@
+-- 连板晋级矩阵（见 IndicatorCalculator.TRANSITION_OUTCOMES）
+-- 第 N 行（1 起）为昨日N板股票今日的 [再次涨停, 炸板, 收红, 收绿, 停牌] 家数
+alter table emotion_cycle add column if not exists board_transitions int[][];
@@ -0,0 +1,3 @@
+-- 接近涨停家数：最高价距涨停价不超过昨收的 NEAR_LIMIT_PCT%，但盘中未触及涨停
+-- 涨停价由日线按板块规则本地计算（见 limit_price.py）
+alter table emotion_cycle add column if not exists near_limit_count int;
@@ -0,0 +1,9 @@
+-- 封板质量（基于当日涨停明细的 first_time / open_times / fd_amount / float_mv）
+-- 首次封板在 10:00 前 / 10:00~12:00 / 13:00 后的家数，一字板占比（%），
+-- 开板次数中位数，封单金额 / 流通市值（%）的中位数
+alter table emotion_cycle add column if not exists seal_early_count int;
+alter table emotion_cycle add column if not exists seal_morning_count int;
+alter table emotion_cycle add column if not exists seal_afternoon_count int;
+alter table emotion_cycle add column if not exists one_word_rate float;
+alter table emotion_cycle add column if not exists open_times_median float;
+alter table emotion_cycle add column if not exists seal_strength float;
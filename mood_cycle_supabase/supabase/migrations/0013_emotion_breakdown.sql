@@ -0,0 +1,33 @@
+-- 分行业、分板块指标（见 breakdown.py），用于观察板块轮动
+-- 按 dimension 分区：industry（limit_list_d 的行业）/ segment（main, chinext, star, bse）
+create table if not exists emotion_breakdown (
+  trade_date date not null,
+  dimension text not null,
+  key text not null,
+  limit_up_count int,
+  break_count int,
+  break_rate float,
+  max_board int,
+  advance_rate float,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (dimension, trade_date, key)
+) partition by list (dimension);
+
+create table if not exists emotion_breakdown_industry
+  partition of emotion_breakdown for values in ('industry');
+create table if not exists emotion_breakdown_segment
+  partition of emotion_breakdown for values in ('segment');
+
+alter table emotion_breakdown enable row level security;
+
+create policy "Allow public read access"
+  on emotion_breakdown for select
+  using (true);
+
+create policy "Allow public insert"
+  on emotion_breakdown for insert
+  with check (true);
+
+create policy "Allow public update"
+  on emotion_breakdown for update
+  using (true);
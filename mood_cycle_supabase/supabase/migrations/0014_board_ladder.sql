@@ -0,0 +1,29 @@
+-- 连板梯队（见 ladder.py）：每个交易日的涨停股和炸板股
+-- board: 封板股为连板数，炸板股为其冲击的高度；first_time: 首次封板时间（当日秒数）
+create table if not exists board_ladder (
+  trade_date date not null,
+  ts_code text not null,
+  name text,
+  board smallint not null,
+  first_time int,
+  broken boolean not null default false,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (trade_date, ts_code)
+);
+
+-- 个股连板历史查询
+create index if not exists board_ladder_ts_code_idx on board_ladder (ts_code, trade_date);
+
+alter table board_ladder enable row level security;
+
+create policy "Allow public read access"
+  on board_ladder for select
+  using (true);
+
+create policy "Allow public insert"
+  on board_ladder for insert
+  with check (true);
+
+create policy "Allow public update"
+  on board_ladder for update
+  using (true);
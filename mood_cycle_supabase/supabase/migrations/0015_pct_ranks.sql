@@ -0,0 +1,3 @@
+-- 各指标在最近 PCT_RANK_WINDOW 个交易日中的滚动历史分位（0~100），{列名: 分位}
+-- 由已保存的指标派生（见 percentile.py），不参与 row_hash；前端据此着色
+alter table emotion_cycle add column if not exists pct_ranks jsonb;
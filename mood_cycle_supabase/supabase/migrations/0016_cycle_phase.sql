@@ -0,0 +1,26 @@
+-- 情绪周期阶段（冰点/启动/发酵/高潮/退潮）和综合情绪分（0~100），见 cycle.py
+alter table emotion_cycle add column if not exists cycle_phase text;
+alter table emotion_cycle add column if not exists sentiment_score float;
+
+-- 流式模型的逐日状态快照：增量更新从前一交易日的状态继续，无需回放历史
+create table if not exists model_state (
+  model text not null,
+  trade_date date not null,
+  state jsonb not null,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (model, trade_date)
+);
+
+alter table model_state enable row level security;
+
+create policy "Allow public read access"
+  on model_state for select
+  using (true);
+
+create policy "Allow public insert"
+  on model_state for insert
+  with check (true);
+
+create policy "Allow public update"
+  on model_state for update
+  using (true);
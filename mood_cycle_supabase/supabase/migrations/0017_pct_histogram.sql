@@ -0,0 +1,2 @@
+-- 全市场涨跌幅分布：[跌停, -20%~20% 每 1% 一档共 40 档, 涨停]，见 indicators.py PCT_HIST_EDGES
+alter table emotion_cycle add column if not exists pct_histogram int[];
@@ -0,0 +1,65 @@
+-- 库内重算（update_data.py --server-side）不剔除 ST、退市、次新股，也不计算 SQL 函数之外的列
+-- （连板晋级矩阵、接近涨停、封板质量、涨跌幅分布等），因此同时清空 input_hash 和 def_versions：
+-- 后续增量/区间更新会把这些交易日视为有变化重新计算，--recompute --stale-only 也会把它们当作过期重算
+create or replace function refresh_emotion_cycle(p_start date, p_end date)
+returns integer
+language plpgsql
+as $$
+declare
+  affected integer;
+begin
+  insert into emotion_cycle (
+    trade_date, up_count, down_count, up5_count, down5_count,
+    limit_up_count, limit_down_count, break_count, break_rate,
+    first_board, second_board, third_board, above_third, max_board,
+    fanpao_count, limit_amount, seal_amount,
+    first_red_rate, first_premium, second_red_rate, second_premium,
+    third_red_rate, third_premium, third_plus_red_rate, third_plus_premium,
+    advance_1to2, advance_2to3, advance_3to4, advance_3plus, row_hash, input_hash, def_versions
+  )
+  select
+    c.trade_date, c.up_count, c.down_count, c.up5_count, c.down5_count,
+    c.limit_up_count, c.limit_down_count, c.break_count, c.break_rate,
+    c.first_board, c.second_board, c.third_board, c.above_third, c.max_board,
+    c.fanpao_count, c.limit_amount, c.seal_amount,
+    c.first_red_rate, c.first_premium, c.second_red_rate, c.second_premium,
+    c.third_red_rate, c.third_premium, c.third_plus_red_rate, c.third_plus_premium,
+    c.advance_1to2, c.advance_2to3, c.advance_3to4, c.advance_3plus, null, null, null
+  from compute_emotion_cycle(p_start, p_end) c
+  on conflict (trade_date) do update set
+    up_count = excluded.up_count,
+    down_count = excluded.down_count,
+    up5_count = excluded.up5_count,
+    down5_count = excluded.down5_count,
+    limit_up_count = excluded.limit_up_count,
+    limit_down_count = excluded.limit_down_count,
+    break_count = excluded.break_count,
+    break_rate = excluded.break_rate,
+    first_board = excluded.first_board,
+    second_board = excluded.second_board,
+    third_board = excluded.third_board,
+    above_third = excluded.above_third,
+    max_board = excluded.max_board,
+    fanpao_count = excluded.fanpao_count,
+    limit_amount = excluded.limit_amount,
+    seal_amount = excluded.seal_amount,
+    first_red_rate = excluded.first_red_rate,
+    first_premium = excluded.first_premium,
+    second_red_rate = excluded.second_red_rate,
+    second_premium = excluded.second_premium,
+    third_red_rate = excluded.third_red_rate,
+    third_premium = excluded.third_premium,
+    third_plus_red_rate = excluded.third_plus_red_rate,
+    third_plus_premium = excluded.third_plus_premium,
+    advance_1to2 = excluded.advance_1to2,
+    advance_2to3 = excluded.advance_2to3,
+    advance_3to4 = excluded.advance_3to4,
+    advance_3plus = excluded.advance_3plus,
+    row_hash = null,
+    input_hash = null,
+    def_versions = null;
+
+  get diagnostics affected = row_count;
+  return affected;
+end;
+$$;
@@ -0,0 +1,27 @@
+-- 分行业/分板块指标按交易日区间原子替换（与 replace_emotion_cycle 相同）：
+-- 重算后已不存在的 (维度, 行业/板块, 交易日) 旧行随区间一起删除
+-- p_rows: emotion_breakdown 行组成的 JSON 数组（字段名与表列名一致，缺失字段为 null）
+create policy "Allow public delete"
+  on emotion_breakdown for delete
+  using (true);
+
+create or replace function replace_emotion_breakdown(p_start date, p_end date, p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  affected integer;
+begin
+  delete from emotion_breakdown where trade_date between p_start and p_end;
+
+  insert into emotion_breakdown
+  select (jsonb_populate_record(
+    null::emotion_breakdown,
+    jsonb_build_object('created_at', timezone('utc'::text, now())) || r
+  )).*
+  from jsonb_array_elements(p_rows) r;
+
+  get diagnostics affected = row_count;
+  return affected;
+end;
+$$;
@@ -0,0 +1,27 @@
+-- 连板梯队按交易日区间原子替换（与 replace_emotion_cycle 相同）：
+-- 不再出现在当日梯队中的股票（被剔除或数据修正）的旧行随区间一起删除
+-- p_rows: board_ladder 行组成的 JSON 数组（字段名与表列名一致，缺失字段为 null）
+create policy "Allow public delete"
+  on board_ladder for delete
+  using (true);
+
+create or replace function replace_board_ladder(p_start date, p_end date, p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  affected integer;
+begin
+  delete from board_ladder where trade_date between p_start and p_end;
+
+  insert into board_ladder
+  select (jsonb_populate_record(
+    null::board_ladder,
+    jsonb_build_object('created_at', timezone('utc'::text, now())) || r
+  )).*
+  from jsonb_array_elements(p_rows) r;
+
+  get diagnostics affected = row_count;
+  return affected;
+end;
+$$;
@@ -29,6 +29,21 @@ create table if not exists emotion_cycle (
   advance_2to3 float,
   advance_3to4 float,
   advance_3plus float,
+  row_hash text,
+  def_versions jsonb,
+  input_hash text,
+  board_transitions int[][],
+  near_limit_count int,
+  seal_early_count int,
+  seal_morning_count int,
+  seal_afternoon_count int,
+  one_word_rate float,
+  open_times_median float,
+  seal_strength float,
+  pct_ranks jsonb,
+  cycle_phase text,
+  sentiment_score float,
+  pct_histogram int[],
   created_at timestamp with time zone default timezone('utc'::text, now()) not null
 );
 
@@ -0,0 +1,240 @@
+"""
+指标口径扫描
+修正说明.md 中有争议的口径（红盘率：收盘涨幅 > 0 / 开盘 ≥ 昨收 / 收盘 ≥ 开盘；
+晋级率：N 板 → 任意涨停 / N 板 → 恰好 N+1 板；停牌股计入或不计入分母）
+在一次读取本地原始数据后同时计算，以与未来市场收益的秩相关（IC）比较各口径，
+不再为每种口径跑一遍完整流程
+"""
+
+import argparse
+import itertools
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from raw_store import LocalRawStore
+from security_index import SecurityIndex
+from security_master import SecurityMaster
+
+
+class DefinitionSweep:
+    """口径扫描器
+
+    原始数据只读取一次，拼成“昨日涨停股 × 今日表现”的样本表（一次合并），
+    每种口径只是样本表上的一组布尔列和一次按交易日的分组求和。
+    """
+
+    # 红盘判定
+    RED_DEFINITIONS = {
+        'pct_chg>0': '收盘涨幅 > 0（当前口径）',
+        'open>=pre_close': '开盘 ≥ 昨收',
+        'close>=open': '收盘 ≥ 开盘',
+    }
+    # 晋级判定
+    ADVANCE_DEFINITIONS = {
+        'any': '今日任意涨停（当前口径）',
+        'next': '今日恰好 N+1 板',
+    }
+    # 停牌股（今日无日线）是否计入分母
+    SUSPENDED = {
+        'exclude': '不计入分母（当前口径）',
+        'include': '计入分母（视为未红盘/未晋级）',
+    }
+    # 昨日连板层级 (名称, 下限, 上限)
+    LEVELS = (('first', 1, 1), ('second', 2, 2), ('third_plus', 3, None))
+
+    def __init__(self, raw_store: LocalRawStore = None, security_master: Optional[SecurityMaster] = None,
+                 horizon: int = None):
+        self.raw_store = raw_store or LocalRawStore()
+        self.security_master = security_master
+        self.horizon = horizon or config.FORWARD_HORIZON
+        self.dates = np.zeros(0, dtype=object)
+        self.daily = pd.DataFrame()
+        self.events = pd.DataFrame()
+
+    def load(self, start_date: str = '00000000', end_date: str = '99999999') -> 'DefinitionSweep':
+        """读取区间内的原始数据（各口径共用）并构建样本表"""
+        daily = self.raw_store.read('daily', start_date, end_date,
+                                    columns=['ts_code', 'open', 'close', 'pre_close', 'pct_chg'])
+        limit = self.raw_store.read('limit_data', start_date, end_date,
+                                    columns=['ts_code', 'limit', 'limit_times'])
+        if daily.empty or limit.empty:
+            return self
+
+        daily = self._exclude(daily)
+        limit = self._exclude(limit)
+        self.dates = np.asarray(sorted(set(daily['trade_date'])), dtype=object)
+        daily['di'] = np.searchsorted(self.dates, daily['trade_date'].to_numpy(dtype=object))
+        limit = limit[limit['trade_date'].isin(set(self.dates))].copy()
+        limit['di'] = np.searchsorted(self.dates, limit['trade_date'].to_numpy(dtype=object))
+        self.daily = daily
+
+        up = limit[limit['limit'] == 'U'].drop_duplicates(['di', 'ts_code'])
+        prev_up = pd.DataFrame({
+            'ts_code': up['ts_code'].to_numpy(),
+            'di': up['di'].to_numpy() + 1,
+            'board': pd.to_numeric(up['limit_times'], errors='coerce').to_numpy(),
+        }).dropna(subset=['board'])
+        prev_up = prev_up[prev_up['di'] < len(self.dates)]
+
+        today_up = up[['ts_code', 'di', 'limit_times']].rename(columns={'limit_times': 'today_board'})
+        events = prev_up.merge(daily[['ts_code', 'di', 'open', 'close', 'pre_close', 'pct_chg']],
+                               on=['ts_code', 'di'], how='left')
+        events = events.merge(today_up, on=['ts_code', 'di'], how='left')
+        events['traded'] = events['close'].notna()
+        events['limit_up'] = events['today_board'].notna()
+        events['today_board'] = pd.to_numeric(events['today_board'], errors='coerce')
+        self.events = events
+        return self
+
+    def _exclude(self, df: pd.DataFrame) -> pd.DataFrame:
+        """按证券主数据剔除 ST、退市、次新股（与指标计算一致，逐交易日一次布尔索引）"""
+        if self.security_master is None or self.security_master.basic.empty:
+            return df
+        keep = np.ones(len(df), dtype=bool)
+        ids = self.security_master.index.encode(df['ts_code'])
+        for trade_date, rows in df.groupby('trade_date').indices.items():
+            mask = self.security_master.exclusion_mask(trade_date)
+            day_ids = ids[rows]
+            known = day_ids < len(mask)
+            keep[rows[known]] = ~mask[day_ids[known]]
+        return df[keep].reset_index(drop=True)
+
+    def _red_flags(self) -> Dict[str, np.ndarray]:
+        e = self.events
+        return {
+            'pct_chg>0': (e['pct_chg'] > 0).to_numpy(),
+            'open>=pre_close': (e['open'] >= e['pre_close']).to_numpy(),
+            'close>=open': (e['close'] >= e['open']).to_numpy(),
+        }
+
+    def _advance_flags(self) -> Dict[str, np.ndarray]:
+        e = self.events
+        return {
+            'any': e['limit_up'].to_numpy(),
+            'next': (e['limit_up'] & (e['today_board'] == e['board'] + 1)).to_numpy(),
+        }
+
+    def variant_series(self) -> pd.DataFrame:
+        """
+        全部口径的逐日取值
+
+        Returns:
+            行为交易日，列为 (metric, level, definition, suspended) 的宽表，单位 %
+        """
+        if self.events.empty:
+            return pd.DataFrame()
+
+        e = self.events
+        di = e['di'].to_numpy()
+        traded = e['traded'].to_numpy()
+        board = e['board'].to_numpy()
+        n = len(self.dates)
+
+        series = {}
+        flags = {'red_rate': self._red_flags(), 'advance': self._advance_flags()}
+        for (level, lo, hi), (metric, defs), suspended in itertools.product(
+                self.LEVELS, flags.items(), self.SUSPENDED):
+            in_level = (board >= lo) & (board <= hi if hi is not None else True)
+            base = in_level & (traded if suspended == 'exclude' else True)
+            denom = np.bincount(di[base], minlength=n).astype(float)
+            for definition, hit in defs.items():
+                numer = np.bincount(di[base & hit], minlength=n)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    rate = np.where(denom > 0, numer / denom * 100, np.nan)
+                series[(metric, level, definition, suspended)] = rate
+
+        result = pd.DataFrame(series, index=pd.Index(self.dates, name='trade_date'))
+        result.columns.names = ['metric', 'level', 'definition', 'suspended']
+        # 第一个交易日没有昨日样本
+        return result.iloc[1:]
+
+    def forward_market_returns(self) -> pd.DataFrame:
+        """
+        未来市场收益：全市场等权平均涨幅，T+1 当日及 T+1..T+horizon 累计（%）
+
+        Returns:
+            行为交易日 T 的 DataFrame: ret_1d, ret_{horizon}d
+        """
+        mean = self.daily.groupby('di')['pct_chg'].mean().reindex(range(len(self.dates))).to_numpy()
+        growth = 1 + np.nan_to_num(mean) / 100
+        cum = np.concatenate([[1.0], np.cumprod(growth)])
+        idx = np.arange(len(self.dates))
+        ret_1d = np.full(len(idx), np.nan)
+        ret_1d[:-1] = mean[1:]
+        end = idx + self.horizon
+        ret_n = np.where(end < len(self.dates),
+                         (cum[np.minimum(end, len(self.dates) - 1) + 1] / cum[idx + 1] - 1) * 100, np.nan)
+        return pd.DataFrame({'ret_1d': ret_1d, f'ret_{self.horizon}d': ret_n},
+                            index=pd.Index(self.dates, name='trade_date'))
+
+    @staticmethod
+    def _rank_corr(a: pd.Series, b: pd.Series) -> float:
+        """Spearman 秩相关（只用两边都有值的交易日；取值全部相同时无定义，为 NaN）"""
+        both = a.notna() & b.notna()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return a[both].rank().corr(b[both].rank())
+
+    def compare(self) -> pd.DataFrame:
+        """
+        各口径的对比表
+
+        Returns:
+            DataFrame: metric, level, definition, suspended, days, mean, std, ic_1d, ic_{horizon}d
+            （IC 为逐日取值与未来市场收益的 Spearman 秩相关），同一指标和层级内按 |ic_1d| 降序
+        """
+        series = self.variant_series()
+        if series.empty:
+            return pd.DataFrame()
+        returns = self.forward_market_returns().reindex(series.index)
+
+        rows = []
+        for key in series.columns:
+            values = series[key]
+            ics = {f'ic_{col[4:]}': self._rank_corr(values, returns[col]) for col in returns.columns}
+            rows.append({
+                **dict(zip(series.columns.names, key)),
+                'days': int(values.notna().sum()),
+                'mean': values.mean(),
+                'std': values.std(),
+                **ics,
+            })
+        table = pd.DataFrame(rows)
+        table['_order'] = -table['ic_1d'].abs()
+        table = table.sort_values(['metric', 'level', '_order']).drop(columns='_order')
+        return table.round(3).reset_index(drop=True)
+
+
+def main():
+    """命令行：扫描各指标口径并输出对比表"""
+    parser = argparse.ArgumentParser(description='指标口径扫描（按与未来市场收益的相关性比较）')
+    parser.add_argument('--start', type=str, default='00000000', help='开始日期（YYYYMMDD）')
+    parser.add_argument('--end', type=str, default='99999999', help='结束日期（YYYYMMDD）')
+    parser.add_argument('--horizon', type=int, help=f'累计收益天数（默认 {config.FORWARD_HORIZON}）')
+    parser.add_argument('--output', type=str, help='把对比表另存为 CSV')
+    args = parser.parse_args()
+
+    # 使用本地缓存的证券主数据（不调用 tushare），剔除口径与指标计算一致
+    sweep = DefinitionSweep(security_master=SecurityMaster(SecurityIndex()), horizon=args.horizon)
+    table = sweep.load(args.start, args.end).compare()
+    if table.empty:
+        print(f"❌ 区间内无本地原始数据（{config.RAW_DATA_DIR}）")
+        return
+
+    print(f"\n🔬 口径对比（{sweep.dates[0]} ~ {sweep.dates[-1]}，{len(sweep.dates)} 个交易日）")
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(table.to_string(index=False))
+    print("\n口径说明：")
+    for title, definitions in (('红盘', sweep.RED_DEFINITIONS), ('晋级', sweep.ADVANCE_DEFINITIONS),
+                               ('停牌', sweep.SUSPENDED)):
+        for key, text in definitions.items():
+            print(f"  {title} {key}: {text}")
+    if args.output:
+        table.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"\n[OK] 已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
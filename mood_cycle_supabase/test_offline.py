@@ -0,0 +1,156 @@
+"""
+离线测试脚本
+用合成的本地原始数据验证离线重算等流程（不调用 tushare，不连接 Supabase）
+"""
+
+import utils
+utils.setup_encoding()
+
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import config
+from raw_store import LocalRawStore
+
+INDUSTRIES = ['银行', '半导体', '医药']
+
+
+def make_days(n_days: int = 12, n_codes: int = 60, seed: int = 7) -> list:
+    """合成逐日原始数据（日线 + 涨跌停明细，涨停明细带行业和名称）"""
+    rng = np.random.default_rng(seed)
+    codes = [f'{600000 + i:06d}.SH' for i in range(n_codes)]
+    close = np.full(n_codes, 10.0)
+    boards = np.zeros(n_codes, dtype=int)
+    days = []
+    for trade_date in pd.bdate_range('2026-01-05', periods=n_days).strftime('%Y%m%d'):
+        pre_close = close
+        pct = rng.normal(0, 4, n_codes)
+        sealed = rng.random(n_codes) < 0.15
+        pct[sealed] = 10.0
+        close = np.round(pre_close * (1 + pct / 100), 2)
+        boards = np.where(sealed, boards + 1, 0)
+        daily = pd.DataFrame({
+            'ts_code': codes, 'trade_date': trade_date,
+            'open': pre_close, 'high': np.maximum(close, pre_close), 'low': np.minimum(close, pre_close),
+            'close': close, 'pre_close': pre_close, 'pct_chg': np.round((close / pre_close - 1) * 100, 2),
+        })
+        up = np.flatnonzero(sealed)
+        limit = pd.DataFrame({
+            'ts_code': [codes[i] for i in up], 'trade_date': trade_date,
+            'name': [f'股票{i}' for i in up], 'industry': [INDUSTRIES[i % len(INDUSTRIES)] for i in up],
+            'close': close[up], 'pct_chg': daily['pct_chg'].to_numpy()[up], 'amount': 1e8,
+            'fd_amount': 1e7, 'float_mv': 1e9, 'first_time': '093000', 'last_time': '093000',
+            'open_times': 0, 'limit_times': boards[up], 'limit': 'U',
+        })
+        days.append({'trade_date': trade_date, 'daily': daily, 'limit_data': limit})
+    return days
+
+
+class RecordingStorage:
+    """记录写入调用的存储层替身（读取一律为空）"""
+
+    def __init__(self):
+        self.calls = {}
+
+    def load_security_dict(self):
+        return {}
+
+    def load_model_state(self, model, before_date):
+        return None
+
+    def load_emotion_indicators(self, *args, **kwargs):
+        return pd.DataFrame()
+
+    def get_data_date_range(self):
+        return None, None
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.setdefault(name, []).append(args)
+            return len(args[0]) if args and isinstance(args[0], list) else 0
+        return record
+
+
+def run_recompute(tmp_dir: str, days: list) -> RecordingStorage:
+    """把 days 写入临时目录的本地原始数据后执行 recompute_local，返回记录的写入调用"""
+    import update_data
+
+    files = {key: os.path.join(tmp_dir, os.path.basename(path)) for key, path in LocalRawStore.FILES.items()}
+    storage = RecordingStorage()
+    with mock.patch.dict(LocalRawStore.FILES, files), \
+            mock.patch.multiple(config, RAW_DATA_DIR=tmp_dir, LIMIT_SOURCE='tushare',
+                                SECURITY_MASTER_DIR=os.path.join(tmp_dir, 'master')), \
+            mock.patch.object(update_data, 'DataFetcher'), \
+            mock.patch.object(update_data, 'DataStorage', return_value=storage):
+        LocalRawStore().save(days)
+        update_data.DataUpdater(workers=1).recompute_local()
+    return storage
+
+
+def test_recompute_keeps_industry_breakdown():
+    """离线重算整段替换分维度指标时，行业维度的行不能丢失"""
+    days = make_days()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = run_recompute(tmp_dir, days)
+
+    rows = [row for rows, *_ in storage.calls['replace_emotion_breakdown'] for row in rows]
+    industry = {(row['trade_date'], row['key']) for row in rows if row['dimension'] == 'industry'}
+    # 当日有涨停的行业都应有一行（只有昨日涨停的行业也会因晋级率出现）
+    expected = {(day['trade_date'], name) for day in days for name in day['limit_data']['industry']}
+    assert expected <= industry, f'行业维度缺少 {len(expected - industry)}/{len(expected)} 行'
+    print(f"  ✓ 行业维度 {len(industry)} 行")
+
+
+def test_recompute_keeps_ladder_names():
+    """离线重算整段替换连板梯队时，股票名称和首次封板时间不能被清空"""
+    days = make_days()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = run_recompute(tmp_dir, days)
+
+    rows = [row for rows, *_ in storage.calls['replace_board_ladder'] for row in rows]
+    assert rows, '未生成连板梯队'
+    assert all(row['name'] for row in rows), '连板梯队存在空名称'
+    assert all(row['first_time'] == 9 * 3600 + 30 * 60 for row in rows), '连板梯队存在空封板时间'
+    print(f"  ✓ 连板梯队 {len(rows)} 行")
+
+
+def test_features_read_back_with_empty_day():
+    """特征数据集含空交易日和名称/行业全为空的交易日时仍能整体读回"""
+    from features import FeatureExporter
+
+    days = make_days()
+    # 数据集按第一个分区推断 schema，空交易日放在最前面
+    days[0]['limit_data'] = days[0]['limit_data'].iloc[0:0]
+    days[5]['limit_data'] = days[5]['limit_data'].assign(name=None, industry=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = {key: os.path.join(tmp_dir, os.path.basename(path)) for key, path in LocalRawStore.FILES.items()}
+        with mock.patch.dict(LocalRawStore.FILES, files), mock.patch.object(config, 'RAW_DATA_DIR', tmp_dir):
+            LocalRawStore().save(days)
+            exporter = FeatureExporter(output_dir=os.path.join(tmp_dir, 'features'))
+            written = exporter.run()
+            df = exporter.read()
+
+    assert written == len(days), f'写入分区数 {written} != {len(days)}'
+    expected = sum(len(day['limit_data']) for day in days)
+    assert len(df) == expected, f'读回 {len(df)} 行，应为 {expected} 行'
+    assert int(days[0]['trade_date']) not in set(df['trade_date'].astype(int))
+    print(f"  ✓ {written} 个分区读回 {len(df)} 行")
+
+
+def main():
+    print("=" * 70)
+    print("🧪 离线测试")
+    print("=" * 70)
+    for test in (test_recompute_keeps_industry_breakdown, test_recompute_keeps_ladder_names,
+                 test_features_read_back_with_empty_day):
+        print(f"\n▶ {test.__doc__}")
+        test()
+    print("\n✅ 全部通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,18 @@ utils.setup_encoding()
 
 import argparse
 from datetime import datetime, timedelta
+import pandas as pd
+from breakdown import BreakdownCalculator
+from cycle import CyclePhaseClassifier
 from data_fetcher import DataFetcher
 from indicators import IndicatorCalculator
+from ladder import BoardLadderTracker
+from limit_price import derive_limit_data
+from parallel import compute_indicators_parallel
+from percentile import rolling_pct_ranks
+from raw_store import LocalRawStore
+from security_index import SecurityIndex
+from security_master import SecurityMaster
 from storage import DataStorage
 import config
 
@@ -18,11 +28,31 @@ import config
 class DataUpdater:
     """数据更新器"""
     
-    def __init__(self):
-        """初始化"""
+    def __init__(self, workers: int = None):
+        """
+        初始化
+        
+        Args:
+            workers: 指标计算进程数，默认 config.COMPUTE_WORKERS；1 表示单进程
+        """
+        self.workers = workers or config.COMPUTE_WORKERS
         self.fetcher = DataFetcher()
-        self.calculator = IndicatorCalculator()
         self.storage = DataStorage()
+        # 证券编号跨运行保持一致，由存储层维护
+        self.calculator = IndicatorCalculator(SecurityIndex.load(self.storage),
+                                              groups=config.ENABLED_INDICATOR_GROUPS)
+        # 只获取启用的指标实际用到的数据集
+        self.datasets = list(self.calculator.required_datasets(self.calculator.groups))
+        # 涨跌停全部由日线推导时不再调用 limit_list_d
+        if config.LIMIT_SOURCE == 'derived' and 'limit_data' in self.datasets:
+            self.datasets = [d for d in self.datasets if d != 'limit_data']
+            if 'daily' not in self.datasets:
+                self.datasets.append('daily')
+        # ST、退市、次新股在计算前统一剔除（原始数据仍完整保存）
+        # 只在获取数据的模式中刷新；重算模式直接使用本地缓存，不消耗 API 额度
+        self.security_master = SecurityMaster(self.calculator.security_index)
+        # 分行业、分板块指标（与全市场指标共用证券编号）
+        self.breakdown = BreakdownCalculator(self.calculator.security_index)
     
     def initialize_data(self, start_date: str = None):
         """
@@ -45,34 +75,39 @@ class DataUpdater:
         print("=" * 70)
         
         # 批量获取数据
-        all_data = self.fetcher.fetch_batch_data(start_date, end_date)
+        self.security_master.refresh(self.fetcher)
+        all_data = self.fetcher.fetch_batch_data(start_date, end_date, self.datasets)
         
         if not all_data:
             print("❌ 未获取到数据")
             return
         
-        # 保存原始数据
-        self.storage.save_raw_data(all_data)
+        # 第一天的前一日数据取自上次运行保存的状态快照
+        prev_data_first = self._load_prev_data_before(all_data[0]['trade_date'])
+        self._fill_limit_data(all_data, prev_data_first)
+        
+        # 按输入指纹找出与上次相比有变化的交易日
+        changed = self._detect_changed(all_data, prev_data_first)
+        if not changed:
+            self._log_unchanged('init', start_date, end_date)
+            return
+        
+        # 保存原始数据（仅输入有变化的交易日）
+        self.storage.save_raw_data([all_data[i] for i in changed])
         
         # 计算指标
         print("\n🔢 开始计算指标...")
-        indicators_list = []
         
-        for i, data in enumerate(all_data):
-            # 获取前一日数据（用于计算晋级率）
-            prev_data = all_data[i-1] if i > 0 else None
-            
-            # 计算指标
-            indicators = self.calculator.calculate_indicators(data, prev_data)
-            indicators_list.append(indicators)
-            
-            if (i + 1) % 10 == 0:
-                print(f"  已计算 {i+1}/{len(all_data)} 个交易日")
+        # 面板引擎计算有变化的交易日，区间较长时分片并行
+        indicators_list = self._calculate_changed(all_data, prev_data_first, changed)
         
         print(f"✅ 指标计算完成，共{len(indicators_list)}条")
         
         # 保存指标
         self.storage.save_emotion_indicators(indicators_list)
+        self._save_details_changed(all_data, prev_data_first, changed)
+        self._refresh_derived(indicators_list[0]['trade_date'])
+        self._save_run_state(all_data[-1])
         self.storage.log_update_run(
             mode='init',
             start_date=start_date,
@@ -129,47 +164,36 @@ class DataUpdater:
         print("=" * 70)
         
         # 获取数据
+        self.security_master.refresh(self.fetcher)
         all_data = []
         for trade_date in trade_dates:
-            data = self.fetcher.fetch_all_data_for_date(trade_date)
+            data = self.fetcher.fetch_all_data_for_date(trade_date, self.datasets)
             all_data.append(data)
         
+        # 获取最后一个已有数据（作为第一天的prev_data）
+        # 直接读取上次运行保存的前一日状态快照，无需加载完整的日线和涨停明细
+        prev_data_first = self._load_prev_data(latest_date)
+        self._fill_limit_data(all_data, prev_data_first)
+        
+        # 新交易日在库中没有指纹，全部视为变化；这里主要是为它们记录指纹
+        changed = self._detect_changed(all_data, prev_data_first)
+        
         # 保存原始数据
-        self.storage.save_raw_data(all_data)
+        self.storage.save_raw_data([all_data[i] for i in changed])
         
         # 计算指标
         print("\n🔢 开始计算指标...")
-        indicators_list = []
-        
-        # 获取最后一个已有数据（作为第一天的prev_data）
-        # 注意：需要同时获取 limit_data 和 daily 数据，因为计算晋级率需要用到前一日的 daily
-        prev_limit_df = self.storage.load_limit_data(latest_date, latest_date)
-        prev_daily_df = self.storage.load_daily_data(latest_date, latest_date)
-        
-        if not prev_limit_df.empty or not prev_daily_df.empty:
-            prev_data_first = {
-                'trade_date': latest_date,
-                'limit_data': prev_limit_df,
-                'daily': prev_daily_df
-            }
-        else:
-            prev_data_first = None
         
-        for i, data in enumerate(all_data):
-            if i == 0:
-                # 第一天使用数据库中的前一日数据
-                prev_data = prev_data_first
-            else:
-                # 后续天使用列表中的前一日数据
-                prev_data = all_data[i-1]
-            
-            indicators = self.calculator.calculate_indicators(data, prev_data)
-            indicators_list.append(indicators)
+        # 第一天使用数据库中的前一日数据，后续天使用列表中的前一日数据
+        indicators_list = self._calculate_changed(all_data, prev_data_first, changed)
         
         print(f"✅ 指标计算完成")
         
         # 保存指标
         self.storage.save_emotion_indicators(indicators_list)
+        self._save_details_changed(all_data, prev_data_first, changed)
+        self._refresh_derived(indicators_list[0]['trade_date'])
+        self._save_run_state(all_data[-1])
 
         self.storage.log_update_run(
             mode='incremental',
@@ -202,28 +226,37 @@ class DataUpdater:
         print("=" * 70)
         
         # 批量获取数据
-        all_data = self.fetcher.fetch_batch_data(start_date, end_date)
+        self.security_master.refresh(self.fetcher)
+        all_data = self.fetcher.fetch_batch_data(start_date, end_date, self.datasets)
         
         if not all_data:
             print("❌ 未获取到数据")
             return
         
-        # 保存原始数据
-        self.storage.save_raw_data(all_data)
+        prev_data_first = self._load_prev_data_before(all_data[0]['trade_date'])
+        self._fill_limit_data(all_data, prev_data_first)
+        
+        # 修补区间与已有数据重叠时，输入未变化的交易日只付出获取的代价
+        changed = self._detect_changed(all_data, prev_data_first)
+        if not changed:
+            self._log_unchanged('range', start_date, end_date)
+            return
+        
+        # 保存原始数据（仅输入有变化的交易日）
+        self.storage.save_raw_data([all_data[i] for i in changed])
         
         # 计算指标
         print("\n🔢 开始计算指标...")
-        indicators_list = []
         
-        for i, data in enumerate(all_data):
-            prev_data = all_data[i-1] if i > 0 else None
-            indicators = self.calculator.calculate_indicators(data, prev_data)
-            indicators_list.append(indicators)
+        indicators_list = self._calculate_changed(all_data, prev_data_first, changed)
         
         print(f"✅ 指标计算完成")
         
         # 保存指标
         self.storage.save_emotion_indicators(indicators_list)
+        self._save_details_changed(all_data, prev_data_first, changed)
+        self._refresh_derived(indicators_list[0]['trade_date'])
+        self._save_run_state(all_data[-1])
 
         self.storage.log_update_run(
             mode='range',
@@ -241,6 +274,372 @@ class DataUpdater:
         # 显示数据摘要
         self._show_data_summary()
     
+    def _calculate(self, all_data: list, prev_data: dict = None) -> list:
+        """剔除排除股票后计算指标（交易日数超过单个分片时使用进程池并行）"""
+        days = [self.security_master.filter_day(data) for data in all_data]
+        prev = self.security_master.filter_day(prev_data)
+        return compute_indicators_parallel(self.calculator, days, prev, self.workers)
+    
+    def _fill_limit_data(self, all_data: list, prev_data: dict = None):
+        """
+        按 config.LIMIT_SOURCE 由日线推导涨跌停数据（就地写入各日的 limit_data）
+        
+        auto 模式只补 limit_list_d 为空的交易日；连板数沿交易日顺序递推，
+        区间首日以 prev_data 的涨停明细为起点。推导结果与获取的数据一样保存为原始数据。
+        """
+        if config.LIMIT_SOURCE == 'tushare':
+            return
+        
+        derived = 0
+        prev_limit = prev_data.get('limit_data') if prev_data is not None else None
+        for data in all_data:
+            daily = data.get('daily')
+            missing = data.get('limit_data') is None or data['limit_data'].empty
+            if (config.LIMIT_SOURCE == 'derived' or missing) and daily is not None and not daily.empty:
+                is_st = self.security_master.is_st(data['trade_date'], daily['ts_code'])
+                data['limit_data'] = derive_limit_data(daily, data['trade_date'], prev_limit, is_st)
+                derived += 1
+            prev_limit = data.get('limit_data')
+        
+        if derived:
+            print(f"🧮 {derived}个交易日由日线推导涨跌停数据")
+    
+    def _fingerprint(self, data: dict, prev_data: dict = None) -> str:
+        """剔除排除股票后的输入指纹（与 _calculate 实际使用的输入一致）"""
+        return self.calculator.input_fingerprint(self.security_master.filter_day(data),
+                                                 self.security_master.filter_day(prev_data))
+    
+    def _detect_changed(self, all_data: list, prev_data: dict = None) -> dict:
+        """
+        计算每个交易日的输入指纹，与库中记录比对
+        
+        Returns:
+            {交易日在 all_data 中的下标: 输入指纹}，只包含指纹变化、
+            库中没有记录或指标定义版本已过期的交易日（按日期升序）
+        """
+        stored = self.storage.load_input_state(all_data[0]['trade_date'], all_data[-1]['trade_date'])
+        changed = {}
+        for i, data in enumerate(all_data):
+            fingerprint = self._fingerprint(data, all_data[i - 1] if i > 0 else prev_data)
+            row = stored.get(data['trade_date'])
+            if (row is None or row.get('input_hash') != fingerprint
+                    or self.calculator.stale_groups(row.get('def_versions'), self.calculator.groups)):
+                changed[i] = fingerprint
+        
+        skipped = len(all_data) - len(changed)
+        if skipped:
+            print(f"⏭️  {skipped}个交易日输入数据未变化，跳过写入和重算")
+        return changed
+    
+    def _calculate_changed(self, all_data: list, prev_data: dict, changed: dict) -> list:
+        """
+        只计算输入有变化的交易日
+        
+        连续变化的交易日作为一段一起计算，每段以其前一个交易日作为 prev_data；
+        结果附带 input_hash。
+        """
+        indicators_list = []
+        for first, last in self._changed_segments(changed):
+            prev = all_data[first - 1] if first > 0 else prev_data
+            indicators_list.extend(self._calculate(all_data[first:last + 1], prev))
+        
+        for i, indicators in zip(sorted(changed), indicators_list):
+            indicators['input_hash'] = changed[i]
+        return indicators_list
+    
+    def _save_details_changed(self, all_data: list, prev_data: dict, changed: dict):
+        """
+        计算并保存输入有变化的交易日的分行业/分板块指标和连板梯队（分段方式与 _calculate_changed 相同）
+        
+        按连续区间整段替换，区间内已不再出现的行业/板块和股票的旧行一并删除。
+        """
+        for first, last in self._changed_segments(changed):
+            prev = all_data[first - 1] if first > 0 else prev_data
+            segment = all_data[first:last + 1]
+            start_date, end_date = segment[0]['trade_date'], segment[-1]['trade_date']
+            self.storage.replace_emotion_breakdown(self._calculate_breakdown(segment, prev), start_date, end_date)
+            self.storage.replace_board_ladder(self._calculate_ladder(segment, prev), start_date, end_date)
+    
+    @staticmethod
+    def _changed_segments(changed: dict):
+        """有变化的下标 -> 连续区间 (first, last) 序列"""
+        positions = sorted(changed)
+        start = 0
+        while start < len(positions):
+            end = start
+            while end + 1 < len(positions) and positions[end + 1] == positions[end] + 1:
+                end += 1
+            yield positions[start], positions[end]
+            start = end + 1
+    
+    @staticmethod
+    def _detail_columns() -> dict:
+        """离线重算时从本地原始数据读取的列：指标计算、分行业/分板块指标、连板梯队用到的列的并集"""
+        columns = {key: list(cols) for key, cols in IndicatorCalculator.PANEL_COLUMNS.items()}
+        for col in BreakdownCalculator.LIMIT_COLUMNS + BoardLadderTracker.LIMIT_COLUMNS:
+            if col not in columns['limit_data']:
+                columns['limit_data'].append(col)
+        return columns
+    
+    def _calculate_breakdown(self, all_data: list, prev_data: dict = None) -> list:
+        """剔除排除股票后计算分行业、分板块指标"""
+        days = [self.security_master.filter_day(data) for data in all_data]
+        return self.breakdown.calculate_batch(days, self.security_master.filter_day(prev_data))
+    
+    def _calculate_ladder(self, all_data: list, prev_data: dict = None) -> list:
+        """剔除排除股票后从 prev_data 起逐日推进连板梯队"""
+        tracker = BoardLadderTracker(self.security_master.filter_day(prev_data))
+        return tracker.run([self.security_master.filter_day(data) for data in all_data])
+    
+    def _refresh_derived(self, start_date: str):
+        """
+        重算 start_date 及之后各交易日的派生列（滚动历史分位、情绪周期阶段）
+
+        - 情绪周期从 start_date 之前最近的状态快照继续（增量更新只处理新增交易日）；
+          没有快照时从最早的已存指标开始
+        - 分位依赖之前 PCT_RANK_WINDOW 个交易日的值，因此从写回起点之前约一个窗口的
+          自然日起读取已保存的指标（1 年约 242 个交易日）
+        """
+        snapshot = self.storage.load_model_state(CyclePhaseClassifier.MODEL_NAME, start_date)
+        if snapshot is None:
+            write_from = None
+            df = self.storage.load_emotion_indicators()
+        else:
+            write_from = min(pd.Timestamp(start_date), pd.Timestamp(snapshot['trade_date']) + pd.Timedelta(days=1))
+            history_start = write_from - pd.Timedelta(days=config.PCT_RANK_WINDOW * 3 // 2 + 30)
+            df = self.storage.load_emotion_indicators(history_start.strftime('%Y%m%d'))
+        if df.empty:
+            return
+        df = df.sort_values('trade_date').reset_index(drop=True)
+        write_from = write_from if write_from is not None else df['trade_date'].iloc[0]
+
+        ranks = rolling_pct_ranks(df)
+        classifier = CyclePhaseClassifier(snapshot['state'] if snapshot else None)
+        records = []
+        snapshots = []
+        for row, pct_ranks in zip(df.to_dict('records'), ranks):
+            if row['trade_date'] < write_from:
+                continue
+            trade_date = row['trade_date'].strftime('%Y%m%d')
+            records.append({'trade_date': trade_date, 'pct_ranks': pct_ranks, **classifier.step(row)})
+            snapshots.append({'trade_date': trade_date, 'state': classifier.to_state()})
+
+        self.storage.save_derived_columns(records)
+        self.storage.save_model_states(CyclePhaseClassifier.MODEL_NAME, snapshots)
+        if records and records[-1]['cycle_phase']:
+            print(f"🧭 最新情绪周期：{records[-1]['cycle_phase']}（情绪分 {records[-1]['sentiment_score']}）")
+    
+    def _log_unchanged(self, mode: str, start_date: str, end_date: str):
+        """区间内所有交易日输入都未变化时记录本次运行"""
+        print("✅ 区间内输入数据与上次完全一致，无需写入和重算")
+        self.storage.log_update_run(
+            mode=mode,
+            start_date=start_date,
+            end_date=end_date,
+            days_count=0,
+            status='success',
+            message='输入数据未变化，跳过'
+        )
+    
+    def _load_prev_data(self, trade_date: str):
+        """
+        读取指定交易日的前一日状态，作为下一交易日计算的 prev_data
+        
+        优先使用状态快照（O(1)），没有快照时退回到原始数据表。
+        """
+        state = self.storage.load_prev_day_state(trade_date)
+        if state is not None:
+            return state
+        
+        prev_limit_df = self.storage.load_limit_data(trade_date, trade_date)
+        prev_daily_df = self.storage.load_daily_data(trade_date, trade_date)
+        if prev_limit_df.empty and prev_daily_df.empty:
+            print(f"⚠️  未找到 {trade_date} 的前一日状态，首日跨日指标将为空")
+            return None
+        
+        return {
+            'trade_date': trade_date,
+            'limit_data': prev_limit_df,
+            'daily': prev_daily_df
+        }
+    
+    def _load_prev_data_before(self, trade_date: str):
+        """读取指定交易日的上一个交易日的状态"""
+        prev_trade_date = self.fetcher.get_prev_trade_date(trade_date)
+        if prev_trade_date is None:
+            return None
+        return self._load_prev_data(prev_trade_date)
+    
+    def _save_run_state(self, data: dict):
+        """保存本次运行最后一个交易日的状态和新分配的证券编号，供下次运行作为起点"""
+        self.storage.save_prev_day_state(self.calculator.build_carry_state(data))
+        self.storage.save_security_dict(self.calculator.security_index.pop_pending())
+    
+    def recompute_server_side(self, start_date: str = None, end_date: str = None):
+        """
+        在数据库内重算指标（需已开启 STORE_RAW_IN_SUPABASE 并写入过原始数据）
+
+        SQL 函数不剔除 ST、退市、次新股，只计算基础列；重算过的交易日会清空 input_hash 和
+        def_versions，之后用 --recompute --stale-only 或增量/区间更新按 Python 口径补齐
+
+        Args:
+            start_date: 开始日期，格式：YYYYMMDD，默认从config中获取
+            end_date: 结束日期，格式：YYYYMMDD，默认今天
+        """
+        start_date = start_date or config.INIT_START_DATE
+        end_date = end_date or datetime.now().strftime('%Y%m%d')
+
+        print("=" * 70)
+        print("🗄️  库内重算指标")
+        print("=" * 70)
+        print(f"日期范围: {start_date} ~ {end_date}")
+        print("=" * 70)
+
+        affected = self.storage.refresh_indicators_server_side(start_date, end_date)
+        print(f"✅ 库内重算完成，共{affected}个交易日")
+        print("⚠️  库内重算未剔除 ST/退市/次新股且不含扩展指标，已标记为过期；"
+              "请运行 python update_data.py --recompute --stale-only 补齐")
+        self._refresh_derived(start_date)
+
+        self.storage.log_update_run(
+            mode='server',
+            start_date=start_date,
+            end_date=end_date,
+            days_count=affected,
+            status='success',
+            message=f'库内重算完成：{start_date}~{end_date}，共{affected}个交易日'
+        )
+
+        self._show_data_summary()
+
+    def recompute_local(self, start_date: str = None, end_date: str = None, stale_only: bool = False):
+        """
+        从本地原始数据（data/raw/*.parquet）离线重算指标，不调用 tushare
+        
+        用于指标口径调整后刷新历史数据：按窗口流式读取原始数据计算，
+        最后在一个事务内原子替换 emotion_cycle 中该区间的全部行。
+        
+        Args:
+            start_date: 开始日期，格式：YYYYMMDD，默认从本地最早的交易日开始
+            end_date: 结束日期，格式：YYYYMMDD，默认到本地最新的交易日
+            stale_only: 只重算定义版本过期的日期，并只写回过期分组的列
+        """
+        raw_store = LocalRawStore()
+        local_dates = raw_store.trade_dates()
+        if not local_dates:
+            print(f"❌ 本地无原始数据（{config.RAW_DATA_DIR}），请先开启 STORE_RAW_LOCAL 并运行一次更新")
+            return
+        
+        start_date = start_date or local_dates[0]
+        end_date = end_date or local_dates[-1]
+        
+        print("=" * 70)
+        print("♻️  本地离线重算指标")
+        print("=" * 70)
+        print(f"日期范围: {start_date} ~ {end_date}")
+        print("=" * 70)
+        
+        if stale_only:
+            self._recompute_stale(raw_store, start_date, end_date)
+            return
+        
+        indicators_list = []
+        # 分行业/分板块指标和连板梯队按窗口整段替换：[(区间起, 区间止, 分维度行, 梯队行)]
+        detail_windows = []
+        last_data = None
+        # 除指标计算的列外，还需读取分行业指标和连板梯队用到的列（行业、名称等），否则整段替换会丢失这些值
+        for prev_data, days in raw_store.iter_windows(start_date, end_date, columns=self._detail_columns()):
+            self._fill_limit_data(days, prev_data)
+            window = self._calculate(days, prev_data)
+            detail_windows.append([days[0]['trade_date'], days[-1]['trade_date'],
+                                   self._calculate_breakdown(days, prev_data),
+                                   self._calculate_ladder(days, prev_data)])
+            # 本地数据与 tushare 数据的指纹口径一致，后续增量/修补可据此跳过未变化的交易日
+            for i, indicators in enumerate(window):
+                indicators['input_hash'] = self._fingerprint(days[i], days[i - 1] if i > 0 else prev_data)
+            indicators_list.extend(window)
+            last_data = days[-1]
+            print(f"  已计算 {len(indicators_list)} 个交易日（至 {last_data['trade_date']}）")
+        
+        if not indicators_list:
+            print("❌ 区间内无本地原始数据")
+            return
+        
+        print(f"✅ 指标计算完成，共{len(indicators_list)}条")
+        
+        affected = self.storage.replace_emotion_indicators(indicators_list, start_date, end_date)
+        # 首尾窗口扩展到整个重算区间，区间两端已不存在的交易日的旧行也被删除
+        detail_windows[0][0] = start_date
+        detail_windows[-1][1] = end_date
+        for window_start, window_end, breakdown_rows, ladder_rows in detail_windows:
+            self.storage.replace_emotion_breakdown(breakdown_rows, window_start, window_end)
+            self.storage.replace_board_ladder(ladder_rows, window_start, window_end)
+        self._refresh_derived(start_date)
+        # 区间覆盖到本地最新交易日时，同步刷新下次增量更新的起点状态
+        if last_data['trade_date'] == local_dates[-1]:
+            self._save_run_state(last_data)
+        else:
+            self.storage.save_security_dict(self.calculator.security_index.pop_pending())
+        
+        self.storage.log_update_run(
+            mode='recompute',
+            start_date=start_date,
+            end_date=end_date,
+            days_count=affected,
+            status='success',
+            message=f'本地重算完成：{start_date}~{end_date}，共{affected}个交易日'
+        )
+        
+        self._show_data_summary()
+    
+    def _recompute_stale(self, raw_store: LocalRawStore, start_date: str, end_date: str):
+        """只重算定义版本过期的日期和列"""
+        stored = self.storage.load_def_versions(start_date, end_date)
+        stale = {}
+        for trade_date, def_versions in stored.items():
+            groups = self.calculator.stale_groups(def_versions, self.calculator.groups)
+            if groups:
+                stale[trade_date] = groups
+        
+        if not stale:
+            print("✅ 所有指标均为最新定义，无需重算")
+            return
+        print(f"🔍 发现{len(stale)}个交易日存在过期指标")
+        
+        current_versions = self.calculator.definition_versions(self.calculator.groups)
+        records = []
+        for prev_data, days in raw_store.iter_windows(min(stale), max(stale)):
+            self._fill_limit_data(days, prev_data)
+            for indicators in self._calculate(days, prev_data):
+                groups = stale.get(indicators['trade_date'])
+                if not groups:
+                    continue
+                record = {'trade_date': indicators['trade_date']}
+                for col in self.calculator.group_columns(groups):
+                    record[col] = indicators.get(col)
+                record['def_versions'] = current_versions
+                records.append(record)
+        
+        missing = len(stale) - len(records)
+        if missing:
+            print(f"⚠️  {missing}个过期交易日缺少本地原始数据，未能重算")
+        
+        self.storage.save_indicator_columns(records)
+        if records:
+            self._refresh_derived(min(r['trade_date'] for r in records))
+        self.storage.save_security_dict(self.calculator.security_index.pop_pending())
+        
+        self.storage.log_update_run(
+            mode='recompute',
+            start_date=start_date,
+            end_date=end_date,
+            days_count=len(records),
+            status='success',
+            message=f'过期指标重算完成：{len(records)}个交易日'
+        )
+        
+        self._show_data_summary()
+    
     def _show_data_summary(self):
         """显示数据摘要"""
         min_date, max_date = self.storage.get_data_date_range()
@@ -270,12 +669,22 @@ def main():
     parser.add_argument('--init', action='store_true', help='初始化数据（从2026-01-01至今）')
     parser.add_argument('--start', type=str, help='自定义开始日期（YYYYMMDD）')
     parser.add_argument('--end', type=str, help='自定义结束日期（YYYYMMDD）')
+    parser.add_argument('--workers', type=int, help='指标计算进程数（默认使用全部 CPU 核心，1 为单进程）')
+    parser.add_argument('--recompute', action='store_true', help='从本地 data/raw 原始数据离线重算指标（可配合 --start/--end）')
+    parser.add_argument('--stale-only', action='store_true', help='配合 --recompute：只重算定义版本过期的日期和列')
+    parser.add_argument('--server-side', action='store_true', help='在数据库内用 SQL 函数重算指标（可配合 --start/--end）')
     
     args = parser.parse_args()
     
-    updater = DataUpdater()
+    updater = DataUpdater(workers=args.workers)
     
-    if args.init:
+    if args.recompute:
+        # 本地离线重算模式
+        updater.recompute_local(args.start, args.end, stale_only=args.stale_only)
+    elif args.server_side:
+        # 库内重算模式
+        updater.recompute_server_side(args.start, args.end)
+    elif args.init:
         # 初始化模式
         updater.initialize_data()
     elif args.start and args.end:
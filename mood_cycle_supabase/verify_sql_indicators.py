@@ -0,0 +1,92 @@
+"""
+库内指标校验脚本
+对比 SQL 函数 compute_emotion_cycle 与 Python IndicatorCalculator 的计算结果
+
+用法（本地 Postgres，例如 `supabase start` 后将 SUPABASE_URL 指向 http://127.0.0.1:54321）：
+    python verify_sql_indicators.py --start 20260105 --end 20260130
+需已开启 STORE_RAW_IN_SUPABASE 并写入过该区间（及前一交易日）的原始数据。
+"""
+import utils
+utils.setup_encoding()
+
+import argparse
+from datetime import datetime, timedelta
+import pandas as pd
+from storage import DataStorage
+from indicators import IndicatorCalculator
+
+# 四舍五入口径差异（Python 银行家舍入 vs Postgres 远离零舍入）允许的误差
+TOLERANCE = 0.011
+
+
+def main():
+    parser = argparse.ArgumentParser(description='校验库内指标计算')
+    parser.add_argument('--start', type=str, required=True, help='开始日期（YYYYMMDD）')
+    parser.add_argument('--end', type=str, required=True, help='结束日期（YYYYMMDD）')
+    args = parser.parse_args()
+
+    storage = DataStorage()
+    calculator = IndicatorCalculator()
+
+    # 多读前若干自然日，保证区间首日能取到前一交易日
+    load_start = (datetime.strptime(args.start, '%Y%m%d') - timedelta(days=20)).strftime('%Y%m%d')
+    daily_all = storage.load_daily_data(load_start, args.end)
+    limit_all = storage.load_limit_data(load_start, args.end)
+    if daily_all.empty or limit_all.empty:
+        print('❌ 未读取到原始数据，请确认已开启 STORE_RAW_IN_SUPABASE 并写入过该区间数据')
+        return
+
+    dates = sorted(set(daily_all['trade_date']) | set(limit_all['trade_date']))
+
+    # Python 侧：前一交易日取原始表中的上一个日期，与 SQL 口径一致
+    # 当日上下文直接作为下一交易日的前一日上下文
+    expected = []
+    prev_ctx = None
+    for trade_date in dates:
+        ctx = calculator.build_context({
+            'trade_date': trade_date,
+            'daily': daily_all[daily_all['trade_date'] == trade_date].reset_index(drop=True),
+            'limit_data': limit_all[limit_all['trade_date'] == trade_date].reset_index(drop=True),
+        })
+        if args.start <= trade_date <= args.end:
+            expected.append(calculator.calculate_indicators(ctx, prev_ctx))
+        prev_ctx = ctx
+
+    py_df = pd.DataFrame(expected)
+    py_df['trade_date'] = pd.to_datetime(py_df['trade_date'], format='%Y%m%d')
+    sql_df = storage.compute_indicators_server_side(args.start, args.end)
+
+    print('=' * 70)
+    print(f'库内指标校验：{args.start} ~ {args.end}')
+    print('=' * 70)
+    print(f'  Python: {len(py_df)}个交易日 | SQL: {len(sql_df)}个交易日')
+
+    merged = py_df.merge(sql_df, on='trade_date', how='outer', suffixes=('_py', '_sql'), indicator=True)
+    missing = merged[merged['_merge'] != 'both']
+    mismatches = 0
+    for _, row in missing.iterrows():
+        print(f"  ⚠️  {row['trade_date']:%Y-%m-%d} 仅存在于 {'Python' if row['_merge'] == 'left_only' else 'SQL'}")
+        mismatches += 1
+
+    columns = [c for c in sql_df.columns if c != 'trade_date']
+    both = merged[merged['_merge'] == 'both']
+    for col in columns:
+        py_col = both.get(f'{col}_py', pd.Series(index=both.index, dtype=float))
+        sql_col = both[f'{col}_sql']
+        py_num = pd.to_numeric(py_col, errors='coerce')
+        sql_num = pd.to_numeric(sql_col, errors='coerce')
+        bad = (py_num.isna() != sql_num.isna()) | ((py_num - sql_num).abs() > TOLERANCE)
+        for idx in both.index[bad]:
+            print(f"  ✗ {both.at[idx, 'trade_date']:%Y-%m-%d} {col}: Python={py_col.at[idx]} SQL={sql_col.at[idx]}")
+            mismatches += 1
+
+    print('\n' + '=' * 70)
+    if mismatches == 0:
+        print('✅ SQL 与 Python 计算结果一致')
+    else:
+        print(f'❌ 发现 {mismatches} 处差异')
+    print('=' * 70)
+
+
+if __name__ == '__main__':
+    main()